@@ -1,13 +1,17 @@
+import logging
 from flask import Flask, jsonify
 from flask_cors import CORS
 from app.config import Config
+from app.utils.lifecycle import Lifecycle
 
 def create_app():
+    logging.basicConfig(level=logging.INFO)
+    
     app = Flask(__name__)
     app.config.from_object(Config)
     
     # 启用CORS
-    CORS(app, resources={r"/api/*": {"origins": "*"}})
+    CORS(app, resources={r"/api/*": {"origins": "*", "expose_headers": ["X-Read-After"]}})
     
     # 添加根路径
     @app.route('/')
@@ -31,6 +35,30 @@ def create_app():
     def health():
         return jsonify({"status": "healthy", "service": "English Learning System"})
     
+    # 就绪检查：启动完成前、开始退出后或必需依赖不可用时返回503，负载均衡据此摘除实例
+    @app.route('/health/ready')
+    def health_ready():
+        from app.utils.health import HealthCheck
+        from app.utils.warmup import Warmup
+        checks = HealthCheck.run()
+        ready = HealthCheck.is_ready(checks)
+        return jsonify({
+            "status": "ready" if ready else "unavailable",
+            "service": "English Learning System",
+            "checks": checks,
+            "warmup": Warmup.report()
+        }), 200 if ready else 503
+    
+    # 存活检查：进程能处理请求即返回200，依赖状态仅供参考，不因数据库故障触发重启
+    @app.route('/health/live')
+    def health_live():
+        from app.utils.health import HealthCheck
+        return jsonify({
+            "status": "alive",
+            "service": "English Learning System",
+            "checks": HealthCheck.run()
+        })
+    
     # 注册蓝图
     from app.routes import auth_bp, user_bp, learning_bp, quiz_bp, community_bp
     from app.routes.admin import admin_bp  # 导入管理员蓝图
@@ -44,4 +72,28 @@ def create_app():
     app.register_blueprint(admin_bp, url_prefix='/api/admin')  # 注册管理员路由
     app.register_blueprint(logs_bp, url_prefix='/api/logs')    # 注册日志路由
     
+    # 请求耗时与SQL/MongoDB计时，输出 /metrics 和 Server-Timing 响应头
+    from app.utils.metrics import Metrics
+    Metrics.init_app(app)
+    
+    # 查询预算检查（测试/预发环境），依赖上面的请求计时
+    from app.utils.query_budget import QueryBudget
+    QueryBudget.init_app(app)
+    
+    # 配置了只读从库时，写请求的响应返回 X-Read-After，供客户端在之后的请求中回传
+    from app.utils.db import replicas
+    if replicas:
+        from app.utils.replicas import ReadYourWrites
+        ReadYourWrites.init_app(app)
+    
+    # 按路由限流，超限请求在进入视图前被拒绝
+    from app.utils.rate_limit import RateLimiter
+    RateLimiter.init_app(app)
+    
+    # 预热：建立连接、加载热点数据（含排行榜），完成后才标记为就绪
+    if Config.WARMUP_ENABLED:
+        from app.utils.warmup import Warmup
+        Warmup.run()
+    
+    Lifecycle.mark_ready()
     return app
\ No newline at end of file
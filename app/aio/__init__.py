@@ -0,0 +1,47 @@
+from quart import Quart, jsonify
+from quart_cors import cors
+from app.config import Config
+
+def create_async_app():
+    """
+    异步模式：只包含高并发的读路径和测验提交，其余接口仍由同步应用处理（见 asgi.py）
+    """
+    app = Quart(__name__)
+    app.config.from_object(Config)
+
+    # 启用CORS
+    app = cors(app, allow_origin="*")
+
+    from app.aio.db import AsyncDB
+    from app.aio.mongo import AsyncMongo
+
+    # 连接池必须在服务的事件循环中创建
+    @app.before_serving
+    async def open_pools():
+        await AsyncDB.init()
+        AsyncMongo.init()
+
+    @app.after_serving
+    async def close_pools():
+        await AsyncDB.close()
+        AsyncMongo.close()
+
+    # 健康检查
+    @app.route('/health')
+    async def health():
+        return jsonify({"status": "healthy", "service": "English Learning System", "mode": "async"})
+
+    # 注册蓝图，前缀与同步应用一致
+    from app.aio.learning import learning_bp
+    from app.aio.quiz import quiz_bp
+    from app.aio.community import community_bp
+    from app.aio.admin import admin_bp
+    from app.aio.logs import logs_bp
+
+    app.register_blueprint(learning_bp, url_prefix='/api/learning')
+    app.register_blueprint(quiz_bp, url_prefix='/api/quiz')
+    app.register_blueprint(community_bp, url_prefix='/api/community')
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    app.register_blueprint(logs_bp, url_prefix='/api/logs')
+
+    return app
@@ -0,0 +1,60 @@
+from quart import Blueprint, jsonify
+from app.schemas.response import success_response, error_response
+from app.aio.auth import admin_required
+from app.aio.db import gather_one
+
+admin_bp = Blueprint('admin', __name__)
+
+@admin_bp.route('/statistics', methods=['GET'])
+@admin_required
+async def get_statistics():
+    """获取系统统计数据（九项统计互不依赖，各取一个连接并发执行）"""
+    try:
+        (users, vocab, grammar, listening, quiz, attempts,
+         posts, comments, today) = await gather_one(
+            # 用户统计
+            """
+                SELECT
+                    COUNT(*) as total_users,
+                    SUM(CASE WHEN role = 'admin' THEN 1 ELSE 0 END) as admin_count,
+                    SUM(CASE WHEN role = 'student' THEN 1 ELSE 0 END) as student_count
+                FROM user_profile
+            """,
+            # 学习资源统计
+            "SELECT COUNT(*) as total FROM vocab",
+            "SELECT COUNT(*) as total FROM grammar",
+            "SELECT COUNT(*) as total FROM listening",
+            # 测验统计
+            "SELECT COUNT(*) as total FROM quiz",
+            "SELECT COUNT(*) as total FROM quiz_result",
+            # 社区统计
+            """
+                SELECT
+                    COUNT(*) as total_posts,
+                    SUM(CASE WHEN status = 'pending' THEN 1 ELSE 0 END) as pending_posts,
+                    SUM(CASE WHEN status = 'approved' THEN 1 ELSE 0 END) as approved_posts
+                FROM post
+            """,
+            "SELECT COUNT(*) as total FROM comment",
+            # 今日新增用户
+            """
+                SELECT COUNT(*) as today_users
+                FROM user_auth
+                WHERE DATE(created_at) = CURDATE()
+            """
+        )
+
+        return jsonify(success_response({
+            'users': users,
+            'vocab_count': vocab['total'],
+            'grammar_count': grammar['total'],
+            'listening_count': listening['total'],
+            'quiz_count': quiz['total'],
+            'quiz_attempts': attempts['total'],
+            'posts': posts,
+            'comment_count': comments['total'],
+            'today_users': today['today_users']
+        }))
+
+    except Exception as e:
+        return error_response(f"获取统计数据失败: {str(e)}", 500)
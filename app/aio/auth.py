@@ -0,0 +1,48 @@
+import jwt
+from functools import wraps
+from quart import request
+from app.config import Config
+from app.schemas.response import error_response
+from app.aio.db import fetch_one
+
+def verify_token(token):
+    """验证JWT token（与 app.utils.auth_utils.verify_token 相同，不依赖Flask应用上下文）"""
+    try:
+        payload = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=['HS256'])
+        return payload['user_id']
+    except jwt.InvalidTokenError:
+        return None
+
+def auth_required(f):
+    """身份验证装饰器"""
+    @wraps(f)
+    async def decorated_function(*args, **kwargs):
+        token = request.headers.get('Authorization', '').replace('Bearer ', '')
+        user_id = verify_token(token)
+
+        if not user_id:
+            return error_response("未授权访问", 401)
+
+        user = await fetch_one("""
+            SELECT nickname, role FROM user_profile WHERE user_id = %s
+        """, (user_id,))
+        if not user:
+            return error_response("用户不存在", 404)
+
+        request.current_user = {
+            'user_id': user_id,
+            'nickname': user['nickname'],
+            'role': user['role']
+        }
+        return await f(*args, **kwargs)
+    return decorated_function
+
+def admin_required(f):
+    """管理员权限装饰器"""
+    @wraps(f)
+    @auth_required
+    async def decorated_function(*args, **kwargs):
+        if request.current_user['role'] != 'admin':
+            return error_response("需要管理员权限", 403)
+        return await f(*args, **kwargs)
+    return decorated_function
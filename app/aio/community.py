@@ -0,0 +1,53 @@
+import asyncio
+from quart import Blueprint, request, jsonify
+from app.schemas.response import success_response, error_response
+from app.aio.db import fetch_one, fetch_all, attach_nicknames
+
+community_bp = Blueprint('community', __name__)
+
+@community_bp.route('/posts', methods=['GET'])
+async def get_posts():
+    """获取帖子列表"""
+    category = request.args.get('category')
+    status = request.args.get('status', 'approved')
+    page = int(request.args.get('page', 1))
+    per_page = int(request.args.get('per_page', 20))
+    offset = (page - 1) * per_page
+
+    try:
+        # 构建查询条件
+        conditions = ["p.status = %s"]
+        params = [status]
+
+        if category:
+            conditions.append("p.category = %s")
+            params.append(category)
+
+        where_clause = " AND ".join(conditions)
+
+        # 总数与当前页并发查询
+        count, posts = await asyncio.gather(
+            fetch_one(f"""
+                SELECT COUNT(*) as total
+                FROM post p
+                WHERE {where_clause}
+            """, params),
+            fetch_all(f"""
+                SELECT p.*,
+                       (SELECT COUNT(*) FROM comment WHERE post_id = p.post_id) as comment_count
+                FROM post p
+                WHERE {where_clause}
+                ORDER BY p.created_at DESC
+                LIMIT %s OFFSET %s
+            """, params + [per_page, offset])
+        )
+
+        return jsonify(success_response({
+            "total": count['total'],
+            "page": page,
+            "per_page": per_page,
+            "data": await attach_nicknames(list(posts))
+        }))
+
+    except Exception as e:
+        return error_response(f"获取帖子列表失败: {str(e)}", 500)
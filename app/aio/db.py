@@ -0,0 +1,91 @@
+import asyncio
+import aiomysql
+from contextlib import asynccontextmanager
+from app.config import Config
+from app.utils.nickname import NicknameResolver
+from app.utils.replicas import ReadYourWrites
+
+class AsyncDB:
+    """aiomysql连接池，服务启动时在事件循环中创建"""
+
+    _pool = None
+
+    @classmethod
+    async def init(cls):
+        if cls._pool is None:
+            config = dict(Config.DB_CONFIG)
+            config['db'] = config.pop('database')
+            # 与同步连接池一致使用autocommit，写事务由get_db_cursor显式开始
+            cls._pool = await aiomysql.create_pool(
+                minsize=1, maxsize=Config.ASYNC_DB_POOL_SIZE, autocommit=True,
+                pool_recycle=Config.DB_POOL_RECYCLE, **config)
+
+    @classmethod
+    async def close(cls):
+        if cls._pool is not None:
+            cls._pool.close()
+            await cls._pool.wait_closed()
+            cls._pool = None
+
+    @classmethod
+    def pool(cls):
+        if cls._pool is None:
+            raise RuntimeError("异步数据库连接池尚未初始化")
+        return cls._pool
+
+@asynccontextmanager
+async def get_db_cursor(commit=True):
+    """获取异步数据库游标的上下文管理器"""
+    async with AsyncDB.pool().acquire() as connection:
+        async with connection.cursor(aiomysql.DictCursor) as cursor:
+            if commit:
+                await connection.begin()
+            try:
+                yield cursor
+                if commit:
+                    await connection.commit()
+            except Exception:
+                if commit:
+                    await connection.rollback()
+                raise
+
+async def fetch_one(sql, args=None):
+    """单条只读查询（独立取连接，可与其他查询并发）"""
+    async with get_db_cursor(commit=False) as cursor:
+        await cursor.execute(sql, args)
+        return await cursor.fetchone()
+
+async def fetch_all(sql, args=None):
+    async with get_db_cursor(commit=False) as cursor:
+        await cursor.execute(sql, args)
+        return await cursor.fetchall()
+
+async def gather_one(*queries):
+    """
+    并发执行多条互不依赖的查询，每条占用一个连接
+    :param queries: (sql, args) 或 sql
+    :return: 各查询的首行
+    """
+    return await asyncio.gather(*(
+        fetch_one(*query) if isinstance(query, tuple) else fetch_one(query) for query in queries))
+
+async def attach_nicknames(rows, key='user_id', field='nickname'):
+    """与 NicknameResolver.attach 相同，共用其缓存，缺失部分异步查询"""
+    nicknames, missing = NicknameResolver.from_cache(row[key] for row in rows)
+    if missing:
+        fetched = {row['user_id']: row['nickname']
+                   for row in await fetch_all(NicknameResolver.lookup_sql(len(missing)), missing)}
+        NicknameResolver.remember(fetched)
+        nicknames.update(fetched)
+    for row in rows:
+        row[field] = nicknames.get(row[key])
+    return rows
+
+def note_write(response, user_id):
+    """
+    记录用户的写入：同步应用配置了从库时，响应带上 X-Read-After，
+    该用户之后落到同步应用（其他进程）的读取在截止时间前走主库
+    """
+    if Config.DB_REPLICAS:
+        ReadYourWrites.set_header(response, ReadYourWrites.pin({f"u{user_id}"}))
+    return response
@@ -0,0 +1,70 @@
+import asyncio
+from quart import Blueprint, request, jsonify
+from app.schemas.response import success_response, error_response
+from app.aio.db import fetch_one, fetch_all
+
+learning_bp = Blueprint('learning', __name__)
+
+@learning_bp.route('/vocab', methods=['GET'])
+async def get_vocab_list():
+    """获取词汇列表"""
+    level = request.args.get('level', 'A1')
+    page = int(request.args.get('page', 1))
+    per_page = int(request.args.get('per_page', 20))
+    offset = (page - 1) * per_page
+
+    try:
+        # 总数与当前页互不依赖，并发查询
+        count, vocab_list = await asyncio.gather(
+            fetch_one("SELECT COUNT(*) as total FROM vocab WHERE level = %s", (level,)),
+            fetch_all("""
+                SELECT word_id, word, meaning, example, level
+                FROM vocab
+                WHERE level = %s
+                LIMIT %s OFFSET %s
+            """, (level, per_page, offset))
+        )
+
+        return jsonify(success_response({
+            "total": count['total'],
+            "page": page,
+            "per_page": per_page,
+            "data": vocab_list
+        }))
+
+    except Exception as e:
+        return error_response(f"获取词汇列表失败: {str(e)}", 500)
+
+@learning_bp.route('/grammar', methods=['GET'])
+async def get_grammar_list():
+    """获取语法教程列表"""
+    level = request.args.get('level', 'A1')
+
+    try:
+        grammar_list = await fetch_all("""
+            SELECT grammar_id, title, content, level
+            FROM grammar
+            WHERE level = %s
+        """, (level,))
+
+        return jsonify(success_response(grammar_list))
+
+    except Exception as e:
+        return error_response(f"获取语法列表失败: {str(e)}", 500)
+
+@learning_bp.route('/listening', methods=['GET'])
+async def get_listening_list():
+    """获取听力材料列表"""
+    level = request.args.get('level', 'A1')
+
+    try:
+        listening_list = await fetch_all("""
+            SELECT listen_id, title, audio_url, transcript, level
+            FROM listening
+            WHERE level = %s
+        """, (level,))
+
+        return jsonify(success_response(listening_list))
+
+    except Exception as e:
+        return error_response(f"获取听力列表失败: {str(e)}", 500)
@@ -0,0 +1,178 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+from quart import Blueprint, request, jsonify
+from app.schemas.response import success_response, error_response
+from app.models.activity_log import ActivityLog
+from app.aio.auth import auth_required, admin_required
+from app.aio.mongo import AsyncMongo
+from app.aio.db import attach_nicknames
+import logging
+
+logger = logging.getLogger(__name__)
+
+logs_bp = Blueprint('logs', __name__)
+
+async def find_logs(query, limit, skip=0, start_date=None, end_date=None):
+    """按时间倒序逐月查询日志并补充昵称（与ActivityLog._find一致）"""
+    logs = []
+    for name in ActivityLog.partitions(start_date, end_date):
+        collection = AsyncMongo.collection(name)
+        if skip:
+            matched = await collection.count_documents(query, limit=skip + 1)
+            if matched <= skip:
+                skip -= matched
+                continue
+        cursor = collection.find(query).sort('t', -1).skip(skip).limit(limit - len(logs))
+        skip = 0
+        logs.extend(ActivityLog.decode(document) for document in await cursor.to_list(length=limit - len(logs)))
+        if len(logs) >= limit:
+            break
+    return await attach_nicknames(logs)
+
+@logs_bp.route('/my-logs', methods=['GET'])
+@auth_required
+async def get_my_logs():
+    """获取当前用户的活动日志"""
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = min(int(request.args.get('per_page', 20)), 100)
+        skip = (page - 1) * per_page
+
+        user_id = request.current_user['user_id']
+        logs = await find_logs({'u': user_id}, per_page, skip)
+
+        return jsonify(success_response({
+            'logs': logs,
+            'page': page,
+            'per_page': per_page
+        }))
+
+    except Exception as e:
+        return error_response(f"获取活动日志失败: {str(e)}", 500)
+
+@logs_bp.route('/user/<int:user_id>/logs', methods=['GET'])
+@admin_required
+async def get_user_logs(user_id):
+    """管理员获取指定用户的活动日志"""
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = min(int(request.args.get('per_page', 20)), 100)
+        skip = (page - 1) * per_page
+
+        logs = await find_logs({'u': user_id}, per_page, skip)
+
+        return jsonify(success_response({
+            'logs': logs,
+            'page': page,
+            'per_page': per_page,
+            'user_id': user_id
+        }))
+
+    except Exception as e:
+        return error_response(f"获取用户活动日志失败: {str(e)}", 500)
+
+@logs_bp.route('/by-action/<action_type>', methods=['GET'])
+@admin_required
+async def get_logs_by_action(action_type):
+    """根据操作类型获取日志"""
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = min(int(request.args.get('per_page', 50)), 100)
+        skip = (page - 1) * per_page
+
+        logs = await find_logs({'a': ActivityLog.action_code(action_type)}, per_page, skip)
+
+        return jsonify(success_response({
+            'logs': logs,
+            'action_type': action_type,
+            'page': page,
+            'per_page': per_page
+        }))
+
+    except Exception as e:
+        return error_response(f"获取操作日志失败: {str(e)}", 500)
+
+@logs_bp.route('/statistics', methods=['GET'])
+@admin_required
+async def get_log_statistics():
+    """获取日志统计信息"""
+    try:
+        start_date_str = request.args.get('start_date')
+        end_date_str = request.args.get('end_date')
+
+        start_date = None
+        end_date = None
+
+        if start_date_str:
+            try:
+                start_date = datetime.fromisoformat(start_date_str)
+            except ValueError:
+                return error_response("开始日期格式错误", 400)
+
+        if end_date_str:
+            try:
+                end_date = datetime.fromisoformat(end_date_str)
+            except ValueError:
+                return error_response("结束日期格式错误", 400)
+
+        partitions = ActivityLog.partitions(start_date, end_date)
+        today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+        async def aggregate():
+            if not partitions:
+                return []
+            pipeline = ActivityLog.statistics_pipeline(start_date, end_date, partitions[1:])
+            rows = await AsyncMongo.collection(partitions[0]).aggregate(pipeline).to_list(length=None)
+            return ActivityLog.decode_statistics(rows)
+
+        async def total():
+            counts = await asyncio.gather(*(AsyncMongo.collection(name).estimated_document_count()
+                                            for name in ActivityLog.partitions()))
+            return sum(counts)
+
+        today_partition = ActivityLog.partition_for(today_start)
+        try:
+            # 分组统计、总数、今日数三者并发
+            result, total_logs, today_logs = await asyncio.gather(
+                aggregate(),
+                total(),
+                AsyncMongo.collection(today_partition).count_documents({'t': {'$gte': today_start}})
+            )
+            stats = {
+                'total_logs': total_logs,
+                'today_logs': today_logs,
+                'action_type_stats': result
+            }
+        except Exception as e:
+            logger.error(f"获取日志统计失败: {e}")
+            stats = {}
+
+        return jsonify(success_response(stats))
+
+    except Exception as e:
+        return error_response(f"获取日志统计失败: {str(e)}", 500)
+
+@logs_bp.route('/recent-activities', methods=['GET'])
+@auth_required
+async def get_recent_activities():
+    """获取最近的活动（用于仪表板显示）"""
+    try:
+        limit = min(int(request.args.get('limit', 10)), 50)
+
+        if request.current_user['role'] == 'admin':
+            # 管理员可以看到所有用户最近7天的活动
+            now = datetime.now(timezone.utc)
+            start_date = now - timedelta(days=7)
+            logs = await find_logs({'t': {'$gte': start_date, '$lte': now}}, limit,
+                                   start_date=start_date, end_date=now)
+        else:
+            # 普通用户只能看到自己的活动
+            logs = await find_logs({'u': request.current_user['user_id']}, limit)
+
+        return jsonify(success_response({
+            'recent_activities': logs,
+            'limit': limit
+        }))
+
+    except Exception as e:
+        return error_response(f"获取最近活动失败: {str(e)}", 500)
@@ -0,0 +1,27 @@
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.config import Config
+
+class AsyncMongo:
+    """motor客户端，服务启动时在事件循环中创建"""
+
+    _client = None
+    _db = None
+
+    @classmethod
+    def init(cls):
+        if cls._client is None:
+            cls._client = AsyncIOMotorClient(Config.MONGO_URI, maxPoolSize=Config.ASYNC_MONGO_POOL_SIZE)
+            cls._db = cls._client.get_default_database()
+
+    @classmethod
+    def close(cls):
+        if cls._client is not None:
+            cls._client.close()
+            cls._client = None
+            cls._db = None
+
+    @classmethod
+    def collection(cls, name):
+        if cls._db is None:
+            raise RuntimeError("异步MongoDB客户端尚未初始化")
+        return cls._db[name]
@@ -0,0 +1,116 @@
+import asyncio
+from quart import Blueprint, request, jsonify
+from app.schemas.response import success_response, error_response
+from app.routes.quiz import grade_answers
+from app.utils.answer_batch import AnswerBuffer
+from app.utils.leaderboard import Leaderboard
+from app.models.item_stats import ItemStats
+from app.aio.db import get_db_cursor, fetch_one, fetch_all, note_write
+
+quiz_bp = Blueprint('quiz', __name__)
+
+@quiz_bp.route('/list', methods=['GET'])
+async def get_quiz_list():
+    """获取测验列表"""
+    quiz_type = request.args.get('type')
+
+    try:
+        if quiz_type:
+            quiz_list = await fetch_all("""
+                SELECT quiz_id, quiz_type, title, total_points
+                FROM quiz
+                WHERE quiz_type = %s
+            """, (quiz_type,))
+        else:
+            quiz_list = await fetch_all("""
+                SELECT quiz_id, quiz_type, title, total_points
+                FROM quiz
+            """)
+
+        return jsonify(success_response(quiz_list))
+
+    except Exception as e:
+        return error_response(f"获取测验列表失败: {str(e)}", 500)
+
+@quiz_bp.route('/<int:quiz_id>/questions', methods=['GET'])
+async def get_quiz_questions(quiz_id):
+    """获取测验题目"""
+    try:
+        quiz_info, questions = await asyncio.gather(
+            fetch_one("""
+                SELECT quiz_id, quiz_type, title, total_points
+                FROM quiz
+                WHERE quiz_id = %s
+            """, (quiz_id,)),
+            fetch_all("""
+                SELECT question_id, question, option_a, option_b,
+                       option_c, option_d, score
+                FROM quiz_question
+                WHERE quiz_id = %s
+            """, (quiz_id,))
+        )
+        if not quiz_info:
+            return error_response("测验不存在", 404)
+
+        return jsonify(success_response({
+            "quiz": quiz_info,
+            "questions": questions
+        }))
+
+    except Exception as e:
+        return error_response(f"获取测验题目失败: {str(e)}", 500)
+
+@quiz_bp.route('/<int:quiz_id>/submit', methods=['POST'])
+async def submit_quiz(quiz_id):
+    """提交测验答案"""
+    data = await request.get_json()
+    user_id = data.get('user_id')
+    answers = data.get('answers', {})  # {question_id: selected_option}
+
+    if not user_id:
+        return error_response("用户ID不能为空")
+
+    try:
+        async with get_db_cursor() as cursor:
+            # 获取正确答案
+            await cursor.execute("""
+                SELECT question_id, correct_opt, score
+                FROM quiz_question
+                WHERE quiz_id = %s
+            """, (quiz_id,))
+
+            correct_answers = {q['question_id']: q for q in await cursor.fetchall()}
+
+            total_score, correct_count, answer_rows = grade_answers(correct_answers, answers)
+            total_count = len(correct_answers)
+
+            # 保存测验结果
+            await cursor.execute("""
+                INSERT INTO quiz_result (user_id, quiz_id, score, correct_cnt, total_cnt)
+                VALUES (%s, %s, %s, %s, %s)
+            """, (user_id, quiz_id, total_score, correct_count, total_count))
+
+            # 使用MySQL函数计算准确率和等级（一次往返）
+            await cursor.execute("""
+                SELECT fn_calc_accuracy(%s, %s) as accuracy,
+                       fn_get_level(fn_calc_accuracy(%s, %s)) as level
+            """, (correct_count, total_count, correct_count, total_count))
+            result = await cursor.fetchone()
+            accuracy = float(result['accuracy'])
+            level = result['level']
+
+        # 都只写内存（汇总在后台线程），不阻塞事件循环
+        AnswerBuffer.add(accuracy, answer_rows)
+        ItemStats.schedule()
+        Leaderboard.record(user_id, quiz_id, total_score)
+
+        return note_write(jsonify(success_response({
+            "score": total_score,
+            "correct_count": correct_count,
+            "total_count": total_count,
+            "accuracy": accuracy,
+            "level": level
+        }, "测验提交成功")), user_id)
+
+    except Exception as e:
+        return error_response(f"提交测验失败: {str(e)}", 500)
@@ -1,8 +1,19 @@
+import json
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+def _replica_configs(endpoints, primary):
+    """解析 host[:port] 列表，用户名、密码、库名与主库相同"""
+    configs = []
+    for endpoint in endpoints.split(','):
+        endpoint = endpoint.strip()
+        if endpoint:
+            host, _, port = endpoint.partition(':')
+            configs.append(dict(primary, host=host, port=int(port or primary['port'])))
+    return configs
+
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key')
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key')
@@ -17,5 +28,152 @@ class Config:
         'charset': 'utf8mb4'
     }
 
+    # MySQL连接池：等待空闲连接的超时（秒）、空闲超过多少秒的连接在取出时先ping
+    # 连接数 DB_POOL_SIZE 由线程数推算，见 FANOUT_WORKERS 之后
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5.0))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 300))
+
+    # MySQL只读从库（逗号分隔的 host[:port]），为空时全部读写走主库
+    # 选择策略 round_robin 或 least_connections
+    DB_REPLICAS = _replica_configs(os.getenv('DB_REPLICAS', ''), DB_CONFIG)
+    REPLICA_STRATEGY = os.getenv('REPLICA_STRATEGY', 'round_robin').lower()
+    # 复制延迟超过多少秒不再使用该从库；延迟检查间隔（秒）；连接失败的从库摘除多久（秒）
+    REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', 5))
+    REPLICA_CHECK_INTERVAL = float(os.getenv('REPLICA_CHECK_INTERVAL', 5))
+    REPLICA_EJECT_SECONDS = float(os.getenv('REPLICA_EJECT_SECONDS', 30))
+    # 会话写入后多少秒内的读取走主库（写后读一致性），应不小于 REPLICA_MAX_LAG
+    REPLICA_RYW_SECONDS = float(os.getenv('REPLICA_RYW_SECONDS', 5))
+
     # MongoDB配置
-    MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/language_app_logs')
\ No newline at end of file
+    MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/language_app_logs')
+
+    # 活动日志按月分集合（activity_logs_YYYYMM）：MongoDB中保留的月数（含当月，至少1），
+    # 更早的月份由归档任务导出为压缩NDJSON后删除；归档文件目录及保留月数（0表示永久保留）
+    LOG_RETENTION_MONTHS = max(1, int(os.getenv('LOG_RETENTION_MONTHS', 12)))
+    LOG_ARCHIVE_DIR = os.getenv('LOG_ARCHIVE_DIR', os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'log_archive'))
+    LOG_ARCHIVE_RETENTION_MONTHS = int(os.getenv('LOG_ARCHIVE_RETENTION_MONTHS', 0))
+    # 归档压缩级别（安装 zstandard 时使用zstd，否则使用gzip）
+    LOG_ARCHIVE_LEVEL = int(os.getenv('LOG_ARCHIVE_LEVEL', 9))
+
+    # 内存搜索索引刷新间隔（秒），0表示只在启动后首次使用时加载
+    SEARCH_INDEX_REFRESH = int(os.getenv('SEARCH_INDEX_REFRESH', 300))
+
+    # 语法/听力全文检索索引的持久化目录，日志累计多少条后重写快照，摘要片段长度
+    SEARCH_INDEX_DIR = os.getenv('SEARCH_INDEX_DIR', os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'search'))
+    SEARCH_JOURNAL_COMPACT_SIZE = int(os.getenv('SEARCH_JOURNAL_COMPACT_SIZE', 1000))
+    SEARCH_SNIPPET_LENGTH = int(os.getenv('SEARCH_SNIPPET_LENGTH', 120))
+
+    # 帖子热度排行：发布时间每晚这么多秒，相当于评论数少一个数量级
+    HOT_DECAY_SECONDS = int(os.getenv('HOT_DECAY_SECONDS', 45000))
+
+    # 昵称缓存容量与过期时间（秒）；修改昵称通过变更日志通知其他worker，不必等缓存过期
+    NICKNAME_CACHE_SIZE = int(os.getenv('NICKNAME_CACHE_SIZE', 10000))
+    NICKNAME_CACHE_TTL = int(os.getenv('NICKNAME_CACHE_TTL', 300))
+
+    # 学习进度写后合并：关闭后每次更新直接写库；开启时最长延迟FLUSH_INTERVAL秒，
+    # 缓冲的用户数达到FLUSH_THRESHOLD时提前写入，进程退出时写入剩余部分
+    PROGRESS_WRITE_BEHIND = os.getenv('PROGRESS_WRITE_BEHIND', 'True').lower() == 'true'
+    PROGRESS_FLUSH_INTERVAL = float(os.getenv('PROGRESS_FLUSH_INTERVAL', 1.0))
+    PROGRESS_FLUSH_THRESHOLD = int(os.getenv('PROGRESS_FLUSH_THRESHOLD', 500))
+    # 缓冲的用户数上限，达到后新的用户同步写库（数据库不可用时缓冲不会无限增长）
+    PROGRESS_BUFFER_MAX = int(os.getenv('PROGRESS_BUFFER_MAX', 20000))
+
+    # 自适应组卷：题目难度统计刷新间隔（秒），按种子缓存的试卷数，试卷令牌有效期（秒）
+    QUIZ_BANK_REFRESH = int(os.getenv('QUIZ_BANK_REFRESH', 600))
+    QUIZ_CACHE_SIZE = int(os.getenv('QUIZ_CACHE_SIZE', 1000))
+    QUIZ_TOKEN_TTL = int(os.getenv('QUIZ_TOKEN_TTL', 7200))
+
+    # 逐题作答记录：累计多少条作答或最长多少秒写入一个列式批次
+    ANSWER_BATCH_SIZE = int(os.getenv('ANSWER_BATCH_SIZE', 2000))
+    ANSWER_FLUSH_INTERVAL = float(os.getenv('ANSWER_FLUSH_INTERVAL', 5.0))
+    # 题目统计后台汇总间隔（秒），0为只通过管理接口手动汇总
+    ITEM_STATS_INTERVAL = float(os.getenv('ITEM_STATS_INTERVAL', 60))
+
+    # 排行榜：启动时是否从MySQL构建，定时重建间隔（秒），用于合并其他进程的提交
+    LEADERBOARD_PRELOAD = os.getenv('LEADERBOARD_PRELOAD', 'True').lower() == 'true'
+    LEADERBOARD_REFRESH = int(os.getenv('LEADERBOARD_REFRESH', 300))
+
+    # 限流：存储为 memory（进程内）或 redis://...（多进程共享，需要安装redis）；
+    # 只有部署在可信反向代理之后才按X-Forwarded-For识别客户端IP
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+    RATE_LIMIT_STORAGE = os.getenv('RATE_LIMIT_STORAGE', 'memory')
+    RATE_LIMIT_TRUST_PROXY = os.getenv('RATE_LIMIT_TRUST_PROXY', 'False').lower() == 'true'
+    RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', 100000))
+
+    # 各路由的限流规则：端点 -> [(维度, 周期内次数, 周期秒数)]
+    # 维度：ip、email（请求体中的邮箱）、user（token中的用户，未登录时按IP）
+    # 可用环境变量 RATE_LIMIT_RULES 以JSON覆盖
+    RATE_LIMIT_RULES = json.loads(os.getenv('RATE_LIMIT_RULES', 'null')) or {
+        'auth.login': [('ip', 20, 60), ('email', 5, 60)],
+        'auth.register': [('ip', 5, 60)],
+        'logs.create_log': [('user', 30, 60)],
+        'logs.log_quiz_attempt': [('user', 60, 60)],
+        'logs.log_learning_progress': [('user', 120, 60)],
+        'community.create_post': [('user', 10, 60)],
+        'community.create_comment': [('user', 30, 60)]
+    }
+
+    # 生产部署（gunicorn.conf.py）：监听地址、工作进程数、每进程线程数、
+    # 请求超时与退出时等待处理中请求的时间（秒）
+    SERVER_BIND = os.getenv('SERVER_BIND', '0.0.0.0:5000')
+    SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', (os.cpu_count() or 1) * 2 + 1))
+    SERVER_THREADS = int(os.getenv('SERVER_THREADS', 4))
+    SERVER_TIMEOUT = int(os.getenv('SERVER_TIMEOUT', 30))
+    SERVER_GRACEFUL_TIMEOUT = int(os.getenv('SERVER_GRACEFUL_TIMEOUT', 30))
+
+    # 健康检查：单项依赖检查超时（秒），结果缓存时间（秒），就绪检查必须可用的依赖
+    HEALTH_CHECK_TIMEOUT = float(os.getenv('HEALTH_CHECK_TIMEOUT', 1.0))
+    HEALTH_CACHE_TTL = float(os.getenv('HEALTH_CACHE_TTL', 2.0))
+    HEALTH_REQUIRED = [name.strip() for name in os.getenv('HEALTH_REQUIRED', 'mysql,mongo').split(',') if name.strip()]
+
+    # 请求级计时：关闭后不包装游标、不注册Mongo监听；Server-Timing响应头；慢查询阈值（毫秒）
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    SERVER_TIMING = os.getenv('SERVER_TIMING', 'True').lower() == 'true'
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 100))
+    # /metrics 访问控制：允许直接访问的来源地址（IP或网段，按连接对端地址判断，不信任X-Forwarded-For），
+    # 其他来源需携带 Authorization: Bearer <METRICS_TOKEN>；未配置令牌时只允许列表中的地址
+    METRICS_ALLOW = [item.strip() for item in os.getenv('METRICS_ALLOW', '127.0.0.1,::1').split(',') if item.strip()]
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+    # 查询预算（用于测试和预发环境，依赖 METRICS_ENABLED）：
+    # off 不检查，warn 记录警告日志，raise 抛出 QueryBudgetExceeded（请求返回500）
+    # 每个请求默认最多执行的SQL条数；同一归一化语句最多执行次数，超过视为N+1
+    QUERY_BUDGET_MODE = os.getenv('QUERY_BUDGET_MODE', 'off').lower()
+    QUERY_BUDGET_DEFAULT = int(os.getenv('QUERY_BUDGET_DEFAULT', 10))
+    QUERY_REPEAT_LIMIT = int(os.getenv('QUERY_REPEAT_LIMIT', 3))
+
+    # 各端点的SQL条数预算（含鉴权查询），未列出的使用 QUERY_BUDGET_DEFAULT
+    # 可用环境变量 QUERY_BUDGETS 以JSON覆盖
+    QUERY_BUDGETS = json.loads(os.getenv('QUERY_BUDGETS', 'null')) or {
+        'admin.get_statistics': 12
+    }
+
+    # 目录缓存（各等级词汇数、测验列表、测验标准答案）：刷新间隔（秒），最多缓存的标准答案测验数
+    CATALOG_REFRESH = int(os.getenv('CATALOG_REFRESH', 300))
+    CATALOG_ANSWER_KEYS = int(os.getenv('CATALOG_ANSWER_KEYS', 200))
+
+    # 启动预热：是否启用，执行的步骤（mysql, replicas, mongo, catalog, answer_keys, leaderboard），
+    # 预先建立的数据库连接数，预加载标准答案的测验数（按提交次数），单个步骤最长等待秒数
+    WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', 'True').lower() == 'true'
+    WARMUP_STEPS = [name.strip() for name in
+                    os.getenv('WARMUP_STEPS', 'mysql,replicas,mongo,catalog,answer_keys,leaderboard,vocab_index').split(',') if name.strip()]
+    WARMUP_DB_CONNECTIONS = int(os.getenv('WARMUP_DB_CONNECTIONS', SERVER_THREADS))
+    WARMUP_QUIZZES = int(os.getenv('WARMUP_QUIZZES', 20))
+    WARMUP_STEP_TIMEOUT = float(os.getenv('WARMUP_STEP_TIMEOUT', 5.0))
+
+    # 多查询接口的并发执行（app/utils/fanout.py）：每个进程共用的线程数、每项查询最长等待秒数
+    # 设为1时按顺序执行
+    FANOUT_WORKERS = int(os.getenv('FANOUT_WORKERS', 6))
+    FANOUT_TIMEOUT = float(os.getenv('FANOUT_TIMEOUT', 5.0))
+
+    # MySQL每个进程的连接数：每个请求线程最多同时持有2个连接（部分请求会嵌套取连接），
+    # 扇出线程池每个线程1个；默认按此计算，手动配置得更小时启动时记录警告
+    # 每个从库的连接池大小默认与主库相同
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', SERVER_THREADS * 2 + FANOUT_WORKERS))
+    DB_REPLICA_POOL_SIZE = int(os.getenv('DB_REPLICA_POOL_SIZE', DB_POOL_SIZE))
+
+    # 异步模式（asgi.py）：每个进程的aiomysql连接池上限、MongoDB连接池上限
+    ASYNC_DB_POOL_SIZE = int(os.getenv('ASYNC_DB_POOL_SIZE', 20))
+    ASYNC_MONGO_POOL_SIZE = int(os.getenv('ASYNC_MONGO_POOL_SIZE', 100))
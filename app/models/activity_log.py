@@ -1,35 +1,230 @@
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional, List
-from app.utils.mongo import get_mongo_collection
+from typing import Dict, Any, Optional, List, Union
+from app.config import Config
+from app.utils.mongo import MongoDB, get_mongo_collection
+from app.utils.fanout import FanOut
+from app.utils.nickname import NicknameResolver
 import logging
 
 logger = logging.getLogger(__name__)
 
 class ActivityLog:
-    """用户活动日志模型"""
+    """
+    用户活动日志模型
+    日志按UTC月份写入 activity_logs_YYYYMM，查询按日期范围只访问涉及的月份，
+    未指定范围时从当月向前逐月查询、取满即止，查询开销与历史数据量无关；
+    MongoDB中只保留最近 LOG_RETENTION_MONTHS 个月，更早的月份见 app/utils/log_archive.py
 
+    存储使用紧凑编码：{u: 用户ID, a: 操作类型编号, t: 时间, d: 详细信息（为空时省略）}，
+    不保存昵称（读取时由 NicknameResolver 批量补充当前昵称）；接口返回的字段不变
+    """
+
+    # 分月集合名前缀；同名的旧集合（未分区时的全部日志）由 LogArchive.migrate_legacy 迁移
     COLLECTION_NAME = 'activity_logs'
 
+    # 内置操作类型的存储编号，新增类型只能追加；其他（自定义）操作类型按原字符串存储
+    ACTION_CODES = {
+        'user_login': 1,
+        'user_logout': 2,
+        'quiz_attempt': 3,
+        'learning_progress': 4,
+        'post_created': 5,
+        'comment_created': 6,
+        'admin_action': 7
+    }
+    ACTION_NAMES = {code: name for name, code in ACTION_CODES.items()}
+
+    # 分月集合的校验规则与索引，集合在当月首次写入时创建
+    VALIDATOR = {
+        '$jsonSchema': {
+            'bsonType': 'object',
+            'required': ['u', 'a', 't'],
+            'properties': {
+                '_id': {'bsonType': 'objectId'},
+                'u': {'bsonType': ['int', 'long']},
+                'a': {'bsonType': ['int', 'string']},
+                't': {'bsonType': 'date'},
+                'd': {'bsonType': 'object'}
+            },
+            'additionalProperties': False
+        }
+    }
+    INDEXES = [
+        [('u', 1), ('t', -1)],
+        [('a', 1), ('t', -1)],
+        [('t', -1)]
+    ]
+    # 紧凑编码之前的索引（完整字段名），升级已有集合时删除
+    LEGACY_INDEXES = {'user_id_1_timestamp_-1', 'action_type_1_timestamp_-1', 'timestamp_-1'}
+
+    _ensured = set()  # 本进程已确认创建的分月集合
+
+    @staticmethod
+    def month_index(date: datetime) -> int:
+        """月份序号：年*12+月-1"""
+        return date.year * 12 + date.month - 1
+
+    @classmethod
+    def partition_name(cls, month_index: int) -> str:
+        """月份序号对应的集合名"""
+        year, month = divmod(month_index, 12)
+        return f"{cls.COLLECTION_NAME}_{year:04d}{month + 1:02d}"
+
+    @classmethod
+    def partition_for(cls, date: datetime) -> str:
+        """日期所在月份的集合名"""
+        return cls.partition_name(cls.month_index(date))
+
+    @classmethod
+    def partition_month(cls, name: str) -> Optional[int]:
+        """集合名对应的月份序号，不是分月集合时返回None"""
+        suffix = name[len(cls.COLLECTION_NAME) + 1:]
+        if not name.startswith(cls.COLLECTION_NAME + '_') or len(suffix) != 6 or not suffix.isdigit():
+            return None
+        return int(suffix[:4]) * 12 + int(suffix[4:]) - 1
+
+    @classmethod
+    def partitions(cls, start_date: Optional[datetime] = None,
+                   end_date: Optional[datetime] = None) -> List[str]:
+        """
+        日期范围涉及的分月集合（按时间倒序），限于保留期内的月份
+        不带时区的日期按UTC处理
+        """
+        current = cls.month_index(datetime.now(timezone.utc))
+        upper = min(cls.month_index(end_date), current) if end_date else current
+        lower = current - Config.LOG_RETENTION_MONTHS + 1
+        if start_date:
+            lower = max(lower, cls.month_index(start_date))
+        return [cls.partition_name(month) for month in range(upper, lower - 1, -1)]
+
+    @classmethod
+    def ensure_partition(cls, name: str, database=None):
+        """
+        创建分月集合及其索引，每个进程每个集合只执行一次
+        集合已存在但校验规则不是当前的（升级前当月已有写入）时换成当前的校验规则和索引，
+        否则紧凑编码的文档会被旧校验规则拒绝。集合中已有的旧格式文档由 LogArchive.compact_partitions 转换
+        """
+        if name in cls._ensured:
+            return
+        from pymongo.errors import CollectionInvalid
+        database = database if database is not None else MongoDB.get_database()
+        options = cls._collection_options(database, name)
+        if options is None:
+            try:
+                database.create_collection(name, validator=cls.VALIDATOR,
+                                           validationLevel='moderate', validationAction='error')
+            except CollectionInvalid:
+                options = cls._collection_options(database, name)  # 其他进程同时创建
+        if options is not None and options.get('validator') != cls.VALIDATOR:
+            cls._upgrade_partition(database, name)
+        cls.create_indexes(database[name])
+        cls._ensured.add(name)
+
+    @staticmethod
+    def _collection_options(database, name: str) -> Optional[Dict]:
+        """已有集合的选项（含校验规则），集合不存在时返回None"""
+        for info in database.list_collections(filter={'name': name}):
+            return info.get('options', {})
+        return None
+
+    @classmethod
+    def _upgrade_partition(cls, database, name: str):
+        """
+        换成当前的校验规则并删除旧字段索引
+        collMod 需要 dbAdmin 权限，只有 readWrite 权限时记录一次警告（本进程不再重试），
+        由管理员执行 POST /api/logs/migrate-partitions 完成升级
+        """
+        from pymongo.errors import OperationFailure
+        try:
+            database.command('collMod', name, validator=cls.VALIDATOR,
+                             validationLevel='moderate', validationAction='error')
+        except OperationFailure as e:
+            logger.warning(f"更新日志分区 {name} 的校验规则失败（需要dbAdmin权限），"
+                           f"请执行 POST /api/logs/migrate-partitions: {e}")
+            return
+        collection = database[name]
+        for index in cls.LEGACY_INDEXES & set(collection.index_information()):
+            collection.drop_index(index)
+        logger.info(f"日志分区 {name} 已换成紧凑编码的校验规则")
+
+    @classmethod
+    def create_indexes(cls, collection):
+        for keys in cls.INDEXES:
+            collection.create_index(keys)
+
+    @classmethod
+    def action_code(cls, action_type: str) -> Union[int, str]:
+        return cls.ACTION_CODES.get(action_type, action_type)
+
+    @classmethod
+    def encode(cls, user_id: int, action_type: str, timestamp: datetime,
+               details: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """日志的存储格式"""
+        document = {'u': user_id, 'a': cls.action_code(action_type), 't': timestamp}
+        if details:
+            document['d'] = details
+        return document
+
+    @classmethod
+    def decode(cls, document: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        存储格式转为接口格式（昵称由调用方补充）
+        归档中可能有紧凑编码之前的文档，原样返回
+        """
+        if 'u' not in document:
+            log = dict(document)
+        else:
+            action = document['a']
+            log = {
+                '_id': document['_id'],
+                'user_id': document['u'],
+                'action_type': cls.ACTION_NAMES.get(action, action),
+                'timestamp': document['t'],
+                'details': document.get('d', {})
+            }
+        log['_id'] = str(log['_id'])
+        return log
+
+    @classmethod
+    def compact_stages(cls) -> List[Dict]:
+        """把旧格式文档转为紧凑编码的聚合阶段（用于 update_many 与 $merge 迁移）"""
+        branches = [{'case': {'$eq': ['$action_type', name]}, 'then': code}
+                    for name, code in cls.ACTION_CODES.items()]
+        return [
+            {'$set': {
+                'u': '$user_id',
+                'a': {'$switch': {'branches': branches, 'default': '$action_type'}},
+                't': '$timestamp',
+                'd': {'$cond': [{'$eq': [{'$ifNull': ['$details', {'$literal': {}}]}, {'$literal': {}}]},
+                                '$$REMOVE', '$details']}
+            }},
+            {'$unset': ['user_id', 'nickname', 'action_type', 'timestamp', 'details']}
+        ]
+
     @classmethod
     def create_log(cls, user_id: int, nickname: str, action_type: str, details: Dict[str, Any]) -> Optional[str]:
         """
         创建活动日志
         :param user_id: 用户ID
-        :param nickname: 用户昵称
+        :param nickname: 用户昵称（不存储，只用于填充昵称缓存）
         :param action_type: 操作类型
         :param details: 详细信息
         :return: 日志ID
         """
         try:
-            log_data = {
-                'user_id': user_id,
-                'nickname': nickname,
-                'action_type': action_type,
-                'timestamp': datetime.now(timezone.utc),
-                'details': details
-            }
-
-            with get_mongo_collection(cls.COLLECTION_NAME) as collection:
+            timestamp = datetime.now(timezone.utc)
+            log_data = cls.encode(user_id, action_type, timestamp, details)
+            if nickname:
+                NicknameResolver.remember({user_id: nickname})
+
+            name = cls.partition_for(timestamp)
+            try:
+                cls.ensure_partition(name)
+            except Exception as e:
+                # 建集合或升级校验规则失败时仍尝试写入，下一次写入时重试
+                logger.warning(f"创建日志分区 {name} 失败: {e}")
+
+            with get_mongo_collection(name) as collection:
                 result = collection.insert_one(log_data)
                 return str(result.inserted_id)
 
@@ -37,6 +232,30 @@ class ActivityLog:
             logger.error(f"创建活动日志失败: {e}")
             return None
 
+    @classmethod
+    def _find(cls, query: Dict, limit: int, skip: int = 0,
+              start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> List[Dict]:
+        """
+        按时间倒序逐月查询，取满limit条即停止
+        需要跳过的条数先按月计数扣除（计数最多数到skip+1），整月都被跳过的集合不读取文档
+        :param query: 按存储字段（u/a/t）的查询条件
+        :return: 接口格式的日志，附带当前昵称
+        """
+        logs = []
+        for name in cls.partitions(start_date, end_date):
+            with get_mongo_collection(name) as collection:
+                if skip:
+                    matched = collection.count_documents(query, limit=skip + 1)
+                    if matched <= skip:
+                        skip -= matched
+                        continue
+                cursor = collection.find(query).sort('t', -1).skip(skip).limit(limit - len(logs))
+                skip = 0
+                logs.extend(cls.decode(document) for document in cursor)
+            if len(logs) >= limit:
+                break
+        return NicknameResolver.attach(logs)
+
     @classmethod
     def get_user_logs(cls, user_id: int, limit: int = 50, skip: int = 0) -> List[Dict]:
         """
@@ -47,16 +266,7 @@ class ActivityLog:
         :return: 日志列表
         """
         try:
-            with get_mongo_collection(cls.COLLECTION_NAME) as collection:
-                cursor = collection.find(
-                    {'user_id': user_id}
-                ).sort('timestamp', -1).skip(skip).limit(limit)
-
-                logs = []
-                for log in cursor:
-                    log['_id'] = str(log['_id'])
-                    logs.append(log)
-                return logs
+            return cls._find({'u': user_id}, limit, skip)
 
         except Exception as e:
             logger.error(f"获取用户活动日志失败: {e}")
@@ -72,16 +282,7 @@ class ActivityLog:
         :return: 日志列表
         """
         try:
-            with get_mongo_collection(cls.COLLECTION_NAME) as collection:
-                cursor = collection.find(
-                    {'action_type': action_type}
-                ).sort('timestamp', -1).skip(skip).limit(limit)
-
-                logs = []
-                for log in cursor:
-                    log['_id'] = str(log['_id'])
-                    logs.append(log)
-                return logs
+            return cls._find({'a': cls.action_code(action_type)}, limit, skip)
 
         except Exception as e:
             logger.error(f"根据操作类型获取日志失败: {e}")
@@ -100,92 +301,120 @@ class ActivityLog:
         :return: 日志列表
         """
         try:
-            query = {
-                'timestamp': {
-                    '$gte': start_date,
-                    '$lte': end_date
-                }
-            }
+            query = {'t': cls.timestamp_range(start_date, end_date)}
 
             if user_id:
-                query['user_id'] = user_id
-
-            with get_mongo_collection(cls.COLLECTION_NAME) as collection:
-                cursor = collection.find(query).sort('timestamp', -1).skip(skip).limit(limit)
+                query['u'] = user_id
 
-                logs = []
-                for log in cursor:
-                    log['_id'] = str(log['_id'])
-                    logs.append(log)
-                return logs
+            return cls._find(query, limit, skip, start_date, end_date)
 
         except Exception as e:
             logger.error(f"根据日期范围获取日志失败: {e}")
             return []
 
+    @staticmethod
+    def timestamp_range(start_date: Optional[datetime], end_date: Optional[datetime]) -> Dict:
+        condition = {}
+        if start_date:
+            condition['$gte'] = start_date
+        if end_date:
+            condition['$lte'] = end_date
+        return condition
+
     @classmethod
     def get_statistics(cls, start_date: Optional[datetime] = None,
                       end_date: Optional[datetime] = None) -> Dict[str, Any]:
         """
         获取日志统计信息
+        总日志数为保留期内各月集合的估算文档数（读取集合元数据，不扫描）
         :param start_date: 开始日期
         :param end_date: 结束日期
         :return: 统计信息
         """
-        try:
-            pipeline = []
-
-            # 日期过滤
-            if start_date or end_date:
-                match_stage = {}
-                if start_date and end_date:
-                    match_stage['timestamp'] = {'$gte': start_date, '$lte': end_date}
-                elif start_date:
-                    match_stage['timestamp'] = {'$gte': start_date}
-                elif end_date:
-                    match_stage['timestamp'] = {'$lte': end_date}
-                pipeline.append({'$match': match_stage})
-
-            # 统计各种操作类型的数量
-            pipeline.extend([
-                {
-                    '$group': {
-                        '_id': '$action_type',
-                        'count': {'$sum': 1},
-                        'unique_users': {'$addToSet': '$user_id'}
-                    }
-                },
-                {
-                    '$project': {
-                        'action_type': '$_id',
-                        'count': 1,
-                        'unique_user_count': {'$size': '$unique_users'},
-                        '_id': 0
-                    }
-                }
-            ])
-
-            with get_mongo_collection(cls.COLLECTION_NAME) as collection:
-                result = list(collection.aggregate(pipeline))
-
-                # 总日志数
-                total_logs = collection.count_documents({})
-
-                # 今日日志数
-                today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-                today_logs = collection.count_documents({
-                    'timestamp': {'$gte': today_start}
-                })
+        partitions = cls.partitions(start_date, end_date)
+        pipeline = cls.statistics_pipeline(start_date, end_date, partitions[1:])
+        today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+        def aggregate():
+            if not partitions:
+                return []
+            with get_mongo_collection(partitions[0]) as collection:
+                return cls.decode_statistics(collection.aggregate(pipeline))
+
+        def total():
+            database = MongoDB.get_database()
+            return sum(database[name].estimated_document_count() for name in cls.partitions())
+
+        def today():
+            with get_mongo_collection(cls.partition_for(today_start)) as collection:
+                return collection.count_documents({'t': {'$gte': today_start}})
+
+        # 分组统计、总日志数、今日日志数互不依赖，并发执行
+        outcome = FanOut.run({
+            'action_type_stats': aggregate,
+            'total_logs': total,
+            'today_logs': today
+        })
+
+        if outcome.errors:
+            logger.error(f"获取日志统计失败: {outcome.errors}")
+        if outcome.failed:
+            return {}
 
-                return {
-                    'total_logs': total_logs,
-                    'today_logs': today_logs,
-                    'action_type_stats': result
+        stats = {
+            'total_logs': outcome.get('total_logs'),
+            'today_logs': outcome.get('today_logs'),
+            'action_type_stats': outcome.get('action_type_stats')
+        }
+        if outcome.errors:
+            stats['failed'] = outcome.errors
+        return stats
+
+    @staticmethod
+    def statistics_pipeline(start_date: Optional[datetime] = None,
+                            end_date: Optional[datetime] = None,
+                            union: List[str] = ()) -> List[Dict]:
+        """
+        按操作类型统计日志数与去重用户数的聚合管道（同步与异步接口共用）
+        在第一个分月集合上执行，其余月份（union）用 $unionWith 合并后统一分组（MongoDB 4.4+）
+        """
+        pipeline = []
+        match = [{'$match': {'t': ActivityLog.timestamp_range(start_date, end_date)}}] \
+            if start_date or end_date else []
+
+        # 日期过滤
+        pipeline.extend(match)
+        for name in union:
+            pipeline.append({'$unionWith': {'coll': name, 'pipeline': match}})
+
+        # 统计各种操作类型的数量
+        pipeline.extend([
+            {
+                '$group': {
+                    '_id': '$a',
+                    'count': {'$sum': 1},
+                    'unique_users': {'$addToSet': '$u'}
                 }
+            },
+            {
+                '$project': {
+                    'action_type': '$_id',
+                    'count': 1,
+                    'unique_user_count': {'$size': '$unique_users'},
+                    '_id': 0
+                }
+            }
+        ])
+        return pipeline
 
-        except Exception as e:
-            logger.error(f"获取日志统计失败: {e}")
-            return {}
+    @classmethod
+    def decode_statistics(cls, rows) -> List[Dict]:
+        """分组统计结果中的操作类型编号转为名称"""
+        stats = []
+        for row in rows:
+            row['action_type'] = cls.ACTION_NAMES.get(row['action_type'], row['action_type'])
+            stats.append(row)
+        return stats
 
     @classmethod
     def log_user_login(cls, user_id: int, nickname: str, ip_address: str = None) -> Optional[str]:
@@ -244,13 +473,18 @@ class ActivityLog:
 
     @classmethod
     def log_admin_action(cls, user_id: int, nickname: str, action: str,
-                        target_type: str, target_id: int, details_info: Dict = None) -> Optional[str]:
-        """记录管理员操作"""
+                        target_type: str, target_id: Union[int, List[int]],
+                        details_info: Dict = None) -> Optional[str]:
+        """记录管理员操作（target_id为列表时表示一次批量操作，只写一条日志）"""
         details = {
             'action': action,  # approve, reject, delete, update
-            'target_type': target_type,  # post, user, content
-            'target_id': target_id
+            'target_type': target_type  # post, user, content
         }
+        if isinstance(target_id, (list, tuple)):
+            details['target_ids'] = list(target_id)
+            details['target_count'] = len(target_id)
+        else:
+            details['target_id'] = target_id
         if details_info:
             details.update(details_info)
 
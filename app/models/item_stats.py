@@ -0,0 +1,169 @@
+import math
+import os
+import threading
+import time
+import logging
+from typing import Dict, List
+from app.config import Config
+from app.utils.db import get_db_cursor
+from app.utils.answer_batch import decode_batch
+from app.utils.lifecycle import Lifecycle
+
+logger = logging.getLogger(__name__)
+
+# 各选项在统计表中的计数列
+OPTION_COLUMNS = {'A': 'opt_a', 'B': 'opt_b', 'C': 'opt_c', 'D': 'opt_d', None: 'opt_none'}
+# 可累加的统计列：作答数、答对数、各选项计数，以及计算点二列相关所需的
+# 提交正确率之和、平方和与答对者的正确率之和
+SUM_COLUMNS = ['answered', 'correct', 'opt_a', 'opt_b', 'opt_c', 'opt_d', 'opt_none',
+               'score_sum', 'score_sq_sum', 'correct_score_sum']
+
+def _empty():
+    return dict.fromkeys(SUM_COLUMNS, 0)
+
+def describe(row: Dict) -> Dict:
+    """
+    由累加统计计算题目分析指标
+    - p_value: 答对率
+    - discrimination: 题目得分与整卷正确率的点二列相关系数
+    - options: 各选项被选比例
+    """
+    n = row['answered']
+    n1 = row['correct']
+    result = {
+        'question_id': row['question_id'],
+        'answered': n,
+        'p_value': round(n1 / n, 4) if n else None,
+        'discrimination': None,
+        'options': {option or 'none': round(row[column] / n, 4) if n else 0
+                    for option, column in OPTION_COLUMNS.items()}
+    }
+    if 0 < n1 < n:
+        mean = row['score_sum'] / n
+        variance = row['score_sq_sum'] / n - mean * mean
+        if variance > 1e-9:
+            mean_correct = row['correct_score_sum'] / n1
+            mean_wrong = (row['score_sum'] - row['correct_score_sum']) / (n - n1)
+            p = n1 / n
+            result['discrimination'] = round(
+                (mean_correct - mean_wrong) / math.sqrt(variance) * math.sqrt(p * (1 - p)), 4)
+    return result
+
+class ItemStats:
+    """题目作答统计模型（增量汇总未处理的作答批次，批次上的标记记录是否已汇总）"""
+
+    _lock = threading.Lock()
+    _refresher = None
+    _refresher_pid = None
+
+    @classmethod
+    def refresh(cls, max_batches: int = 1000) -> Dict:
+        """
+        汇总尚未处理的作答批次，并在同一事务中把这些批次标记为已汇总
+        按标记而不是ID位置选取，提交较晚的批次不会被跳过；
+        多个进程同时调用时各自锁定不同的批次（SKIP LOCKED）
+        :param max_batches: 单次最多处理的批次数
+        :return: 处理的批次数、作答数以及是否还有剩余
+        """
+        with get_db_cursor() as cursor:
+            cursor.execute("""
+                SELECT batch_id, data FROM quiz_answer_batch
+                WHERE aggregated = 0
+                ORDER BY batch_id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            """, (max_batches + 1,))
+            batches = cursor.fetchall()
+            has_more = len(batches) > max_batches
+            batches = batches[:max_batches]
+            if not batches:
+                return {'batches': 0, 'answers': 0, 'has_more': False}
+
+            totals = {}
+            answer_count = 0
+            for batch in batches:
+                for accuracy, answers in decode_batch(batch['data']):
+                    score = accuracy / 100
+                    for question_id, option, correct in answers:
+                        stats = totals.get(question_id)
+                        if stats is None:
+                            stats = totals[question_id] = _empty()
+                        stats['answered'] += 1
+                        stats[OPTION_COLUMNS[option]] += 1
+                        stats['score_sum'] += score
+                        stats['score_sq_sum'] += score * score
+                        if correct:
+                            stats['correct'] += 1
+                            stats['correct_score_sum'] += score
+                        answer_count += 1
+
+            columns = ', '.join(SUM_COLUMNS)
+            placeholders = ', '.join(['%s'] * (len(SUM_COLUMNS) + 1))
+            updates = ', '.join(f"{c} = {c} + VALUES({c})" for c in SUM_COLUMNS)
+            cursor.executemany(f"""
+                INSERT INTO quiz_item_stats (question_id, {columns})
+                VALUES ({placeholders})
+                ON DUPLICATE KEY UPDATE {updates}
+            """, [[question_id] + [stats[c] for c in SUM_COLUMNS]
+                  for question_id, stats in totals.items()])
+
+            batch_ids = [batch['batch_id'] for batch in batches]
+            cursor.execute(f"""
+                UPDATE quiz_answer_batch SET aggregated = 1
+                WHERE batch_id IN ({', '.join(['%s'] * len(batch_ids))})
+            """, batch_ids)
+
+        return {'batches': len(batches), 'answers': answer_count, 'has_more': has_more}
+
+    @classmethod
+    def schedule(cls):
+        """按需启动后台汇总线程（写入作答的进程调用；fork出的子进程需要重新启动）"""
+        if Config.ITEM_STATS_INTERVAL <= 0:
+            return
+        if cls._refresher_pid == os.getpid() and cls._refresher and cls._refresher.is_alive():
+            return
+        with cls._lock:
+            if cls._refresher_pid == os.getpid() and cls._refresher and cls._refresher.is_alive():
+                return
+            cls._refresher = threading.Thread(target=cls._run, name='item-stats-refresher', daemon=True)
+            cls._refresher_pid = os.getpid()
+            cls._refresher.start()
+
+    @classmethod
+    def _run(cls):
+        while True:
+            time.sleep(Config.ITEM_STATS_INTERVAL)
+            try:
+                while cls.refresh()['has_more']:
+                    pass
+            except Exception as e:
+                logger.error(f"汇总题目统计失败: {e}")
+
+    @classmethod
+    def reset_after_fork(cls):
+        """子进程不继承父进程的锁和汇总线程"""
+        cls._lock = threading.Lock()
+        cls._refresher = None
+
+    @classmethod
+    def get_for_quiz(cls, quiz_id: int) -> List[Dict]:
+        """获取测验内各题的分析指标（未被作答过的题目指标为空）"""
+        columns = ', '.join(f"s.{c}" for c in SUM_COLUMNS)
+        with get_db_cursor(commit=False) as cursor:
+            cursor.execute(f"""
+                SELECT q.question_id, {columns}
+                FROM quiz_question q
+                LEFT JOIN quiz_item_stats s ON q.question_id = s.question_id
+                WHERE q.quiz_id = %s
+                ORDER BY q.question_id
+            """, (quiz_id,))
+            rows = cursor.fetchall()
+
+        results = []
+        for row in rows:
+            for column in SUM_COLUMNS:
+                row[column] = float(row[column] or 0) if column.endswith('_sum') else int(row[column] or 0)
+            results.append(describe(row))
+        return results
+
+Lifecycle.on_fork(ItemStats.reset_after_fork)
@@ -0,0 +1,92 @@
+from typing import Dict, Iterable, List, Optional
+from app.utils.db import get_db_cursor
+from app.utils.bitmap import RoaringBitmap
+from app.utils.progress_buffer import ProgressBuffer, PROGRESS_FIELDS
+
+class LearnedItems:
+    """用户已学内容集合模型（每个用户每类内容一张压缩位图，键为内容ID）"""
+
+    CONTENT_TYPES = tuple(PROGRESS_FIELDS)
+    MAX_CONTENT_ID = 0xFFFFFFFF  # 位图键为32位无符号整数
+
+    @classmethod
+    def valid_id(cls, value) -> bool:
+        """是否为可存入位图的内容ID（布尔值是int的子类，不接受）"""
+        return isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= cls.MAX_CONTENT_ID
+
+    @classmethod
+    def parse_ids(cls, value) -> Optional[List[int]]:
+        """
+        校验请求中的内容ID数组（字符串会被逐字符迭代，不做类型转换）
+        :return: 内容ID列表，不是合法的非负整数数组时返回None
+        """
+        if not isinstance(value, list) or not all(cls.valid_id(item) for item in value):
+            return None
+        return value
+
+    @classmethod
+    def get(cls, user_id: int, content_type: str) -> RoaringBitmap:
+        """
+        获取用户某类内容的已学集合
+        :param user_id: 用户ID
+        :param content_type: vocab, grammar, listening
+        :return: 已学内容ID位图
+        """
+        with get_db_cursor(commit=False) as cursor:
+            cursor.execute("""
+                SELECT bitmap FROM learned_items
+                WHERE user_id = %s AND content_type = %s
+            """, (user_id, content_type))
+            row = cursor.fetchone()
+        return RoaringBitmap.from_bytes(row['bitmap'] if row else None)
+
+    @classmethod
+    def get_counts(cls, user_id: int) -> Dict[str, int]:
+        """获取用户各类内容的已学数量（读取冗余计数列，不解码位图）"""
+        with get_db_cursor(commit=False) as cursor:
+            cursor.execute("""
+                SELECT content_type, item_count FROM learned_items WHERE user_id = %s
+            """, (user_id,))
+            counts = {row['content_type']: row['item_count'] for row in cursor.fetchall()}
+        return {content_type: counts.get(content_type, 0) for content_type in cls.CONTENT_TYPES}
+
+    @classmethod
+    def mark(cls, user_id: int, content_type: str, content_ids: Iterable[int],
+             learned: bool = True) -> int:
+        """
+        标记内容为已学（或取消），集合变化后由写缓冲把集合数量同步到progress中对应的计数
+        :param user_id: 用户ID
+        :param content_type: vocab, grammar, listening
+        :param content_ids: 内容ID列表
+        :param learned: False表示从已学集合中移除
+        :return: 更新后的已学数量
+        """
+        with get_db_cursor() as cursor:
+            # 行锁保证同一用户并发标记时不会互相覆盖
+            cursor.execute("""
+                SELECT bitmap FROM learned_items
+                WHERE user_id = %s AND content_type = %s
+                FOR UPDATE
+            """, (user_id, content_type))
+            row = cursor.fetchone()
+            bitmap = RoaringBitmap.from_bytes(row['bitmap'] if row else None)
+            before = len(bitmap)
+
+            if learned:
+                bitmap.update(content_ids)
+            else:
+                for content_id in content_ids:
+                    bitmap.discard(content_id)
+            count = len(bitmap)
+
+            cursor.execute("""
+                INSERT INTO learned_items (user_id, content_type, bitmap, item_count)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE bitmap = VALUES(bitmap), item_count = VALUES(item_count)
+            """, (user_id, content_type, bitmap.to_bytes(), count))
+
+        # 集合提交后再登记，刷新时读到的数量一定包含本次变化
+        if count != before:
+            ProgressBuffer.touch(user_id, content_type)
+
+        return count
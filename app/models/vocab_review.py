@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from app.utils.db import get_db_cursor
+
+# 易度因子以整数（×100）存储
+DEFAULT_EASINESS = 250
+MIN_EASINESS = 130
+
+def sm2(easiness: int, interval_days: int, repetitions: int, lapses: int,
+        quality: int) -> Tuple[int, int, int, int]:
+    """
+    SM-2 复习间隔算法
+    :param easiness: 易度因子×100
+    :param interval_days: 当前间隔（天）
+    :param repetitions: 连续答对次数
+    :param lapses: 遗忘次数
+    :param quality: 本次回忆质量 0-5，小于3视为遗忘
+    :return: (easiness, interval_days, repetitions, lapses)
+    """
+    if quality < 3:
+        repetitions = 0
+        interval_days = 1
+        lapses = min(lapses + 1, 255)
+    else:
+        repetitions = min(repetitions + 1, 255)
+        if repetitions == 1:
+            interval_days = 1
+        elif repetitions == 2:
+            interval_days = 6
+        else:
+            interval_days = min(round(interval_days * easiness / 100), 36500)
+
+    easiness += round(10 - (5 - quality) * (8 + (5 - quality) * 2))
+    return max(easiness, MIN_EASINESS), interval_days, repetitions, lapses
+
+class VocabReview:
+    """词汇间隔复习（SRS）模型，每个用户每个词一行紧凑状态"""
+
+    @classmethod
+    def enroll(cls, user_id: int, word_ids: List[int], now: Optional[datetime] = None) -> int:
+        """
+        将学完的词加入复习计划（已在计划中的词保持原状态）
+        首次学完视为一次成功回忆，1天后到期
+        :return: 新加入的词数
+        """
+        if not word_ids:
+            return 0
+        now = now or datetime.now()
+        due_at = now + timedelta(days=1)
+        with get_db_cursor() as cursor:
+            cursor.executemany("""
+                INSERT IGNORE INTO vocab_review
+                (user_id, word_id, easiness, interval_days, repetitions, lapses, due_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, [(user_id, word_id, DEFAULT_EASINESS, 1, 1, 0, due_at) for word_id in word_ids])
+            return cursor.rowcount
+
+    @classmethod
+    def get_due(cls, user_id: int, limit: int = 20,
+                now: Optional[datetime] = None) -> Tuple[int, List[Dict]]:
+        """
+        获取到期待复习的词，按到期时间先后排列
+        依赖 (user_id, due_at) 索引，只扫描到期部分
+        :return: (到期总数, 本批词汇)
+        """
+        now = now or datetime.now()
+        with get_db_cursor(commit=False) as cursor:
+            cursor.execute("""
+                SELECT COUNT(*) as total FROM vocab_review
+                WHERE user_id = %s AND due_at <= %s
+            """, (user_id, now))
+            total = cursor.fetchone()['total']
+
+            cursor.execute("""
+                SELECT r.word_id, r.interval_days, r.repetitions, r.lapses, r.due_at,
+                       v.word, v.meaning, v.example, v.level
+                FROM vocab_review r
+                JOIN vocab v ON r.word_id = v.word_id
+                WHERE r.user_id = %s AND r.due_at <= %s
+                ORDER BY r.due_at
+                LIMIT %s
+            """, (user_id, now, limit))
+            return total, cursor.fetchall()
+
+    @classmethod
+    def grade(cls, user_id: int, grades: Dict[int, int],
+              now: Optional[datetime] = None) -> List[Dict]:
+        """
+        批量评分一次复习，整批在一个事务内读取并写回
+        :param grades: {word_id: quality}
+        :return: 各词新的间隔与到期时间
+        """
+        if not grades:
+            return []
+        now = now or datetime.now()
+        word_ids = list(grades)
+        placeholders = ', '.join(['%s'] * len(word_ids))
+        with get_db_cursor() as cursor:
+            cursor.execute(f"""
+                SELECT word_id, easiness, interval_days, repetitions, lapses
+                FROM vocab_review
+                WHERE user_id = %s AND word_id IN ({placeholders})
+                FOR UPDATE
+            """, [user_id] + word_ids)
+            states = {row['word_id']: row for row in cursor.fetchall()}
+
+            rows = []
+            results = []
+            for word_id, quality in grades.items():
+                state = states.get(word_id)
+                if state:
+                    current = (state['easiness'], state['interval_days'],
+                               state['repetitions'], state['lapses'])
+                else:
+                    current = (DEFAULT_EASINESS, 0, 0, 0)
+                easiness, interval_days, repetitions, lapses = sm2(*current, quality)
+                due_at = now + timedelta(days=interval_days)
+                rows.append((user_id, word_id, easiness, interval_days, repetitions, lapses, due_at))
+                results.append({
+                    'word_id': word_id,
+                    'interval_days': interval_days,
+                    'repetitions': repetitions,
+                    'due_at': due_at
+                })
+
+            # executemany 会合并为一条多行 INSERT ... ON DUPLICATE KEY UPDATE
+            cursor.executemany("""
+                INSERT INTO vocab_review
+                (user_id, word_id, easiness, interval_days, repetitions, lapses, due_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    easiness = VALUES(easiness),
+                    interval_days = VALUES(interval_days),
+                    repetitions = VALUES(repetitions),
+                    lapses = VALUES(lapses),
+                    due_at = VALUES(due_at)
+            """, rows)
+
+        return results
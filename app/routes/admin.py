@@ -3,9 +3,23 @@ from functools import wraps
 from app.utils.db import get_db_cursor
 from app.utils.auth_utils import verify_token
 from app.schemas.response import success_response, error_response
+from app.utils.vocab_index import VocabIndex
+from app.utils.content_search import ContentSearch
+from app.utils.post_feed import PostFeed
+from app.utils.nickname import NicknameResolver
+from app.utils.quiz_bank import QuizBank
+from app.utils.catalog import Catalog
+from app.models.activity_log import ActivityLog
+from app.models.item_stats import ItemStats
+from app.utils.metrics import Metrics
+from app.utils.fanout import FanOut, sql_one
+from app.config import Config
 
 admin_bp = Blueprint('admin', __name__)
 
+# 批量审核单次最多处理的帖子数
+MAX_BULK_REVIEW = 500
+
 def admin_required(f):
     """管理员权限装饰器"""
     @wraps(f)
@@ -19,13 +33,18 @@ def admin_required(f):
         # 检查是否是管理员
         with get_db_cursor(commit=False) as cursor:
             cursor.execute("""
-                SELECT role FROM user_profile WHERE user_id = %s
+                SELECT nickname, role FROM user_profile WHERE user_id = %s
             """, (user_id,))
             user = cursor.fetchone()
             
             if not user or user['role'] != 'admin':
                 return error_response("需要管理员权限", 403)
         
+        request.current_user = {
+            'user_id': user_id,
+            'nickname': user['nickname'],
+            'role': user['role']
+        }
         return f(*args, **kwargs)
     return decorated_function
 
@@ -93,24 +112,97 @@ def update_user_role(user_id):
 @admin_bp.route('/posts/pending', methods=['GET'])
 @admin_required
 def get_pending_posts():
-    """获取待审核的帖子"""
+    """分页获取待审核的帖子"""
+    page = int(request.args.get('page', 1))
+    per_page = min(int(request.args.get('per_page', 20)), 100)
+    offset = (page - 1) * per_page
+    
     try:
         with get_db_cursor(commit=False) as cursor:
+            # 获取总数
+            cursor.execute("SELECT COUNT(*) as total FROM post WHERE status = 'pending'")
+            total = cursor.fetchone()['total']
+            
             cursor.execute("""
-                SELECT p.*, up.nickname
+                SELECT p.*
                 FROM post p
-                JOIN user_profile up ON p.user_id = up.user_id
                 WHERE p.status = 'pending'
                 ORDER BY p.created_at DESC
-            """)
+                LIMIT %s OFFSET %s
+            """, (per_page, offset))
             
-            posts = cursor.fetchall()
+            posts = NicknameResolver.attach(cursor.fetchall())
             
-            return jsonify(success_response(posts))
+            return jsonify(success_response({
+                "total": total,
+                "page": page,
+                "per_page": per_page,
+                "data": posts
+            }))
             
     except Exception as e:
         return error_response(f"获取待审核帖子失败: {str(e)}", 500)
 
+@admin_bp.route('/posts/review', methods=['PUT'])
+@admin_required
+def bulk_review_posts():
+    """批量审核帖子"""
+    data = request.get_json(silent=True) or {}
+    status = data.get('status')
+    post_ids = data.get('post_ids') or []
+    
+    if status not in ['approved', 'rejected']:
+        return error_response("无效的审核状态")
+    
+    # 只接受整数数组（字符串会被逐字符迭代，布尔值是int的子类）
+    if not isinstance(post_ids, list) or not all(
+            isinstance(post_id, int) and not isinstance(post_id, bool) for post_id in post_ids):
+        return error_response("帖子ID格式错误，应为整数数组")
+    post_ids = sorted(set(post_ids))
+    
+    if not post_ids:
+        return error_response("帖子ID不能为空")
+    
+    if len(post_ids) > MAX_BULK_REVIEW:
+        return error_response(f"单次最多审核{MAX_BULK_REVIEW}篇帖子")
+    
+    try:
+        placeholders = ', '.join(['%s'] * len(post_ids))
+        with get_db_cursor() as cursor:
+            # 整批在一条语句、一个事务内更新
+            cursor.execute(f"""
+                UPDATE post SET status = %s WHERE post_id IN ({placeholders})
+            """, [status] + post_ids)
+            updated = cursor.rowcount
+            
+            cursor.execute(f"""
+                SELECT p.*,
+                       (SELECT COUNT(*) FROM comment WHERE post_id = p.post_id) as comment_count
+                FROM post p
+                WHERE p.post_id IN ({placeholders})
+            """, post_ids)
+            posts = cursor.fetchall()
+        
+        # 帖子索引整批刷新一次
+        PostFeed.upsert_many(posts)
+        
+        # 整批只记录一条管理员操作日志
+        admin = request.current_user
+        ActivityLog.log_admin_action(
+            admin['user_id'], admin['nickname'],
+            'approve' if status == 'approved' else 'reject',
+            'post', [post['post_id'] for post in posts]
+        )
+        
+        return jsonify(success_response({
+            "requested": len(post_ids),
+            "found": len(posts),
+            "updated": updated
+        }, "批量审核完成"))
+        
+    except Exception as e:
+        return error_response(f"批量审核失败: {str(e)}", 500)
+
 @admin_bp.route('/posts/<int:post_id>/review', methods=['PUT'])
 @admin_required
 def review_post(post_id):
@@ -127,7 +219,18 @@ def review_post(post_id):
                 UPDATE post SET status = %s WHERE post_id = %s
             """, (status, post_id))
             
-            return jsonify(success_response(None, "审核完成"))
+            cursor.execute("""
+                SELECT p.*,
+                       (SELECT COUNT(*) FROM comment WHERE post_id = p.post_id) as comment_count
+                FROM post p
+                WHERE p.post_id = %s
+            """, (post_id,))
+            post = cursor.fetchone()
+        
+        if post:
+            PostFeed.upsert(post)
+        
+        return jsonify(success_response(None, "审核完成"))
             
     except Exception as e:
         return error_response(f"审核失败: {str(e)}", 500)
@@ -152,10 +255,20 @@ def add_vocab():
                   data.get('example', ''), data['level']))
             
             word_id = cursor.lastrowid
-            
-            return jsonify(success_response({
-                "word_id": word_id
-            }, "词汇添加成功"))
+        
+        # 提交成功后同步搜索索引和各等级词汇数
+        Catalog.invalidate()
+        VocabIndex.upsert({
+            "word_id": word_id,
+            "word": data['word'],
+            "meaning": data['meaning'],
+            "example": data.get('example', ''),
+            "level": data['level']
+        })
+        
+        return jsonify(success_response({
+            "word_id": word_id
+        }, "词汇添加成功"))
             
     except Exception as e:
         return error_response(f"添加词汇失败: {str(e)}", 500)
@@ -186,7 +299,18 @@ def update_vocab(word_id):
                 WHERE word_id = %s
             """, params)
             
-            return jsonify(success_response(None, "词汇更新成功"))
+            cursor.execute("""
+                SELECT word_id, word, meaning, example, level
+                FROM vocab WHERE word_id = %s
+            """, (word_id,))
+            vocab = cursor.fetchone()
+        
+        if vocab:
+            VocabIndex.upsert(vocab)
+        if 'level' in data:
+            Catalog.invalidate()
+        
+        return jsonify(success_response(None, "词汇更新成功"))
             
     except Exception as e:
         return error_response(f"更新词汇失败: {str(e)}", 500)
@@ -198,8 +322,11 @@ def delete_vocab(word_id):
     try:
         with get_db_cursor() as cursor:
             cursor.execute("DELETE FROM vocab WHERE word_id = %s", (word_id,))
-            
-            return jsonify(success_response(None, "词汇删除成功"))
+        
+        VocabIndex.remove(word_id)
+        Catalog.invalidate()
+        
+        return jsonify(success_response(None, "词汇删除成功"))
             
     except Exception as e:
         return error_response(f"删除词汇失败: {str(e)}", 500)
@@ -224,10 +351,12 @@ def add_grammar():
             """, (data['title'], data['content'], data['level']))
             
             grammar_id = cursor.lastrowid
-            
-            return jsonify(success_response({
-                "grammar_id": grammar_id
-            }, "语法教程添加成功"))
+        
+        ContentSearch.add('grammar', grammar_id, data['title'], data['content'], data['level'])
+        
+        return jsonify(success_response({
+            "grammar_id": grammar_id
+        }, "语法教程添加成功"))
             
     except Exception as e:
         return error_response(f"添加语法教程失败: {str(e)}", 500)
@@ -251,10 +380,13 @@ def add_listening():
                   data.get('transcript', ''), data['level']))
             
             listen_id = cursor.lastrowid
-            
-            return jsonify(success_response({
-                "listen_id": listen_id
-            }, "听力材料添加成功"))
+        
+        ContentSearch.add('listening', listen_id, data['title'],
+                          data.get('transcript', ''), data['level'])
+        
+        return jsonify(success_response({
+            "listen_id": listen_id
+        }, "听力材料添加成功"))
             
     except Exception as e:
         return error_response(f"添加听力材料失败: {str(e)}", 500)
@@ -278,10 +410,12 @@ def create_quiz():
             """, (data['quiz_type'], data['title'], data['total_points']))
             
             quiz_id = cursor.lastrowid
-            
-            return jsonify(success_response({
-                "quiz_id": quiz_id
-            }, "测验创建成功"))
+        
+        Catalog.invalidate()
+        
+        return jsonify(success_response({
+            "quiz_id": quiz_id
+        }, "测验创建成功"))
             
     except Exception as e:
         return error_response(f"创建测验失败: {str(e)}", 500)
@@ -309,72 +443,105 @@ def add_quiz_question(quiz_id):
                   data['correct_opt'], data['score']))
             
             question_id = cursor.lastrowid
-            
-            return jsonify(success_response({
-                "question_id": question_id
-            }, "题目添加成功"))
+        
+        QuizBank.invalidate()
+        Catalog.invalidate_answer_key(quiz_id)
+        
+        return jsonify(success_response({
+            "question_id": question_id
+        }, "题目添加成功"))
             
     except Exception as e:
         return error_response(f"添加题目失败: {str(e)}", 500)
 
+@admin_bp.route('/quiz/item-stats/refresh', methods=['POST'])
+@admin_required
+def refresh_item_stats():
+    """汇总新写入的逐题作答记录"""
+    max_batches = min(int(request.args.get('max_batches', 1000)), 10000)
+    
+    try:
+        result = ItemStats.refresh(max_batches=max_batches)
+        return jsonify(success_response(result, "题目统计已更新"))
+        
+    except Exception as e:
+        return error_response(f"更新题目统计失败: {str(e)}", 500)
+
+@admin_bp.route('/quiz/<int:quiz_id>/item-stats', methods=['GET'])
+@admin_required
+def get_item_stats(quiz_id):
+    """获取测验各题的答对率、区分度和选项分布"""
+    try:
+        return jsonify(success_response({
+            "quiz_id": quiz_id,
+            "questions": ItemStats.get_for_quiz(quiz_id)
+        }))
+        
+    except Exception as e:
+        return error_response(f"获取题目统计失败: {str(e)}", 500)
+
 # 5. 数据统计
 @admin_bp.route('/statistics', methods=['GET'])
 @admin_required
 def get_statistics():
-    """获取系统统计数据"""
+    """获取系统统计数据（各项统计互不依赖，并发查询）"""
     try:
-        with get_db_cursor(commit=False) as cursor:
-            stats = {}
-            
+        outcome = FanOut.run({
             # 用户统计
-            cursor.execute("""
+            'users': sql_one("""
                 SELECT 
                     COUNT(*) as total_users,
                     SUM(CASE WHEN role = 'admin' THEN 1 ELSE 0 END) as admin_count,
                     SUM(CASE WHEN role = 'student' THEN 1 ELSE 0 END) as student_count
                 FROM user_profile
-            """)
-            stats['users'] = cursor.fetchone()
-            
+            """),
             # 学习资源统计
-            cursor.execute("SELECT COUNT(*) as total FROM vocab")
-            stats['vocab_count'] = cursor.fetchone()['total']
-            
-            cursor.execute("SELECT COUNT(*) as total FROM grammar")
-            stats['grammar_count'] = cursor.fetchone()['total']
-            
-            cursor.execute("SELECT COUNT(*) as total FROM listening")
-            stats['listening_count'] = cursor.fetchone()['total']
-            
+            'vocab_count': sql_one("SELECT COUNT(*) as total FROM vocab"),
+            'grammar_count': sql_one("SELECT COUNT(*) as total FROM grammar"),
+            'listening_count': sql_one("SELECT COUNT(*) as total FROM listening"),
             # 测验统计
-            cursor.execute("SELECT COUNT(*) as total FROM quiz")
-            stats['quiz_count'] = cursor.fetchone()['total']
-            
-            cursor.execute("SELECT COUNT(*) as total FROM quiz_result")
-            stats['quiz_attempts'] = cursor.fetchone()['total']
-            
+            'quiz_count': sql_one("SELECT COUNT(*) as total FROM quiz"),
+            'quiz_attempts': sql_one("SELECT COUNT(*) as total FROM quiz_result"),
             # 社区统计
-            cursor.execute("""
+            'posts': sql_one("""
                 SELECT 
                     COUNT(*) as total_posts,
                     SUM(CASE WHEN status = 'pending' THEN 1 ELSE 0 END) as pending_posts,
                     SUM(CASE WHEN status = 'approved' THEN 1 ELSE 0 END) as approved_posts
                 FROM post
-            """)
-            stats['posts'] = cursor.fetchone()
-            
-            cursor.execute("SELECT COUNT(*) as total FROM comment")
-            stats['comment_count'] = cursor.fetchone()['total']
-            
+            """),
+            'comment_count': sql_one("SELECT COUNT(*) as total FROM comment"),
             # 今日新增用户
-            cursor.execute("""
+            'today_users': sql_one("""
                 SELECT COUNT(*) as today_users 
                 FROM user_auth 
                 WHERE DATE(created_at) = CURDATE()
             """)
-            stats['today_users'] = cursor.fetchone()['today_users']
-            
-            return jsonify(success_response(stats))
+        })
+        
+        if outcome.failed:
+            return error_response(f"获取统计数据失败: {'; '.join(outcome.errors.values())}", 500)
+        
+        # 用户和帖子统计保留整行，其余只取计数；部分统计失败时仍返回其余结果，失败项为null
+        def count(name, column='total'):
+            row = outcome.get(name)
+            return row[column] if row else None
+        
+        stats = {
+            'users': outcome.get('users'),
+            'vocab_count': count('vocab_count'),
+            'grammar_count': count('grammar_count'),
+            'listening_count': count('listening_count'),
+            'quiz_count': count('quiz_count'),
+            'quiz_attempts': count('quiz_attempts'),
+            'posts': outcome.get('posts'),
+            'comment_count': count('comment_count'),
+            'today_users': count('today_users', 'today_users')
+        }
+        if outcome.errors:
+            stats['failed'] = outcome.errors
+        
+        return jsonify(success_response(stats))
             
     except Exception as e:
         return error_response(f"获取统计数据失败: {str(e)}", 500)
@@ -385,7 +552,7 @@ def get_quiz_performance():
     """获取测验成绩统计"""
     try:
         with get_db_cursor(commit=False) as cursor:
-                        # 各测验的平均分和参与人数
+            # 各测验的平均分、参与人数和平均准确率（一次分组查询，不再逐个测验查询准确率）
             cursor.execute("""
                 SELECT 
                     q.quiz_id,
@@ -394,7 +561,8 @@ def get_quiz_performance():
                     COUNT(qr.result_id) as attempt_count,
                     AVG(qr.score) as avg_score,
                     MAX(qr.score) as max_score,
-                    MIN(qr.score) as min_score
+                    MIN(qr.score) as min_score,
+                    AVG(fn_calc_accuracy(qr.correct_cnt, qr.total_cnt)) as avg_accuracy
                 FROM quiz q
                 LEFT JOIN quiz_result qr ON q.quiz_id = qr.quiz_id
                 GROUP BY q.quiz_id
@@ -402,20 +570,8 @@ def get_quiz_performance():
             """)
             
             quiz_stats = cursor.fetchall()
-            
-            # 使用MySQL函数计算各测验的平均准确率
             for stat in quiz_stats:
-                if stat['attempt_count'] > 0:
-                    cursor.execute("""
-                        SELECT AVG(fn_calc_accuracy(correct_cnt, total_cnt)) as avg_accuracy
-                        FROM quiz_result
-                        WHERE quiz_id = %s
-                    """, (stat['quiz_id'],))
-                    
-                    accuracy_result = cursor.fetchone()
-                    stat['avg_accuracy'] = float(accuracy_result['avg_accuracy']) if accuracy_result['avg_accuracy'] else 0
-                else:
-                    stat['avg_accuracy'] = 0
+                stat['avg_accuracy'] = float(stat['avg_accuracy']) if stat['avg_accuracy'] else 0
             
             return jsonify(success_response(quiz_stats))
             
@@ -455,4 +611,19 @@ def get_user_progress_stats():
             return jsonify(success_response(progress_stats))
             
     except Exception as e:
-        return error_response(f"获取用户进度统计失败: {str(e)}", 500)
\ No newline at end of file
+        return error_response(f"获取用户进度统计失败: {str(e)}", 500)
+
+@admin_bp.route('/slow-queries', methods=['GET'])
+@admin_required
+def get_slow_queries():
+    """获取本进程采样的慢查询（按最大耗时降序）"""
+    limit = min(int(request.args.get('limit', 50)), 200)
+    
+    try:
+        return jsonify(success_response({
+            "threshold_ms": Config.SLOW_QUERY_MS,
+            "queries": Metrics.slow_queries(limit)
+        }))
+        
+    except Exception as e:
+        return error_response(f"获取慢查询失败: {str(e)}", 500)
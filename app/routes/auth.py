@@ -26,7 +26,7 @@ def register():
 
             # 生成盐值和密码哈希
             salt = generate_salt()
-            pwd_hash = hash_password(password, salt)
+            pwd_hash = hash_password(password, salt, cursor)
 
             # 插入用户认证信息
             cursor.execute("""
@@ -85,7 +85,7 @@ def login():
                 return error_response("用户不存在")
 
             # 验证密码
-            pwd_hash = hash_password(password, user['salt'])
+            pwd_hash = hash_password(password, user['salt'], cursor)
             if pwd_hash != user['pwd_hash']:
                 return error_response("密码错误")
 
@@ -1,9 +1,58 @@
+import base64
+from datetime import datetime
 from flask import Blueprint, request, jsonify
 from app.utils.db import get_db_cursor
 from app.schemas.response import success_response, error_response
+from app.utils.post_feed import PostFeed
+from app.utils.nickname import NicknameResolver
 
 community_bp = Blueprint('community', __name__)
 
+def encode_comment_cursor(comment):
+    """将 (created_at, comment_id) 编码为不透明的分页游标"""
+    raw = f"{comment['created_at'].isoformat()}|{comment['comment_id']}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_comment_cursor(cursor_str):
+    """解析分页游标，格式错误时抛出ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor_str.encode('ascii')).decode('utf-8')
+        created_at, comment_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(comment_id)
+    except Exception:
+        raise ValueError("无效的分页游标")
+
+def fetch_comments_page(cursor, post_id, after=None, limit=20):
+    """
+    按 (created_at, comment_id) 升序做键集分页，依赖 comment(post_id, created_at) 索引
+    :return: (评论列表, 下一页游标或None)
+    """
+    if after:
+        created_at, comment_id = after
+        cursor.execute("""
+            SELECT c.*
+            FROM comment c
+            WHERE c.post_id = %s
+              AND (c.created_at > %s OR (c.created_at = %s AND c.comment_id > %s))
+            ORDER BY c.created_at ASC, c.comment_id ASC
+            LIMIT %s
+        """, (post_id, created_at, created_at, comment_id, limit + 1))
+    else:
+        cursor.execute("""
+            SELECT c.*
+            FROM comment c
+            WHERE c.post_id = %s
+            ORDER BY c.created_at ASC, c.comment_id ASC
+            LIMIT %s
+        """, (post_id, limit + 1))
+    
+    comments = cursor.fetchall()
+    next_cursor = None
+    if len(comments) > limit:
+        comments = comments[:limit]
+        next_cursor = encode_comment_cursor(comments[-1])
+    return NicknameResolver.attach(comments), next_cursor
+
 @community_bp.route('/posts', methods=['GET'])
 def get_posts():
     """获取帖子列表"""
@@ -36,16 +85,15 @@ def get_posts():
             # 获取帖子列表
             params.extend([per_page, offset])
             cursor.execute(f"""
-                SELECT p.*, up.nickname,
+                SELECT p.*,
                        (SELECT COUNT(*) FROM comment WHERE post_id = p.post_id) as comment_count
                 FROM post p
-                JOIN user_profile up ON p.user_id = up.user_id
                 WHERE {where_clause}
                 ORDER BY p.created_at DESC
                 LIMIT %s OFFSET %s
             """, params)
             
-            posts = cursor.fetchall()
+            posts = NicknameResolver.attach(cursor.fetchall())
             
             return jsonify(success_response({
                 "total": total,
@@ -57,6 +105,50 @@ def get_posts():
     except Exception as e:
         return error_response(f"获取帖子列表失败: {str(e)}", 500)
 
+@community_bp.route('/posts/search', methods=['GET'])
+def search_posts():
+    """按关键词检索已审核帖子"""
+    query = request.args.get('q', '').strip()
+    category = request.args.get('category')
+    page = int(request.args.get('page', 1))
+    per_page = min(int(request.args.get('per_page', 20)), 100)
+    
+    if not query:
+        return error_response("搜索关键词不能为空")
+    
+    try:
+        total, posts = PostFeed.search(query, category=category, page=page, per_page=per_page)
+        
+        return jsonify(success_response({
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "data": NicknameResolver.attach(posts)
+        }))
+        
+    except Exception as e:
+        return error_response(f"搜索帖子失败: {str(e)}", 500)
+
+@community_bp.route('/posts/hot', methods=['GET'])
+def get_hot_posts():
+    """按热度获取帖子列表"""
+    category = request.args.get('category')
+    page = int(request.args.get('page', 1))
+    per_page = min(int(request.args.get('per_page', 20)), 100)
+    
+    try:
+        total, posts = PostFeed.hot(category=category, page=page, per_page=per_page)
+        
+        return jsonify(success_response({
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "data": NicknameResolver.attach(posts)
+        }))
+        
+    except Exception as e:
+        return error_response(f"获取热门帖子失败: {str(e)}", 500)
+
 @community_bp.route('/posts', methods=['POST'])
 def create_post():
     """创建帖子"""
@@ -78,9 +170,15 @@ def create_post():
             
             post_id = cursor.lastrowid
             
-            return jsonify(success_response({
-                "post_id": post_id
-            }, "帖子创建成功"))
+            cursor.execute("SELECT * FROM post WHERE post_id = %s", (post_id,))
+            post = cursor.fetchone()
+        
+        # 新帖默认待审核，只有审核通过后才会进入检索和热度排行
+        PostFeed.upsert(post)
+        
+        return jsonify(success_response({
+            "post_id": post_id
+        }, "帖子创建成功"))
             
     except Exception as e:
         return error_response(f"创建帖子失败: {str(e)}", 500)
@@ -88,13 +186,18 @@ def create_post():
 @community_bp.route('/posts/<int:post_id>', methods=['GET'])
 def get_post_detail(post_id):
     """获取帖子详情"""
+    comments_mode = request.args.get('comments', 'all')  # all, summary
+    latest = min(int(request.args.get('latest', 5)), 50)
+    
+    if comments_mode not in ['all', 'summary']:
+        return error_response("无效的评论模式")
+    
     try:
         with get_db_cursor(commit=False) as cursor:
             # 获取帖子信息
             cursor.execute("""
-                SELECT p.*, up.nickname
+                SELECT p.*
                 FROM post p
-                JOIN user_profile up ON p.user_id = up.user_id
                 WHERE p.post_id = %s AND p.status = 'approved'
             """, (post_id,))
             
@@ -102,16 +205,40 @@ def get_post_detail(post_id):
             if not post:
                 return error_response("帖子不存在", 404)
             
+            if comments_mode == 'summary':
+                # 摘要模式：只返回最新N条评论和评论总数
+                cursor.execute("""
+                    SELECT COUNT(*) as total FROM comment WHERE post_id = %s
+                """, (post_id,))
+                comment_count = cursor.fetchone()['total']
+                
+                cursor.execute("""
+                    SELECT c.*
+                    FROM comment c
+                    WHERE c.post_id = %s
+                    ORDER BY c.created_at DESC, c.comment_id DESC
+                    LIMIT %s
+                """, (post_id, latest))
+                
+                comments = list(reversed(cursor.fetchall()))
+                NicknameResolver.attach([post], comments)
+                
+                return jsonify(success_response({
+                    "post": post,
+                    "comments": comments,
+                    "comment_count": comment_count
+                }))
+            
             # 获取评论列表
             cursor.execute("""
-                SELECT c.*, up.nickname
+                SELECT c.*
                 FROM comment c
-                JOIN user_profile up ON c.user_id = up.user_id
                 WHERE c.post_id = %s
                 ORDER BY c.created_at ASC
             """, (post_id,))
             
             comments = cursor.fetchall()
+            NicknameResolver.attach([post], comments)
             
             return jsonify(success_response({
                 "post": post,
@@ -121,6 +248,36 @@ def get_post_detail(post_id):
     except Exception as e:
         return error_response(f"获取帖子详情失败: {str(e)}", 500)
 
+@community_bp.route('/posts/<int:post_id>/comments', methods=['GET'])
+def get_comments(post_id):
+    """分页获取帖子评论"""
+    cursor_str = request.args.get('cursor')
+    limit = min(int(request.args.get('limit', 20)), 100)
+    
+    try:
+        after = decode_comment_cursor(cursor_str) if cursor_str else None
+    except ValueError as e:
+        return error_response(str(e))
+    
+    try:
+        with get_db_cursor(commit=False) as cursor:
+            cursor.execute("""
+                SELECT post_id FROM post WHERE post_id = %s AND status = 'approved'
+            """, (post_id,))
+            if not cursor.fetchone():
+                return error_response("帖子不存在", 404)
+            
+            comments, next_cursor = fetch_comments_page(cursor, post_id, after, limit)
+            
+            return jsonify(success_response({
+                "comments": comments,
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None
+            }))
+            
+    except Exception as e:
+        return error_response(f"获取评论列表失败: {str(e)}", 500)
+
 @community_bp.route('/posts/<int:post_id>/comments', methods=['POST'])
 def create_comment(post_id):
     """创建评论"""
@@ -145,10 +302,12 @@ def create_comment(post_id):
             """, (post_id, user_id, content))
             
             comment_id = cursor.lastrowid
-            
-            return jsonify(success_response({
-                "comment_id": comment_id
-            }, "评论成功"))
+        
+        PostFeed.on_comment(post_id)
+        
+        return jsonify(success_response({
+            "comment_id": comment_id
+        }, "评论成功"))
             
     except Exception as e:
         return error_response(f"创建评论失败: {str(e)}", 500)
\ No newline at end of file
@@ -1,6 +1,13 @@
+from itertools import islice
 from flask import Blueprint, request, jsonify
 from app.utils.db import get_db_cursor
 from app.schemas.response import success_response, error_response
+from app.utils.vocab_index import VocabIndex
+from app.utils.catalog import Catalog
+from app.utils.content_search import ContentSearch
+from app.utils.bitmap import RoaringBitmap
+from app.models.learned_items import LearnedItems
+from app.models.vocab_review import VocabReview
 
 learning_bp = Blueprint('learning', __name__)
 
@@ -13,11 +20,10 @@ def get_vocab_list():
     offset = (page - 1) * per_page
     
     try:
+        # 各等级总数来自目录缓存
+        total = Catalog.vocab_count(level)
+        
         with get_db_cursor(commit=False) as cursor:
-            # 获取总数
-            cursor.execute("SELECT COUNT(*) as total FROM vocab WHERE level = %s", (level,))
-            total = cursor.fetchone()['total']
-            
             # 获取词汇列表
             cursor.execute("""
                 SELECT word_id, word, meaning, example, level
@@ -38,6 +44,129 @@ def get_vocab_list():
     except Exception as e:
         return error_response(f"获取词汇列表失败: {str(e)}", 500)
 
+@learning_bp.route('/vocab/search', methods=['GET'])
+def search_vocab():
+    """搜索词汇（单词前缀补全 + 释义/例句全文检索）"""
+    query = request.args.get('q', '').strip()
+    level = request.args.get('level')
+    limit = min(int(request.args.get('limit', 20)), 100)
+    fuzzy = request.args.get('fuzzy', 'false').lower() == 'true'
+    
+    if not query:
+        return error_response("搜索关键词不能为空")
+    
+    try:
+        results = VocabIndex.search(query, level=level, limit=limit, fuzzy=fuzzy)
+        
+        return jsonify(success_response({
+            "query": query,
+            "total": len(results),
+            "data": results
+        }))
+        
+    except Exception as e:
+        return error_response(f"搜索词汇失败: {str(e)}", 500)
+
+@learning_bp.route('/vocab/unlearned', methods=['GET'])
+def get_unlearned_vocab():
+    """获取用户在某等级下尚未学习的词汇"""
+    user_id = request.args.get('user_id', type=int)
+    level = request.args.get('level', 'A1')
+    page = int(request.args.get('page', 1))
+    per_page = min(int(request.args.get('per_page', 20)), 100)
+    offset = (page - 1) * per_page
+    
+    if not user_id:
+        return error_response("用户ID不能为空")
+    
+    try:
+        learned = LearnedItems.get(user_id, 'vocab')
+        
+        with get_db_cursor(commit=False) as cursor:
+            cursor.execute("SELECT word_id FROM vocab WHERE level = %s", (level,))
+            level_words = RoaringBitmap(row['word_id'] for row in cursor.fetchall())
+            
+            # 位图差集得到未学词汇，按word_id升序分页
+            unlearned = level_words - learned
+            page_ids = list(islice(unlearned, offset, offset + per_page))
+            
+            vocab_list = []
+            if page_ids:
+                placeholders = ', '.join(['%s'] * len(page_ids))
+                cursor.execute(f"""
+                    SELECT word_id, word, meaning, example, level
+                    FROM vocab
+                    WHERE word_id IN ({placeholders})
+                    ORDER BY word_id
+                """, page_ids)
+                vocab_list = cursor.fetchall()
+            
+            return jsonify(success_response({
+                "total": len(unlearned),
+                "learned": len(level_words & learned),
+                "page": page,
+                "per_page": per_page,
+                "data": vocab_list
+            }))
+            
+    except Exception as e:
+        return error_response(f"获取未学词汇失败: {str(e)}", 500)
+
+@learning_bp.route('/review/due', methods=['GET'])
+def get_due_reviews():
+    """获取用户到期待复习的词汇"""
+    user_id = request.args.get('user_id', type=int)
+    limit = min(int(request.args.get('limit', 20)), 100)
+    
+    if not user_id:
+        return error_response("用户ID不能为空")
+    
+    try:
+        total, words = VocabReview.get_due(user_id, limit=limit)
+        
+        return jsonify(success_response({
+            "total_due": total,
+            "data": words
+        }))
+        
+    except Exception as e:
+        return error_response(f"获取待复习词汇失败: {str(e)}", 500)
+
+@learning_bp.route('/review/grade', methods=['POST'])
+def grade_reviews():
+    """批量提交一次复习的评分"""
+    data = request.get_json() or {}
+    user_id = data.get('user_id')
+    grades = data.get('grades')
+    
+    if not user_id or not isinstance(grades, list) or not grades:
+        return error_response("用户ID和评分列表不能为空")
+    
+    if len(grades) > 200:
+        return error_response("单次最多提交200个评分")
+    
+    parsed = {}
+    for item in grades:
+        if not isinstance(item, dict):
+            return error_response("评分格式错误，每项须为包含word_id和quality的对象")
+        word_id = item.get('word_id')
+        quality = item.get('quality')
+        if (not LearnedItems.valid_id(word_id) or not isinstance(quality, int)
+                or isinstance(quality, bool) or not 0 <= quality <= 5):
+            return error_response("评分格式错误，word_id为非负整数，quality为0-5的整数")
+        parsed[word_id] = quality
+    
+    try:
+        results = VocabReview.grade(user_id, parsed)
+        
+        return jsonify(success_response({
+            "reviewed": len(results),
+            "data": results
+        }, "复习结果已保存"))
+        
+    except Exception as e:
+        return error_response(f"保存复习结果失败: {str(e)}", 500)
+
 @learning_bp.route('/grammar', methods=['GET'])
 def get_grammar_list():
     """获取语法教程列表"""
@@ -76,4 +205,30 @@ def get_listening_list():
             return jsonify(success_response(listening_list))
             
     except Exception as e:
-        return error_response(f"获取听力列表失败: {str(e)}", 500)
\ No newline at end of file
+        return error_response(f"获取听力列表失败: {str(e)}", 500)
+
+@learning_bp.route('/search', methods=['GET'])
+def search_content():
+    """全文检索语法教程和听力原文"""
+    query = request.args.get('q', '').strip()
+    content_type = request.args.get('type')
+    level = request.args.get('level')
+    limit = min(int(request.args.get('limit', 20)), 100)
+    
+    if not query:
+        return error_response("搜索关键词不能为空")
+    
+    if content_type and content_type not in ['grammar', 'listening']:
+        return error_response("无效的内容类型")
+    
+    try:
+        results = ContentSearch.search(query, content_type=content_type, level=level, limit=limit)
+        
+        return jsonify(success_response({
+            "query": query,
+            "total": len(results),
+            "data": results
+        }))
+        
+    except Exception as e:
+        return error_response(f"搜索学习内容失败: {str(e)}", 500)
\ No newline at end of file
@@ -4,6 +4,9 @@ from datetime import datetime, timezone, timedelta
 from app.utils.db import get_db_cursor
 from app.utils.auth_utils import verify_token
 from app.models.activity_log import ActivityLog
+from app.models.learned_items import LearnedItems
+from app.models.vocab_review import VocabReview
+from app.utils.log_archive import LogArchive
 from app.schemas.response import success_response, error_response
 
 logs_bp = Blueprint('logs', __name__)
@@ -179,6 +182,34 @@ def get_log_statistics():
     except Exception as e:
         return error_response(f"获取日志统计失败: {str(e)}", 500)
 
+@logs_bp.route('/archive', methods=['POST'])
+@admin_required
+def archive_logs():
+    """归档超出保留期的月份日志并清理过期归档（由定时任务每月调用一次）"""
+    try:
+        result = LogArchive.archive_expired()
+        return jsonify(success_response(result, "日志归档完成"))
+
+    except Exception as e:
+        return error_response(f"日志归档失败: {str(e)}", 500)
+
+@logs_bp.route('/migrate-partitions', methods=['POST'])
+@admin_required
+def migrate_log_partitions():
+    """
+    把未分区的旧日志集合复制到各月集合（drop=true 时复制完成后删除旧集合），
+    并把各月集合中的旧格式文档转为紧凑编码
+    """
+    try:
+        drop = request.args.get('drop', 'false').lower() == 'true'
+        migrated = LogArchive.migrate_legacy(drop=drop)
+        compacted = LogArchive.compact_partitions()
+        return jsonify(success_response({'migrated': migrated, 'dropped': drop, 'compacted': compacted},
+                                        "日志分区迁移完成"))
+
+    except Exception as e:
+        return error_response(f"日志分区迁移失败: {str(e)}", 500)
+
 @logs_bp.route('/create', methods=['POST'])
 @auth_required
 def create_log():
@@ -242,14 +273,18 @@ def log_quiz_attempt():
 def log_learning_progress():
     """记录学习进度"""
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         content_type = data.get('content_type')  # vocab, grammar, listening
         content_id = data.get('content_id')
         action = data.get('action')  # started, completed, reviewed
 
-        if not all([content_type, content_id, action]):
+        if not all([content_type, action]) or content_id is None:
             return error_response("缺少必要参数", 400)
 
+        # 内容ID要记入已学位图，与 content_ids 一样只接受非负整数
+        if not LearnedItems.valid_id(content_id):
+            return error_response("content_id必须是非负整数", 400)
+
         if content_type not in ['vocab', 'grammar', 'listening']:
             return error_response("无效的内容类型", 400)
 
@@ -259,6 +294,21 @@ def log_learning_progress():
         user_id = request.current_user['user_id']
         nickname = request.current_user['nickname']
 
+        quality = data.get('quality', 4)  # reviewed时的回忆质量 0-5
+        if not isinstance(quality, int) or isinstance(quality, bool) or not 0 <= quality <= 5:
+            return error_response("quality必须是0-5的整数", 400)
+
+        # 完成学习的内容记入已学集合，进度计数随之更新
+        if action == 'completed':
+            LearnedItems.mark(user_id, content_type, [content_id])
+
+        # 词汇学完后进入复习计划，复习事件按回忆质量重新排期
+        if content_type == 'vocab':
+            if action == 'completed':
+                VocabReview.enroll(user_id, [content_id])
+            elif action == 'reviewed':
+                VocabReview.grade(user_id, {content_id: quality})
+
         log_id = ActivityLog.log_learning_progress(
             user_id, nickname, content_type, content_id, action
         )
@@ -1,32 +1,69 @@
-from flask import Blueprint, request, jsonify
+import secrets
+import jwt
+from flask import Blueprint, request, jsonify, current_app
+from app.config import Config
 from app.utils.db import get_db_cursor
+from app.utils.quiz_bank import QuizBank, LEVEL_TARGETS
+from app.utils.catalog import Catalog
+from app.utils.answer_batch import AnswerBuffer, OPTION_CODES
+from app.utils.leaderboard import Leaderboard, WINDOWS
+from app.utils.nickname import NicknameResolver
+from app.models.item_stats import ItemStats
 from app.schemas.response import success_response, error_response
-from datetime import datetime
+from datetime import datetime, timedelta
 
 quiz_bp = Blueprint('quiz', __name__)
 
+# 单次组卷最多题目数
+MAX_GENERATED_QUESTIONS = 50
+
+def encode_quiz_token(seed, question_ids):
+    """将组卷结果签名为令牌，提交时据此评分，不依赖服务端缓存"""
+    payload = {
+        'seed': seed,
+        'questions': question_ids,
+        'exp': datetime.utcnow() + timedelta(seconds=Config.QUIZ_TOKEN_TTL)
+    }
+    return jwt.encode(payload, current_app.config['JWT_SECRET_KEY'], algorithm='HS256')
+
+def decode_quiz_token(token):
+    """校验试卷令牌，返回题目ID列表；无效或过期时抛出ValueError"""
+    try:
+        payload = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
+        return payload['questions']
+    except (jwt.InvalidTokenError, KeyError):
+        raise ValueError("试卷令牌无效或已过期")
+
+def grade_answers(correct_answers, answers):
+    """
+    按标准答案评分
+    :param correct_answers: {question_id: {'correct_opt', 'score'}}
+    :param answers: {str(question_id): selected_option}
+    :return: (得分, 答对数, 逐题作答 [(question_id, 选项, 是否答对)])，无效选项记为未作答(None)
+    """
+    total_score = 0
+    correct_count = 0
+    answer_rows = []
+    for question_id, correct_info in correct_answers.items():
+        selected = answers.get(str(question_id))
+        if not (isinstance(selected, str) and selected in OPTION_CODES):
+            selected = None
+        correct = selected is not None and selected == correct_info['correct_opt']
+        if correct:
+            total_score += correct_info['score']
+            correct_count += 1
+        answer_rows.append((question_id, selected, correct))
+    return total_score, correct_count, answer_rows
+
 @quiz_bp.route('/list', methods=['GET'])
 def get_quiz_list():
     """获取测验列表"""
     quiz_type = request.args.get('type')
     
     try:
-        with get_db_cursor(commit=False) as cursor:
-            if quiz_type:
-                cursor.execute("""
-                    SELECT quiz_id, quiz_type, title, total_points
-                    FROM quiz
-                    WHERE quiz_type = %s
-                """, (quiz_type,))
-            else:
-                cursor.execute("""
-                    SELECT quiz_id, quiz_type, title, total_points
-                    FROM quiz
-                """)
-            
-            quiz_list = cursor.fetchall()
-            
-            return jsonify(success_response(quiz_list))
+        quiz_list = Catalog.quizzes(quiz_type)
+        
+        return jsonify(success_response(quiz_list))
             
     except Exception as e:
         return error_response(f"获取测验列表失败: {str(e)}", 500)
@@ -77,26 +114,12 @@ def submit_quiz(quiz_id):
     
     try:
         with get_db_cursor() as cursor:
-            # 获取正确答案
-            cursor.execute("""
-                SELECT question_id, correct_opt, score
-                FROM quiz_question
-                WHERE quiz_id = %s
-            """, (quiz_id,))
-            
-            correct_answers = {q['question_id']: q for q in cursor.fetchall()}
+            # 获取正确答案（热门测验在预热时已缓存）
+            correct_answers = Catalog.answer_key(quiz_id, cursor)
             
-            # 计算得分
-            total_score = 0
-            correct_count = 0
+            total_score, correct_count, answer_rows = grade_answers(correct_answers, answers)
             total_count = len(correct_answers)
             
-            for question_id, correct_info in correct_answers.items():
-                if str(question_id) in answers:
-                    if answers[str(question_id)] == correct_info['correct_opt']:
-                        total_score += correct_info['score']
-                        correct_count += 1
-            
             # 保存测验结果
             cursor.execute("""
                 INSERT INTO quiz_result (user_id, quiz_id, score, correct_cnt, total_cnt)
@@ -114,14 +137,167 @@ def submit_quiz(quiz_id):
                 SELECT fn_get_level(%s) as level
             """, (accuracy,))
             level = cursor.fetchone()['level']
+        
+        AnswerBuffer.add(accuracy, answer_rows)
+        ItemStats.schedule()
+        Leaderboard.record(user_id, quiz_id, total_score)
+        
+        return jsonify(success_response({
+            "score": total_score,
+            "correct_count": correct_count,
+            "total_count": total_count,
+            "accuracy": accuracy,
+            "level": level
+        }, "测验提交成功"))
             
-            return jsonify(success_response({
-                "score": total_score,
-                "correct_count": correct_count,
-                "total_count": total_count,
-                "accuracy": accuracy,
-                "level": level
-            }, "测验提交成功"))
+    except Exception as e:
+        return error_response(f"提交测验失败: {str(e)}", 500)
+
+@quiz_bp.route('/leaderboard', methods=['GET'])
+def get_leaderboard():
+    """获取排行榜（按测验或总榜，全部时间或本周）"""
+    quiz_id = request.args.get('quiz_id', type=int)
+    window = request.args.get('window', 'all')
+    page = int(request.args.get('page', 1))
+    per_page = min(int(request.args.get('per_page', 20)), 100)
+    
+    if window not in WINDOWS:
+        return error_response("无效的时间范围")
+    
+    try:
+        total, entries = Leaderboard.top(quiz_id, window, offset=(page - 1) * per_page, limit=per_page)
+        
+        return jsonify(success_response({
+            "quiz_id": quiz_id,
+            "window": window,
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "data": NicknameResolver.attach(entries)
+        }))
+        
+    except Exception as e:
+        return error_response(f"获取排行榜失败: {str(e)}", 500)
+
+@quiz_bp.route('/leaderboard/rank/<int:user_id>', methods=['GET'])
+def get_leaderboard_rank(user_id):
+    """获取用户在排行榜中的名次"""
+    quiz_id = request.args.get('quiz_id', type=int)
+    window = request.args.get('window', 'all')
+    
+    if window not in WINDOWS:
+        return error_response("无效的时间范围")
+    
+    try:
+        result = Leaderboard.rank(user_id, quiz_id, window)
+        result.update({"user_id": user_id, "quiz_id": quiz_id, "window": window})
+        
+        return jsonify(success_response(result))
+        
+    except Exception as e:
+        return error_response(f"获取排名失败: {str(e)}", 500)
+
+@quiz_bp.route('/generate', methods=['POST'])
+def generate_quiz():
+    """按目标等级从题库随机组卷"""
+    data = request.get_json() or {}
+    quiz_type = data.get('type')
+    level = data.get('level', 'B1')
+    count = data.get('count', 10)
+    seed = data.get('seed')
+    
+    if quiz_type and quiz_type not in ['vocab', 'grammar', 'listening']:
+        return error_response("无效的测验类型")
+    
+    if level not in LEVEL_TARGETS:
+        return error_response("无效的难度等级")
+    
+    if not isinstance(count, int) or not 1 <= count <= MAX_GENERATED_QUESTIONS:
+        return error_response(f"题目数量必须在1-{MAX_GENERATED_QUESTIONS}之间")
+    
+    if seed is None:
+        seed = secrets.randbits(31)
+    elif not isinstance(seed, int):
+        return error_response("种子必须是整数")
+    
+    try:
+        question_ids = QuizBank.generate(seed, quiz_type, level, count)
+        if not question_ids:
+            return error_response("题库中没有可用的题目", 404)
+        
+        with get_db_cursor(commit=False) as cursor:
+            placeholders = ', '.join(['%s'] * len(question_ids))
+            cursor.execute(f"""
+                SELECT question_id, question, option_a, option_b, 
+                       option_c, option_d, score
+                FROM quiz_question
+                WHERE question_id IN ({placeholders})
+            """, question_ids)
+            rows = {row['question_id']: row for row in cursor.fetchall()}
+        
+        # 保持抽样顺序，跳过统计刷新前已被删除的题目
+        questions = [rows[qid] for qid in question_ids if qid in rows]
+        
+        return jsonify(success_response({
+            "seed": seed,
+            "type": quiz_type,
+            "level": level,
+            "quiz_token": encode_quiz_token(seed, [q['question_id'] for q in questions]),
+            "total_points": sum(q['score'] or 0 for q in questions),
+            "questions": questions
+        }))
+        
+    except Exception as e:
+        return error_response(f"生成测验失败: {str(e)}", 500)
+
+@quiz_bp.route('/generated/submit', methods=['POST'])
+def submit_generated_quiz():
+    """提交随机组卷的答案"""
+    data = request.get_json() or {}
+    user_id = data.get('user_id')
+    quiz_token = data.get('quiz_token')
+    answers = data.get('answers', {})  # {question_id: selected_option}
+    
+    if not user_id or not quiz_token:
+        return error_response("用户ID和试卷令牌不能为空")
+    
+    try:
+        question_ids = decode_quiz_token(quiz_token)
+    except ValueError as e:
+        return error_response(str(e))
+    
+    try:
+        with get_db_cursor(commit=False) as cursor:
+            placeholders = ', '.join(['%s'] * len(question_ids))
+            cursor.execute(f"""
+                SELECT question_id, correct_opt, score
+                FROM quiz_question
+                WHERE question_id IN ({placeholders})
+            """, question_ids)
+            
+            correct_answers = {q['question_id']: q for q in cursor.fetchall()}
+            
+            total_score, correct_count, answer_rows = grade_answers(correct_answers, answers)
+            total_count = len(question_ids)
+            
+            # 使用MySQL函数计算准确率和等级
+            cursor.execute("""
+                SELECT fn_calc_accuracy(%s, %s) as accuracy,
+                       fn_get_level(fn_calc_accuracy(%s, %s)) as level
+            """, (correct_count, total_count, correct_count, total_count))
+            result = cursor.fetchone()
+        
+        accuracy = float(result['accuracy'])
+        AnswerBuffer.add(accuracy, answer_rows)
+        ItemStats.schedule()
+        
+        return jsonify(success_response({
+            "score": total_score,
+            "correct_count": correct_count,
+            "total_count": total_count,
+            "accuracy": accuracy,
+            "level": result['level']
+        }, "测验提交成功"))
             
     except Exception as e:
-        return error_response(f"提交测验失败: {str(e)}", 500)
\ No newline at end of file
+        return error_response(f"提交测验失败: {str(e)}", 500)
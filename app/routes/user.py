@@ -1,6 +1,11 @@
+from itertools import islice
 from flask import Blueprint, request, jsonify
 from app.utils.db import get_db_cursor
+from app.utils.fanout import FanOut, sql_one, sql_all
 from app.schemas.response import success_response, error_response
+from app.utils.nickname import NicknameResolver
+from app.utils.progress_buffer import ProgressBuffer, PROGRESS_FIELDS
+from app.models.learned_items import LearnedItems
 
 user_bp = Blueprint('user', __name__)
 
@@ -62,27 +67,25 @@ def update_user_profile(user_id):
                 SET {', '.join(update_fields)}
                 WHERE user_id = %s
             """, params)
-            
-            return jsonify(success_response(None, "更新成功"))
+        
+        if 'nickname' in data:
+            NicknameResolver.invalidate(user_id)
+        
+        return jsonify(success_response(None, "更新成功"))
             
     except Exception as e:
         return error_response(f"更新用户信息失败: {str(e)}", 500)
 
 @user_bp.route('/progress/<int:user_id>', methods=['GET'])
 def get_user_progress(user_id):
-    """获取用户学习进度"""
+    """获取用户学习进度（进度和测验历史并发查询）"""
     try:
-        with get_db_cursor(commit=False) as cursor:
-            cursor.execute("""
+        outcome = FanOut.run({
+            'progress': sql_one("""
                 SELECT * FROM progress WHERE user_id = %s
-            """, (user_id,))
-            
-            progress = cursor.fetchone()
-            if not progress:
-                return error_response("进度信息不存在", 404)
-            
+            """, (user_id,)),
             # 获取测验历史
-            cursor.execute("""
+            'quiz_history': sql_all("""
                 SELECT qr.*, q.title, q.quiz_type
                 FROM quiz_result qr
                 JOIN quiz q ON qr.quiz_id = q.quiz_id
@@ -90,45 +93,114 @@ def get_user_progress(user_id):
                 ORDER BY qr.taken_at DESC
                 LIMIT 10
             """, (user_id,))
-            
-            quiz_history = cursor.fetchall()
-            
-            return jsonify(success_response({
-                "progress": progress,
-                "quiz_history": quiz_history
-            }))
+        })
+        
+        if 'progress' in outcome.errors:
+            return error_response(f"获取学习进度失败: {outcome.errors['progress']}", 500)
+        
+        progress = outcome.get('progress')
+        if not progress:
+            return error_response("进度信息不存在", 404)
+        
+        # 写缓冲中尚未同步的字段直接取已学集合的数量
+        pending = ProgressBuffer.pending_for(user_id)
+        if pending:
+            counts = LearnedItems.get_counts(user_id)
+            for content_type in pending:
+                progress[PROGRESS_FIELDS[content_type]] = counts[content_type]
+        
+        data = {
+            "progress": progress,
+            "quiz_history": outcome.get('quiz_history', [])
+        }
+        # 测验历史查询失败时仍返回进度
+        if outcome.errors:
+            data['failed'] = outcome.errors
+        
+        return jsonify(success_response(data))
             
     except Exception as e:
         return error_response(f"获取学习进度失败: {str(e)}", 500)
 
 @user_bp.route('/progress/<int:user_id>', methods=['PUT'])
 def update_user_progress(user_id):
-    """更新用户学习进度"""
-    data = request.get_json()
+    """更新用户学习进度（记入已学集合，计数由集合的变化量得出）"""
+    data = request.get_json(silent=True) or {}
     progress_type = data.get('type')  # vocab, grammar, listening
-    increment = data.get('increment', 1)
     
-    if progress_type not in ['vocab', 'grammar', 'listening']:
+    if progress_type not in PROGRESS_FIELDS:
         return error_response("无效的进度类型")
     
+    content_ids = LearnedItems.parse_ids(data.get('content_ids'))
+    if content_ids is None:
+        return error_response("内容ID格式错误，应为非负整数数组")
+    
+    if not content_ids:
+        return error_response("内容ID不能为空")
+    
     try:
-        with get_db_cursor() as cursor:
-            field_map = {
-                'vocab': 'vocab_learned',
-                'grammar': 'grammar_learned',
-                'listening': 'listening_done'
-            }
-            
-            field = field_map[progress_type]
-            
-            cursor.execute(f"""
-                UPDATE progress 
-                SET {field} = {field} + %s,
-                    last_update = CURRENT_TIMESTAMP
-                WHERE user_id = %s
-            """, (increment, user_id))
-            
-            return jsonify(success_response(None, "进度更新成功"))
+        count = LearnedItems.mark(user_id, progress_type, content_ids)
+        
+        return jsonify(success_response({"count": count}, "进度更新成功"))
             
     except Exception as e:
-        return error_response(f"更新进度失败: {str(e)}", 500)
\ No newline at end of file
+        return error_response(f"更新进度失败: {str(e)}", 500)
+
+@user_bp.route('/learned/<int:user_id>', methods=['GET'])
+def get_learned_items(user_id):
+    """获取用户已学内容"""
+    content_type = request.args.get('type')
+    page = int(request.args.get('page', 1))
+    per_page = min(int(request.args.get('per_page', 100)), 1000)
+    offset = (page - 1) * per_page
+    
+    try:
+        if not content_type:
+            return jsonify(success_response(LearnedItems.get_counts(user_id)))
+        
+        if content_type not in PROGRESS_FIELDS:
+            return error_response("无效的内容类型")
+        
+        learned = LearnedItems.get(user_id, content_type)
+        
+        return jsonify(success_response({
+            "type": content_type,
+            "total": len(learned),
+            "page": page,
+            "per_page": per_page,
+            "data": list(islice(learned, offset, offset + per_page))
+        }))
+        
+    except Exception as e:
+        return error_response(f"获取已学内容失败: {str(e)}", 500)
+
+@user_bp.route('/learned/<int:user_id>', methods=['POST'])
+def mark_learned_items(user_id):
+    """标记内容为已学或未学"""
+    data = request.get_json(silent=True) or {}
+    content_type = data.get('type')
+    learned = data.get('learned', True)
+    
+    if content_type not in PROGRESS_FIELDS:
+        return error_response("无效的内容类型")
+    
+    if not isinstance(learned, bool):
+        return error_response("learned 必须为布尔值")
+    
+    content_ids = LearnedItems.parse_ids(data.get('content_ids', []))
+    if content_ids is None:
+        return error_response("内容ID格式错误，应为非负整数数组")
+    
+    if not content_ids:
+        return error_response("内容ID不能为空")
+    
+    try:
+        count = LearnedItems.mark(user_id, content_type, content_ids, learned=learned)
+        
+        return jsonify(success_response({
+            "type": content_type,
+            "count": count
+        }, "已学内容更新成功"))
+        
+    except Exception as e:
+        return error_response(f"更新已学内容失败: {str(e)}", 500)
\ No newline at end of file
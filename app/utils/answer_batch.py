@@ -0,0 +1,207 @@
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from app.config import Config
+from app.utils.db import get_db_cursor
+from app.utils.lifecycle import Lifecycle
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 选项编码，0表示未作答或无效选项
+OPTION_CODES = {'A': 1, 'B': 2, 'C': 3, 'D': 4}
+OPTIONS = (None, 'A', 'B', 'C', 'D')
+
+_HEADER = struct.Struct('<4sII')
+_MAGIC = b'QAB1'
+_BIG_ENDIAN = sys.byteorder == 'big'
+
+def _column_bytes(values):
+    if _BIG_ENDIAN:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def _read_column(typecode, data, offset, count):
+    values = array(typecode)
+    end = offset + count * values.itemsize
+    values.frombytes(data[offset:end])
+    if _BIG_ENDIAN:
+        values.byteswap()
+    return values, end
+
+def encode_batch(submissions):
+    """
+    将一批作答记录编码为列式二进制并压缩
+    格式：魔数 + 提交数 + 作答数，随后依次为各列：
+    提交正确率（万分比uint16）、每次提交的作答数（uint16）、
+    题目ID（uint32）、选项编码（uint8）、是否答对（位图）
+    :param submissions: [(正确率0-100, [(question_id, 选项, 是否答对)])]
+    """
+    scores = array('H')
+    lengths = array('H')
+    question_ids = array('I')
+    options = array('B')
+    flags = []
+    for accuracy, answers in submissions:
+        scores.append(min(10000, max(0, round(accuracy * 100))))
+        lengths.append(len(answers))
+        for question_id, option, correct in answers:
+            question_ids.append(question_id)
+            options.append(OPTION_CODES[option] if isinstance(option, str) and option in OPTION_CODES else 0)
+            flags.append(correct)
+
+    correct_bits = bytearray((len(flags) + 7) // 8)
+    for i, correct in enumerate(flags):
+        if correct:
+            correct_bits[i >> 3] |= 1 << (i & 7)
+
+    raw = b''.join([
+        _HEADER.pack(_MAGIC, len(scores), len(question_ids)),
+        _column_bytes(scores), _column_bytes(lengths),
+        _column_bytes(question_ids), options.tobytes(), bytes(correct_bits)
+    ])
+    return zlib.compress(raw, 6)
+
+def decode_batch(data):
+    """
+    解码encode_batch()的结果
+    :return: 逐次提交的 (正确率0-100, [(question_id, 选项, 是否答对)])
+    """
+    raw = zlib.decompress(data)
+    magic, n_submissions, n_answers = _HEADER.unpack_from(raw, 0)
+    if magic != _MAGIC:
+        raise ValueError("无效的作答批次数据")
+    offset = _HEADER.size
+    scores, offset = _read_column('H', raw, offset, n_submissions)
+    lengths, offset = _read_column('H', raw, offset, n_submissions)
+    question_ids, offset = _read_column('I', raw, offset, n_answers)
+    options, offset = _read_column('B', raw, offset, n_answers)
+    correct_bits = raw[offset:offset + (n_answers + 7) // 8]
+
+    pos = 0
+    for score, length in zip(scores, lengths):
+        answers = []
+        for i in range(pos, pos + length):
+            answers.append((question_ids[i], OPTIONS[options[i]], bool(correct_bits[i >> 3] >> (i & 7) & 1)))
+        pos += length
+        yield score / 100, answers
+
+class AnswerBuffer:
+    """
+    逐题作答记录的批量写入缓冲
+    提交测验时只把作答追加到内存，由后台线程按固定间隔或累计作答数达到阈值时
+    编码成一行列式批次写入 quiz_answer_batch，供题目统计任务增量汇总
+    """
+
+    _lock = threading.Lock()
+    _pending = []          # [(正确率, [(question_id, 选项, 是否答对)])]
+    _pending_answers = 0
+    _wakeup = threading.Event()
+    _flusher = None
+    _flusher_pid = None
+
+    @classmethod
+    def add(cls, accuracy, answers):
+        """
+        记录一次提交的逐题作答
+        :param accuracy: 本次提交的正确率 0-100
+        :param answers: [(question_id, 选项, 是否答对)]
+        """
+        if not answers:
+            return
+        with cls._lock:
+            cls._pending.append((accuracy, answers))
+            cls._pending_answers += len(answers)
+            size = cls._pending_answers
+        cls._ensure_flusher()
+        if size >= Config.ANSWER_BATCH_SIZE:
+            cls._wakeup.set()
+
+    @classmethod
+    def flush(cls):
+        """立即写入缓冲中的全部作答，写库失败时放回缓冲等待重试；无法编码的提交直接丢弃"""
+        with cls._lock:
+            batch, cls._pending = cls._pending, []
+            answer_count, cls._pending_answers = cls._pending_answers, 0
+        if not batch:
+            return 0
+        try:
+            data = encode_batch(batch)
+        except Exception:
+            batch, answer_count = cls._encodable(batch)
+            if not batch:
+                return 0
+            data = encode_batch(batch)
+        try:
+            with get_db_cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO quiz_answer_batch (submission_count, answer_count, data)
+                    VALUES (%s, %s, %s)
+                """, (len(batch), answer_count, data))
+            return answer_count
+        except Exception as e:
+            logger.error(f"写入作答记录失败，{answer_count} 条作答将在下次重试: {e}")
+            with cls._lock:
+                cls._pending[:0] = batch
+                cls._pending_answers += answer_count
+            raise
+
+    @staticmethod
+    def _encodable(batch):
+        """逐个检查提交能否编码，丢弃不能编码的（重试也不会成功），返回 (剩余提交, 作答数)"""
+        kept = []
+        for submission in batch:
+            try:
+                encode_batch([submission])
+            except Exception as e:
+                logger.error(f"丢弃无法编码的作答记录 {submission!r}: {e}")
+                continue
+            kept.append(submission)
+        return kept, sum(len(answers) for _, answers in kept)
+
+    @classmethod
+    def _ensure_flusher(cls):
+        """按需启动后台刷新线程（fork出的子进程需要重新启动）"""
+        if cls._flusher_pid == os.getpid() and cls._flusher and cls._flusher.is_alive():
+            return
+        with cls._lock:
+            if cls._flusher_pid == os.getpid() and cls._flusher and cls._flusher.is_alive():
+                return
+            cls._flusher = threading.Thread(target=cls._run, name='answer-flusher', daemon=True)
+            cls._flusher_pid = os.getpid()
+            cls._flusher.start()
+
+    @classmethod
+    def _run(cls):
+        while True:
+            cls._wakeup.wait(Config.ANSWER_FLUSH_INTERVAL)
+            cls._wakeup.clear()
+            try:
+                cls.flush()
+            except Exception:
+                time.sleep(Config.ANSWER_FLUSH_INTERVAL)
+
+    @classmethod
+    def reset_after_fork(cls):
+        """子进程不继承父进程的锁、缓冲和刷新线程，缓冲内容仍由父进程负责写入"""
+        cls._lock = threading.Lock()
+        cls._pending = []
+        cls._pending_answers = 0
+        cls._wakeup = threading.Event()
+        cls._flusher = None
+
+    @classmethod
+    def shutdown(cls):
+        """进程退出前写入剩余作答"""
+        try:
+            cls.flush()
+        except Exception as e:
+            logger.error(f"退出时写入作答记录失败: {e}")
+
+Lifecycle.on_fork(AnswerBuffer.reset_after_fork)
+Lifecycle.on_shutdown(AnswerBuffer.shutdown)
@@ -8,12 +8,16 @@ def generate_salt():
     """生成16字符的盐值"""
     return secrets.token_hex(8)
 
-def hash_password(password, salt):
-    """调用MySQL存储函数进行密码哈希"""
-    with get_db_cursor(commit=False) as cursor:
-        cursor.execute("SELECT hash_password(%s, %s) as pwd_hash", (password, salt))
-        result = cursor.fetchone()
-        return result['pwd_hash']
+def hash_password(password, salt, cursor=None):
+    """
+    调用MySQL存储函数进行密码哈希
+    :param cursor: 调用方已持有的游标，传入时复用其连接，不再从连接池另取
+    """
+    if cursor is None:
+        with get_db_cursor(commit=False) as cursor:
+            return hash_password(password, salt, cursor)
+    cursor.execute("SELECT hash_password(%s, %s) as pwd_hash", (password, salt))
+    return cursor.fetchone()['pwd_hash']
 
 def generate_token(user_id):
     """生成JWT token"""
@@ -0,0 +1,189 @@
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+# 容器内元素不超过该数量时使用有序数组，否则使用65536位的位图
+ARRAY_MAX = 4096
+BITMAP_BYTES = 65536 // 8
+
+_HEADER = struct.Struct('<4sI')
+_CONTAINER = struct.Struct('<HBI')
+_MAGIC = b'RBM1'
+_BIG_ENDIAN = sys.byteorder == 'big'
+
+def _array_to_bits(values):
+    buf = bytearray(BITMAP_BYTES)
+    for v in values:
+        buf[v >> 3] |= 1 << (v & 7)
+    return int.from_bytes(buf, 'little')
+
+def _iter_bits(bits):
+    for i, byte in enumerate(bits.to_bytes(BITMAP_BYTES, 'little')):
+        if byte:
+            base = i << 3
+            for j in range(8):
+                if byte >> j & 1:
+                    yield base | j
+
+def _normalize(bits):
+    """按基数选择容器类型：稀疏时转为有序数组"""
+    count = bits.bit_count()
+    if count == 0:
+        return None
+    if count <= ARRAY_MAX:
+        return array('H', _iter_bits(bits))
+    return bits
+
+def _as_bits(container):
+    return container if isinstance(container, int) else _array_to_bits(container)
+
+class RoaringBitmap:
+    """
+    Roaring风格的压缩位图
+    32位整数按高16位分桶，每个桶内按基数选择有序数组（稀疏）或位图（稠密）
+    """
+
+    __slots__ = ('_containers',)
+
+    def __init__(self, values=()):
+        self._containers = {}  # 高16位 -> array('H') 或 int位图
+        self.update(values)
+
+    def add(self, value):
+        self.update((value,))
+
+    def update(self, values):
+        """批量加入元素"""
+        groups = {}
+        for value in values:
+            if not 0 <= value <= 0xFFFFFFFF:
+                raise ValueError(f"超出32位无符号整数范围: {value}")
+            groups.setdefault(value >> 16, []).append(value & 0xFFFF)
+        for high, lows in groups.items():
+            container = self._containers.get(high)
+            if container is None and len(lows) <= ARRAY_MAX:
+                self._containers[high] = array('H', sorted(set(lows)))
+                continue
+            bits = _as_bits(container) if container is not None else 0
+            self._containers[high] = _normalize(bits | _array_to_bits(lows))
+
+    def discard(self, value):
+        high, low = value >> 16, value & 0xFFFF
+        container = self._containers.get(high)
+        if container is None:
+            return
+        if isinstance(container, int):
+            result = _normalize(container & ~(1 << low))
+        else:
+            pos = bisect_left(container, low)
+            if pos == len(container) or container[pos] != low:
+                return
+            del container[pos]
+            result = container if container else None
+        if result is None:
+            del self._containers[high]
+        else:
+            self._containers[high] = result
+
+    def __contains__(self, value):
+        container = self._containers.get(value >> 16)
+        if container is None:
+            return False
+        low = value & 0xFFFF
+        if isinstance(container, int):
+            return bool(container >> low & 1)
+        pos = bisect_left(container, low)
+        return pos < len(container) and container[pos] == low
+
+    def __len__(self):
+        return sum(c.bit_count() if isinstance(c, int) else len(c) for c in self._containers.values())
+
+    def __bool__(self):
+        return bool(self._containers)
+
+    def __iter__(self):
+        for high in sorted(self._containers):
+            base = high << 16
+            container = self._containers[high]
+            lows = _iter_bits(container) if isinstance(container, int) else container
+            for low in lows:
+                yield base | low
+
+    def __eq__(self, other):
+        return isinstance(other, RoaringBitmap) and list(self) == list(other)
+
+    def _combine(self, other, bit_op, set_op, keys):
+        result = RoaringBitmap()
+        for high in keys:
+            a = self._containers.get(high)
+            b = other._containers.get(high)
+            if isinstance(a, int) or isinstance(b, int):
+                container = _normalize(bit_op(_as_bits(a) if a is not None else 0,
+                                              _as_bits(b) if b is not None else 0))
+            else:
+                # 两个稀疏容器直接做集合运算，避免展开成位图
+                values = set_op(set(a or ()), set(b or ()))
+                if len(values) > ARRAY_MAX:
+                    container = _array_to_bits(values)
+                else:
+                    container = array('H', sorted(values)) if values else None
+            if container is not None:
+                result._containers[high] = container
+        return result
+
+    def __or__(self, other):
+        return self._combine(other, int.__or__, set.__or__,
+                             self._containers.keys() | other._containers.keys())
+
+    def __and__(self, other):
+        return self._combine(other, int.__and__, set.__and__,
+                             self._containers.keys() & other._containers.keys())
+
+    def __sub__(self, other):
+        return self._combine(other, lambda a, b: a & ~b, set.__sub__, self._containers.keys())
+
+    def to_bytes(self):
+        """
+        序列化
+        格式：魔数 + 容器数，随后每个容器为 (高16位, 类型, 基数) + 数据；
+        数组容器存小端uint16，位图容器存8KB定长位图
+        """
+        parts = [_HEADER.pack(_MAGIC, len(self._containers))]
+        for high in sorted(self._containers):
+            container = self._containers[high]
+            if isinstance(container, int):
+                parts.append(_CONTAINER.pack(high, 1, container.bit_count()))
+                parts.append(container.to_bytes(BITMAP_BYTES, 'little'))
+            else:
+                parts.append(_CONTAINER.pack(high, 0, len(container)))
+                data = array('H', container)
+                if _BIG_ENDIAN:
+                    data.byteswap()
+                parts.append(data.tobytes())
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """从to_bytes()的结果恢复，空值返回空位图"""
+        bitmap = cls()
+        if not data:
+            return bitmap
+        magic, count = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC:
+            raise ValueError("无效的位图数据")
+        offset = _HEADER.size
+        for _ in range(count):
+            high, kind, cardinality = _CONTAINER.unpack_from(data, offset)
+            offset += _CONTAINER.size
+            if kind == 1:
+                bitmap._containers[high] = int.from_bytes(data[offset:offset + BITMAP_BYTES], 'little')
+                offset += BITMAP_BYTES
+            else:
+                values = array('H')
+                values.frombytes(data[offset:offset + cardinality * 2])
+                if _BIG_ENDIAN:
+                    values.byteswap()
+                bitmap._containers[high] = values
+                offset += cardinality * 2
+        return bitmap
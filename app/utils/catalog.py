@@ -0,0 +1,183 @@
+import threading
+import time
+from collections import OrderedDict
+from app.config import Config
+from app.utils.db import get_db_cursor
+from app.utils.lifecycle import Lifecycle
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Catalog:
+    """
+    热点目录数据缓存
+    - 各等级词汇数（词汇列表分页的总数）和测验列表，整体加载，超过刷新间隔后重建
+    - 测验标准答案按测验缓存（LRU，最多CATALOG_ANSWER_KEYS个），提交测验时只查询该测验题目的
+      数量和最大题目ID（索引覆盖），与缓存时不同说明其他进程增删过题目，重新加载
+    本进程内的增删改会立即失效对应数据，其他进程的变更在CATALOG_REFRESH秒内生效；
+    直接修改已有题目答案（不增删题目）的变更同样在CATALOG_REFRESH秒内生效
+    """
+
+    _lock = threading.Lock()
+    _build_lock = threading.Lock()
+    _loaded_at = None
+
+    _vocab_counts = {}           # 等级 -> 词汇数
+    _quizzes = []                # [{quiz_id, quiz_type, title, total_points}]
+    _answer_keys = OrderedDict() # quiz_id -> (加载时间, 版本, {question_id: {question_id, correct_opt, score}})
+
+    ANSWER_KEY_SQL = """
+        SELECT question_id, correct_opt, score
+        FROM quiz_question
+        WHERE quiz_id = %s
+    """
+    VERSION_SQL = """
+        SELECT COUNT(*) as question_count, MAX(question_id) as last_question
+        FROM quiz_question
+        WHERE quiz_id = %s
+    """
+
+    @classmethod
+    def ensure_loaded(cls):
+        """首次使用时加载，超过刷新间隔后重建"""
+        loaded_at = cls._loaded_at
+        refresh = Config.CATALOG_REFRESH
+        if loaded_at is not None and (refresh <= 0 or time.time() - loaded_at < refresh):
+            return
+
+        # 已有旧数据时，只由一个线程重建，其余请求继续使用旧数据
+        if not cls._build_lock.acquire(blocking=loaded_at is None):
+            return
+        try:
+            if cls._loaded_at is loaded_at:
+                cls.rebuild()
+        finally:
+            cls._build_lock.release()
+
+    @classmethod
+    def rebuild(cls):
+        """从MySQL重新加载词汇数和测验列表"""
+        start = time.time()
+        with get_db_cursor(commit=False) as cursor:
+            cursor.execute("SELECT level, COUNT(*) as total FROM vocab GROUP BY level")
+            vocab_counts = {row['level']: row['total'] for row in cursor.fetchall()}
+
+            cursor.execute("""
+                SELECT quiz_id, quiz_type, title, total_points
+                FROM quiz
+            """)
+            quizzes = cursor.fetchall()
+
+        with cls._lock:
+            cls._vocab_counts = vocab_counts
+            cls._quizzes = quizzes
+            cls._loaded_at = time.time()
+
+        logger.info(f"目录缓存构建完成: {len(quizzes)} 个测验, 耗时 {time.time() - start:.2f}s")
+
+    @classmethod
+    def invalidate(cls):
+        """词汇或测验变更后让下一次访问触发重建"""
+        if cls._loaded_at is not None:
+            cls._loaded_at = 0
+
+    @classmethod
+    def vocab_count(cls, level):
+        cls.ensure_loaded()
+        return cls._vocab_counts.get(level, 0)
+
+    @classmethod
+    def quizzes(cls, quiz_type=None):
+        cls.ensure_loaded()
+        quizzes = cls._quizzes
+        if quiz_type:
+            return [quiz for quiz in quizzes if quiz['quiz_type'] == quiz_type]
+        return list(quizzes)
+
+    @classmethod
+    def answer_key(cls, quiz_id, cursor=None):
+        """
+        获取测验的标准答案，未缓存、已过期或题目数量/最大ID与缓存时不同时重新查询
+        :param cursor: 可复用调用方的游标，省去一次取连接
+        :return: {question_id: {'question_id', 'correct_opt', 'score'}}
+        """
+        if cursor is None:
+            with get_db_cursor(commit=False) as cursor:
+                return cls.answer_key(quiz_id, cursor)
+
+        with cls._lock:
+            entry = cls._answer_keys.get(quiz_id)
+        if entry is not None and time.time() - entry[0] < Config.CATALOG_REFRESH:
+            cursor.execute(cls.VERSION_SQL, (quiz_id,))
+            row = cursor.fetchone()
+            if (row['question_count'], row['last_question']) == entry[1]:
+                with cls._lock:
+                    if quiz_id in cls._answer_keys:
+                        cls._answer_keys.move_to_end(quiz_id)
+                return entry[2]
+
+        cursor.execute(cls.ANSWER_KEY_SQL, (quiz_id,))
+        answer_key = {row['question_id']: row for row in cursor.fetchall()}
+        cls._store_answer_keys({quiz_id: answer_key})
+        return answer_key
+
+    @staticmethod
+    def _version(answer_key):
+        """与 VERSION_SQL 的结果对应：(题目数, 最大题目ID)"""
+        return len(answer_key), max(answer_key, default=None)
+
+    @classmethod
+    def preload_answer_keys(cls, limit):
+        """加载提交次数最多的若干个测验的标准答案（两次查询）"""
+        with get_db_cursor(commit=False) as cursor:
+            cursor.execute("""
+                SELECT quiz_id
+                FROM quiz_result
+                GROUP BY quiz_id
+                ORDER BY COUNT(*) DESC
+                LIMIT %s
+            """, (limit,))
+            quiz_ids = [row['quiz_id'] for row in cursor.fetchall()]
+            if not quiz_ids:
+                return 0
+
+            placeholders = ', '.join(['%s'] * len(quiz_ids))
+            cursor.execute(f"""
+                SELECT quiz_id, question_id, correct_opt, score
+                FROM quiz_question
+                WHERE quiz_id IN ({placeholders})
+            """, quiz_ids)
+            answer_keys = {quiz_id: {} for quiz_id in quiz_ids}
+            for row in cursor.fetchall():
+                answer_keys[row.pop('quiz_id')][row['question_id']] = row
+
+        # 提交最多的测验最后写入，LRU淘汰时最晚被淘汰
+        cls._store_answer_keys(dict(reversed(list(answer_keys.items()))))
+        return len(quiz_ids)
+
+    @classmethod
+    def _store_answer_keys(cls, answer_keys):
+        now = time.time()
+        with cls._lock:
+            for quiz_id, answer_key in answer_keys.items():
+                cls._answer_keys[quiz_id] = (now, cls._version(answer_key), answer_key)
+                cls._answer_keys.move_to_end(quiz_id)
+            while len(cls._answer_keys) > Config.CATALOG_ANSWER_KEYS:
+                cls._answer_keys.popitem(last=False)
+
+    @classmethod
+    def invalidate_answer_key(cls, quiz_id):
+        """题目变更后丢弃该测验的标准答案"""
+        with cls._lock:
+            cls._answer_keys.pop(quiz_id, None)
+
+    @classmethod
+    def reset_after_fork(cls):
+        """
+        子进程重新创建锁：fork时若有预热线程正在构建，子进程继承的构建锁永远不会释放；
+        已加载的数据随fork共享，构建未完成时 _loaded_at 仍为None，首次访问时重新加载
+        """
+        cls._lock = threading.Lock()
+        cls._build_lock = threading.Lock()
+
+Lifecycle.on_fork(Catalog.reset_after_fork)
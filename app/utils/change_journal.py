@@ -0,0 +1,89 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from app.config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，退化为进程内加锁
+    fcntl = None
+
+class ChangeJournal:
+    """
+    内存索引在多个worker之间的变更同步
+    写入方更新本进程索引后追加一行变更记录的ID，其他worker在使用索引前读取新增的行，
+    按ID从主库重新加载对应记录（与 ContentSearch 的追加日志相同，只是不写快照）；
+    文件超过 COMPACT_BYTES 时替换为空文件，持有旧文件读取位置的worker改为全量重建
+    """
+
+    COMPACT_BYTES = 1 << 20
+
+    def __init__(self, name):
+        self.path = os.path.join(Config.SEARCH_INDEX_DIR, name + '.journal')
+        self._lock = threading.Lock()
+        self._inode = None
+        self._offset = 0
+
+    @contextmanager
+    def _file_lock(self):
+        """跨进程文件锁（只用于串行化追加和替换）"""
+        os.makedirs(Config.SEARCH_INDEX_DIR, exist_ok=True)
+        with open(self.path + '.lock', 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def mark(self):
+        """全量重建开始前调用：记录当前文件末尾，之后的变更在下次读取时回放"""
+        os.makedirs(Config.SEARCH_INDEX_DIR, exist_ok=True)
+        with self._lock:
+            # 文件不存在时创建，之后文件被替换都能通过inode发现
+            with open(self.path, 'ab') as f:
+                stat = os.fstat(f.fileno())
+            self._inode, self._offset = stat.st_ino, stat.st_size
+
+    def changes(self):
+        """
+        读取上次之后其他worker追加的变更
+        :return: 变更的ID列表；文件被替换（需要全量重建）时返回None
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        if stat.st_ino == self._inode and stat.st_size == self._offset:
+            return []
+
+        with self._lock:
+            ids = []
+            try:
+                with open(self.path, 'rb') as f:
+                    inode = os.fstat(f.fileno()).st_ino
+                    if inode != self._inode:
+                        return None
+                    f.seek(self._offset)
+                    for line in f:
+                        if not line.endswith(b'\n'):
+                            break  # 另一个进程正在写入的半行，下次再读
+                        ids.extend(json.loads(line))
+                        self._offset += len(line)
+            except FileNotFoundError:
+                return None
+            return ids
+
+    def append(self, ids):
+        """追加一条变更（本进程稍后读到自己写入的行时会再从主库加载一次，结果相同）"""
+        line = (json.dumps(list(ids)) + '\n').encode('utf-8')
+        with self._file_lock():
+            with open(self.path, 'ab') as f:
+                f.write(line)
+                size = f.tell()
+            if size > self.COMPACT_BYTES:
+                temp = f"{self.path}.{os.getpid()}.tmp"
+                open(temp, 'wb').close()
+                os.replace(temp, self.path)
@@ -0,0 +1,229 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from app.config import Config
+from app.utils.db import get_db_cursor
+from app.utils.search_index import SearchIndex
+from app.utils.text import tokenize, highlight
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，退化为进程内加锁
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+class ContentSearch:
+    """
+    语法教程与听力原文的全文检索
+    索引持久化为 快照文件 + 追加日志：
+    - 启动时加载快照并回放日志，无快照时才从MySQL重建
+    - 管理端新增内容时写入内存索引并追加日志，其他worker检索前回放新增的日志
+    - 日志超过阈值时重写快照并清空日志
+    """
+
+    SNAPSHOT_FILE = 'content.idx'
+    JOURNAL_FILE = 'content.journal'
+    LOCK_FILE = 'content.lock'
+
+    _lock = threading.RLock()
+    _index = None
+    _snapshot_mtime = None
+    _journal_offset = 0
+    _journal_entries = 0
+
+    @classmethod
+    def _path(cls, name):
+        return os.path.join(Config.SEARCH_INDEX_DIR, name)
+
+    @classmethod
+    @contextmanager
+    def _file_lock(cls, exclusive):
+        """跨进程文件锁"""
+        os.makedirs(Config.SEARCH_INDEX_DIR, exist_ok=True)
+        with open(cls._path(cls.LOCK_FILE), 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @classmethod
+    def _stat_mtime(cls, name):
+        try:
+            return os.stat(cls._path(name)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def _stat_size(cls, name):
+        try:
+            return os.stat(cls._path(name)).st_size
+        except FileNotFoundError:
+            return 0
+
+    @classmethod
+    def ensure_loaded(cls):
+        """确保索引已加载，并同步其他worker写入的变更"""
+        with cls._lock:
+            snapshot_mtime = cls._stat_mtime(cls.SNAPSHOT_FILE)
+            if cls._index is None or snapshot_mtime != cls._snapshot_mtime:
+                cls._load()
+            elif cls._stat_size(cls.JOURNAL_FILE) > cls._journal_offset:
+                with cls._file_lock(exclusive=False):
+                    cls._replay_journal()
+
+    @classmethod
+    def _load(cls):
+        """加载快照并回放日志；快照不存在或损坏时从MySQL重建"""
+        with cls._file_lock(exclusive=False):
+            try:
+                with open(cls._path(cls.SNAPSHOT_FILE), 'rb') as f:
+                    cls._index = SearchIndex.loads(f.read())
+                cls._snapshot_mtime = cls._stat_mtime(cls.SNAPSHOT_FILE)
+                cls._journal_offset = 0
+                cls._journal_entries = 0
+                cls._replay_journal()
+                logger.info(f"内容检索索引已从快照加载: {len(cls._index)} 篇")
+                return
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"加载内容检索快照失败，将从数据库重建: {e}")
+        cls.rebuild()
+
+    @classmethod
+    def rebuild(cls):
+        """从MySQL全量重建索引并写出快照"""
+        start = time.time()
+        index = SearchIndex()
+        with get_db_cursor(commit=False) as cursor:
+            cursor.execute("SELECT grammar_id, title, content, level FROM grammar")
+            for row in cursor.fetchall():
+                index.add(('grammar', row['grammar_id']), row['title'], row['content'] or '',
+                          type='grammar', id=row['grammar_id'], level=row['level'])
+
+            cursor.execute("SELECT listen_id, title, transcript, level FROM listening")
+            for row in cursor.fetchall():
+                index.add(('listening', row['listen_id']), row['title'], row['transcript'] or '',
+                          type='listening', id=row['listen_id'], level=row['level'])
+
+        with cls._lock:
+            cls._index = index
+            cls._write_snapshot()
+        logger.info(f"内容检索索引重建完成: {len(index)} 篇, 耗时 {time.time() - start:.2f}s")
+
+    @classmethod
+    def _write_snapshot(cls):
+        """原子地写出快照并清空日志"""
+        data = cls._index.dumps()
+        with cls._file_lock(exclusive=True):
+            tmp_path = cls._path(cls.SNAPSHOT_FILE + '.tmp')
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, cls._path(cls.SNAPSHOT_FILE))
+            open(cls._path(cls.JOURNAL_FILE), 'w').close()
+            cls._snapshot_mtime = cls._stat_mtime(cls.SNAPSHOT_FILE)
+            cls._journal_offset = 0
+            cls._journal_entries = 0
+
+    @classmethod
+    def _replay_journal(cls):
+        """从上次读取的位置继续回放日志"""
+        try:
+            with open(cls._path(cls.JOURNAL_FILE), 'rb') as f:
+                f.seek(cls._journal_offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # 另一个进程正在写入的半行，下次再读
+                    cls._apply(json.loads(line))
+                    cls._journal_offset += len(line)
+                    cls._journal_entries += 1
+        except FileNotFoundError:
+            cls._journal_offset = 0
+
+    @classmethod
+    def _apply(cls, entry):
+        key = (entry['type'], entry['id'])
+        if entry['op'] == 'remove':
+            cls._index.remove(key)
+        else:
+            cls._index.add(key, entry['title'], entry['text'],
+                           type=entry['type'], id=entry['id'], level=entry['level'])
+
+    @classmethod
+    def _append(cls, entry):
+        """
+        追加日志并写入内存索引，日志过长时压缩为快照
+        本进程尚未加载索引时只追加日志（其他worker和本进程之后加载时都会回放）
+        """
+        line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+        with cls._lock:
+            with cls._file_lock(exclusive=True):
+                if cls._index is not None:
+                    cls._replay_journal()
+                with open(cls._path(cls.JOURNAL_FILE), 'ab') as f:
+                    f.write(line)
+            if cls._index is None:
+                return
+            cls._apply(entry)
+            cls._journal_offset += len(line)
+            cls._journal_entries += 1
+
+            if cls._journal_entries >= Config.SEARCH_JOURNAL_COMPACT_SIZE:
+                cls._write_snapshot()
+
+    @classmethod
+    def add(cls, content_type, content_id, title, text, level):
+        """
+        新增或更新一篇内容
+        :param content_type: grammar 或 listening
+        :param content_id: grammar_id 或 listen_id
+        """
+        cls._append({
+            'op': 'add',
+            'type': content_type,
+            'id': content_id,
+            'title': title,
+            'text': text or '',
+            'level': level
+        })
+
+    @classmethod
+    def remove(cls, content_type, content_id):
+        """删除一篇内容"""
+        cls._append({'op': 'remove', 'type': content_type, 'id': content_id})
+
+    @classmethod
+    def search(cls, query, content_type=None, level=None, limit=20):
+        """
+        检索语法教程和听力原文
+        :param query: 关键词
+        :param content_type: 可选 grammar / listening
+        :param level: 可选难度等级
+        :param limit: 返回条数
+        :return: 结果列表，含得分和高亮片段
+        """
+        cls.ensure_loaded()
+
+        def predicate(doc):
+            return ((not content_type or doc['type'] == content_type)
+                    and (not level or doc['level'] == level))
+
+        tokens = tokenize(query)
+        results = []
+        for score, _, doc in cls._index.search(query, limit, predicate):
+            results.append({
+                'type': doc['type'],
+                'id': doc['id'],
+                'title': doc['title'],
+                'level': doc['level'],
+                'score': round(score, 4),
+                'snippet': highlight(doc['body'], tokens, Config.SEARCH_SNIPPET_LENGTH)
+            })
+        return results
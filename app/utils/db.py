@@ -1,29 +1,215 @@
+import threading
+import time
+from collections import deque
 import pymysql
 from contextlib import contextmanager
+from flask import has_request_context
 from app.config import Config
+from app.utils.lifecycle import Lifecycle
+from app.utils.metrics import InstrumentedCursor
+from app.utils.query_budget import QueryBudget
+from app.utils.replicas import ReplicaSet, ReadYourWrites
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PoolTimeout(Exception):
+    """等待空闲连接超时"""
+
+class ConnectionPool:
+    """
+    MySQL连接池
+    连接以autocommit模式创建，写事务由get_db_cursor显式开始，
+    因此归还的连接上不会残留只读快照
+    """
+
+    def __init__(self, config, size, timeout, recycle):
+        self._config = dict(config, autocommit=True)
+        self._size = size
+        self._timeout = timeout
+        self._recycle = recycle
+        self._init_state()
+
+    def _init_state(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = deque()   # (连接, 归还时间)
+        self._created = 0
+        self._in_use = 0
+        self._waiting = 0
+
+    def acquire(self, timeout=None):
+        """
+        取出一个连接，池满时等待
+        :param timeout: 最长等待秒数，默认使用DB_POOL_TIMEOUT
+        """
+        deadline = time.monotonic() + (self._timeout if timeout is None else timeout)
+        connection = None
+        with self._cond:
+            while True:
+                if self._idle:
+                    connection, returned_at = self._idle.pop()
+                    break
+                if self._created < self._size:
+                    self._created += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"等待数据库连接超时（{self._size} 个连接均在使用中）")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._in_use += 1
+
+        try:
+            if connection is None:
+                connection = pymysql.connect(**self._config)
+            elif time.monotonic() - returned_at > self._recycle:
+                # 空闲较久的连接可能已被服务端断开
+                connection.ping(reconnect=True)
+            return connection
+        except Exception:
+            self._forget(connection)
+            raise
+
+    def release(self, connection, discard=False):
+        """归还连接，discard为True时关闭该连接（出现连接错误后使用）"""
+        if discard or not connection.open:
+            self._forget(connection)
+            return
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append((connection, time.monotonic()))
+            self._cond.notify()
+
+    def _forget(self, connection):
+        with self._cond:
+            self._in_use -= 1
+            self._created -= 1
+            self._cond.notify()
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    @property
+    def in_use(self):
+        return self._in_use
+
+    def stats(self):
+        """连接池使用情况"""
+        with self._cond:
+            return {
+                'size': self._size,
+                'created': self._created,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'saturation': round(self._in_use / self._size, 2) if self._size else 0
+            }
+
+    def reset_after_fork(self):
+        """
+        子进程丢弃继承的连接
+        不能调用close()：那会通过与父进程共享的socket发送COM_QUIT，断开父进程的连接
+        """
+        self._init_state()
+
+    def close_all(self):
+        """关闭全部空闲连接"""
+        with self._cond:
+            idle, self._idle = self._idle, deque()
+            self._created -= len(idle)
+        for connection, _ in idle:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+pool = ConnectionPool(Config.DB_CONFIG, Config.DB_POOL_SIZE, Config.DB_POOL_TIMEOUT, Config.DB_POOL_RECYCLE)
+# 请求线程嵌套取连接、扇出线程同时查询时，连接数不足会让请求排队直至 DB_POOL_TIMEOUT 后失败
+_needed = Config.SERVER_THREADS * 2 + Config.FANOUT_WORKERS
+if Config.DB_POOL_SIZE < _needed:
+    logger.warning(f"DB_POOL_SIZE={Config.DB_POOL_SIZE} 小于 SERVER_THREADS*2 + FANOUT_WORKERS = {_needed}，"
+                   f"并发高时请求可能等待连接超时")
+Lifecycle.on_fork(pool.reset_after_fork)
+Lifecycle.on_shutdown(pool.close_all)
+
+replicas = ReplicaSet(Config.DB_REPLICAS, lambda config: ConnectionPool(
+    config, Config.DB_REPLICA_POOL_SIZE, Config.DB_POOL_TIMEOUT, Config.DB_POOL_RECYCLE))
+Lifecycle.on_fork(replicas.reset_after_fork)
+Lifecycle.on_shutdown(replicas.close_all)
+
+def note_write(delay=0):
+    """
+    记录当前请求的写入：配置了从库时，同一会话之后一段时间的读取走主库
+    写缓冲中排队、尚未提交的写入也应调用，delay为最长的落库延迟（秒）
+    """
+    if replicas and has_request_context():
+        ReadYourWrites.note_write(delay)
+
+def read_replica():
+    """
+    只读游标使用的从库，没有时返回None（使用主库）
+    只在请求中使用从库：后台任务（缓冲写入、统计汇总）读取的水位等数据必须是最新的；
+    会话刚写入过时同样读主库
+    """
+    if not replicas or not has_request_context() or ReadYourWrites.pinned():
+        return None
+    return replicas.choose()
+
+def _acquire(replica):
+    """从从库取连接，失败时摘除该从库并改用主库"""
+    if replica is not None:
+        try:
+            return replica.pool.acquire(), replica
+        except PoolTimeout:
+            pass
+        except Exception as e:
+            replicas.eject(replica, e)
+    return pool.acquire(), None
 
 @contextmanager
-def get_db_connection():
-    """获取数据库连接的上下文管理器"""
-    connection = None
+def get_db_connection(replica=None):
+    """从连接池获取数据库连接的上下文管理器，replica为None时使用主库"""
+    connection, replica = _acquire(replica)
+    source = replica.pool if replica else pool
+    discard = False
     try:
-        connection = pymysql.connect(**Config.DB_CONFIG)
         yield connection
+    except (pymysql.err.OperationalError, pymysql.err.InterfaceError) as e:
+        discard = True
+        if replica is not None:
+            replicas.eject(replica, e)
+        raise
     finally:
-        if connection:
-            connection.close()
+        source.release(connection, discard=discard)
 
 @contextmanager
-def get_db_cursor(commit=True):
-    """获取数据库游标的上下文管理器"""
-    with get_db_connection() as connection:
+def get_db_cursor(commit=True, primary=False):
+    """
+    获取数据库游标的上下文管理器
+    commit=False 的游标只能用于读取，配置了从库时可能落到从库；
+    primary=True 时只读游标也使用主库（读取其他进程刚写入的数据）
+    """
+    with get_db_connection(None if commit or primary else read_replica()) as connection:
         cursor = connection.cursor(pymysql.cursors.DictCursor)
+        if Config.METRICS_ENABLED:
+            cursor = InstrumentedCursor(cursor)
         try:
+            if commit:
+                connection.begin()
             yield cursor
             if commit:
+                if Config.QUERY_BUDGET_MODE == 'raise' and has_request_context():
+                    QueryBudget.before_commit()
                 connection.commit()
+                note_write()
         except Exception as e:
-            connection.rollback()
+            if commit:
+                connection.rollback()
             raise e
         finally:
-            cursor.close()
\ No newline at end of file
+            cursor.close()
@@ -0,0 +1,112 @@
+import threading
+import time
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from app.config import Config
+from app.utils.db import get_db_cursor
+from app.utils.lifecycle import Lifecycle
+
+class FanOutResult:
+    """
+    一组并发查询的结果
+    results 为成功项 {名称: 结果}，errors 为失败或超时项 {名称: 错误说明}
+    """
+
+    __slots__ = ('results', 'errors')
+
+    def __init__(self):
+        self.results = {}
+        self.errors = {}
+
+    @property
+    def partial(self):
+        return bool(self.errors) and bool(self.results)
+
+    @property
+    def failed(self):
+        return bool(self.errors) and not self.results
+
+    def get(self, name, default=None):
+        return self.results.get(name, default)
+
+class FanOut:
+    """
+    把互不依赖的查询提交到有界线程池并发执行，每项各自从连接池取连接，
+    接口耗时取决于最慢的一项而不是各项之和
+
+    - 每个任务在提交时复制的上下文中运行，请求计时和查询预算照常统计这些查询
+    - 超过 FANOUT_TIMEOUT 未完成的项记为超时，尚未开始的直接取消；
+      已在执行的查询无法中断，结束后连接正常归还
+    - 线程池由所有请求共用，FANOUT_WORKERS 应小于 DB_POOL_SIZE，为请求线程留出连接
+    - 任务内不要再调用 FanOut.run，否则线程池占满时会互相等待
+    """
+
+    _lock = threading.Lock()
+    _executor = None
+
+    @classmethod
+    def _get_executor(cls):
+        if cls._executor is None:
+            with cls._lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(max_workers=Config.FANOUT_WORKERS,
+                                                       thread_name_prefix='fanout')
+        return cls._executor
+
+    @classmethod
+    def run(cls, tasks, timeout=None):
+        """
+        并发执行一组任务
+        :param tasks: {名称: 无参可调用对象}
+        :param timeout: 每项最长等待秒数，默认使用FANOUT_TIMEOUT
+        :return: FanOutResult
+        """
+        timeout = Config.FANOUT_TIMEOUT if timeout is None else timeout
+        outcome = FanOutResult()
+
+        # 未启用线程池时按顺序执行，便于排查问题
+        if Config.FANOUT_WORKERS <= 1:
+            for name, task in tasks.items():
+                try:
+                    outcome.results[name] = task()
+                except Exception as e:
+                    outcome.errors[name] = str(e)
+            return outcome
+
+        executor = cls._get_executor()
+        futures = {name: executor.submit(copy_context().run, task) for name, task in tasks.items()}
+
+        deadline = time.monotonic() + timeout
+        for name, future in futures.items():
+            try:
+                outcome.results[name] = future.result(max(0.0, deadline - time.monotonic()))
+            except FutureTimeout:
+                future.cancel()
+                outcome.errors[name] = f"超过 {timeout}s 未完成"
+            except Exception as e:
+                outcome.errors[name] = str(e)
+        return outcome
+
+    @classmethod
+    def reset_after_fork(cls):
+        """线程池的工作线程不会随fork复制，子进程重新创建"""
+        cls._lock = threading.Lock()
+        cls._executor = None
+
+Lifecycle.on_fork(FanOut.reset_after_fork)
+
+def sql_one(sql, args=None):
+    """返回一个在独立连接上执行只读查询并取首行的任务"""
+    def task():
+        with get_db_cursor(commit=False) as cursor:
+            cursor.execute(sql, args)
+            return cursor.fetchone()
+    return task
+
+def sql_all(sql, args=None):
+    """返回一个在独立连接上执行只读查询并取全部行的任务"""
+    def task():
+        with get_db_cursor(commit=False) as cursor:
+            cursor.execute(sql, args)
+            return cursor.fetchall()
+    return task
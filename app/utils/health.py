@@ -0,0 +1,112 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from app.config import Config
+from app.utils.db import pool, replicas
+from app.utils.mongo import MongoDB
+from app.utils.lifecycle import Lifecycle
+
+def check_mysql(timeout):
+    """从连接池取连接并执行 SELECT 1"""
+    connection = pool.acquire(timeout=timeout)
+    discard = False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+    except Exception:
+        discard = True
+        raise
+    finally:
+        pool.release(connection, discard=discard)
+    result = {'pool': pool.stats()}
+    # 从库不可用时读取回退到主库，不影响就绪状态，只供排查
+    if replicas:
+        result['replicas'] = replicas.stats()
+    return result
+
+def check_mongo(timeout):
+    """MongoDB ping"""
+    MongoDB.get_client().admin.command('ping')
+    return {}
+
+class HealthCheck:
+    """
+    依赖健康检查
+    各项检查在独立线程中执行并限时等待，结果缓存HEALTH_CACHE_TTL秒，
+    频繁的探测请求不会给数据库增加压力；上一次检查仍未返回时不再重复提交
+    """
+
+    CHECKS = {'mysql': check_mysql, 'mongo': check_mongo}
+
+    _lock = threading.Lock()
+    _executor = None
+    _inflight = {}   # 检查名 -> Future
+    _cache = None    # (过期时间, 结果)
+
+    @classmethod
+    def _get_executor(cls):
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(max_workers=len(cls.CHECKS), thread_name_prefix='health')
+        return cls._executor
+
+    @classmethod
+    def run(cls):
+        """
+        执行（或读取缓存的）全部依赖检查
+        :return: {检查名: {'status': 'up'/'down', 'latency_ms', ...}}
+        """
+        now = time.monotonic()
+        with cls._lock:
+            if cls._cache and cls._cache[0] > now:
+                return cls._cache[1]
+
+            timeout = Config.HEALTH_CHECK_TIMEOUT
+            started = {}
+            for name, check in cls.CHECKS.items():
+                future = cls._inflight.get(name)
+                if future is None or future.done():
+                    future = cls._get_executor().submit(cls._timed, check, timeout)
+                    cls._inflight[name] = future
+                started[name] = future
+
+            deadline = now + timeout
+            results = {}
+            for name, future in started.items():
+                try:
+                    results[name] = future.result(max(0.0, deadline - time.monotonic()))
+                except FutureTimeout:
+                    results[name] = {'status': 'down', 'latency_ms': round(timeout * 1000, 1),
+                                     'error': f"超过 {timeout}s 未响应"}
+            # 检查超时时也报告连接池状态，便于判断是否因连接耗尽而阻塞
+            if 'mysql' in results:
+                results['mysql'].setdefault('pool', pool.stats())
+
+            cls._cache = (time.monotonic() + Config.HEALTH_CACHE_TTL, results)
+            return results
+
+    @staticmethod
+    def _timed(check, timeout):
+        start = time.perf_counter()
+        try:
+            result = check(timeout)
+            result.update(status='up')
+        except Exception as e:
+            result = {'status': 'down', 'error': str(e)}
+        result['latency_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        return result
+
+    @classmethod
+    def is_ready(cls, results):
+        return Lifecycle.is_ready() and all(
+            results.get(name, {}).get('status') == 'up' for name in Config.HEALTH_REQUIRED)
+
+    @classmethod
+    def reset_after_fork(cls):
+        """线程池的工作线程不会随fork复制，子进程重新创建"""
+        cls._lock = threading.Lock()
+        cls._executor = None
+        cls._inflight = {}
+        cls._cache = None
+
+Lifecycle.on_fork(HealthCheck.reset_after_fork)
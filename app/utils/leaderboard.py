@@ -0,0 +1,196 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from sortedcontainers import SortedList
+from app.config import Config
+from app.utils.db import get_db_cursor
+from app.utils.lifecycle import Lifecycle
+import logging
+
+logger = logging.getLogger(__name__)
+
+WINDOWS = ('all', 'week')
+
+def week_start(now=None):
+    """本周一零点（与 quiz_result.taken_at 一样使用数据库服务器本地时间）"""
+    now = now or datetime.now()
+    return datetime(now.year, now.month, now.day) - timedelta(days=now.weekday())
+
+class _Board:
+    """单个排行榜：(-分数, user_id) 的有序列表，排名查询O(log n)"""
+
+    __slots__ = ('_sorted', '_scores')
+
+    def __init__(self, scores=None):
+        self._scores = dict(scores or {})
+        self._sorted = SortedList((-score, user_id) for user_id, score in self._scores.items())
+
+    def __len__(self):
+        return len(self._scores)
+
+    def get(self, user_id, default=None):
+        return self._scores.get(user_id, default)
+
+    def set(self, user_id, score):
+        old = self._scores.get(user_id)
+        if old is not None:
+            self._sorted.remove((-old, user_id))
+        self._scores[user_id] = score
+        self._sorted.add((-score, user_id))
+
+    def rank_of(self, score):
+        """分数对应的名次，同分同名次"""
+        return self._sorted.bisect_left((-score,)) + 1
+
+    def rank(self, user_id):
+        score = self._scores.get(user_id)
+        return None if score is None else self.rank_of(score)
+
+    def top(self, offset, limit):
+        return [{'user_id': user_id, 'score': -neg_score, 'rank': self.rank_of(-neg_score)}
+                for neg_score, user_id in self._sorted.islice(offset, offset + limit)]
+
+class _Window:
+    """一个时间窗口内的排行：各测验按用户最高分，总榜按各测验最高分之和"""
+
+    __slots__ = ('best', 'quizzes', 'totals')
+
+    def __init__(self, rows=()):
+        best = {}
+        per_quiz = {}
+        totals = {}
+        for row in rows:
+            quiz_id, user_id, score = row['quiz_id'], row['user_id'], int(row['score'] or 0)
+            best[(quiz_id, user_id)] = score
+            per_quiz.setdefault(quiz_id, {})[user_id] = score
+            totals[user_id] = totals.get(user_id, 0) + score
+        self.best = best
+        self.quizzes = {quiz_id: _Board(scores) for quiz_id, scores in per_quiz.items()}
+        self.totals = _Board(totals)
+
+    def record(self, user_id, quiz_id, score):
+        key = (quiz_id, user_id)
+        old = self.best.get(key)
+        if old is not None and score <= old:
+            return
+        self.best[key] = score
+        self.quizzes.setdefault(quiz_id, _Board()).set(user_id, score)
+        self.totals.set(user_id, self.totals.get(user_id, 0) - (old or 0) + score)
+
+    def board(self, quiz_id):
+        return self.totals if quiz_id is None else self.quizzes.get(quiz_id)
+
+class Leaderboard:
+    """
+    测验排行榜
+    启动时从 quiz_result 构建全部时间与本周两个窗口，提交测验后增量更新；
+    多进程部署时其他进程的提交在下次定时重建后可见
+    """
+
+    _lock = threading.Lock()
+    _build_lock = threading.Lock()
+    _loaded_at = None
+
+    _windows = {'all': _Window(), 'week': _Window()}
+    _week_start = None
+
+    @classmethod
+    def ensure_loaded(cls):
+        """首次使用时加载，超过刷新间隔后重建"""
+        loaded_at = cls._loaded_at
+        refresh = Config.LEADERBOARD_REFRESH
+        if loaded_at is not None and (refresh <= 0 or time.time() - loaded_at < refresh):
+            return
+
+        if not cls._build_lock.acquire(blocking=loaded_at is None):
+            return
+        try:
+            if cls._loaded_at is loaded_at:
+                cls.rebuild()
+        finally:
+            cls._build_lock.release()
+
+    @classmethod
+    def rebuild(cls):
+        """从MySQL重建排行榜"""
+        start = time.time()
+        current_week = week_start()
+        with get_db_cursor(commit=False) as cursor:
+            cursor.execute("""
+                SELECT user_id, quiz_id, MAX(score) as score
+                FROM quiz_result
+                GROUP BY user_id, quiz_id
+            """)
+            all_rows = cursor.fetchall()
+
+            cursor.execute("""
+                SELECT user_id, quiz_id, MAX(score) as score
+                FROM quiz_result
+                WHERE taken_at >= %s
+                GROUP BY user_id, quiz_id
+            """, (current_week,))
+            week_rows = cursor.fetchall()
+
+        windows = {'all': _Window(all_rows), 'week': _Window(week_rows)}
+        with cls._lock:
+            cls._windows = windows
+            cls._week_start = current_week
+            cls._loaded_at = time.time()
+
+        logger.info(f"排行榜构建完成: {len(all_rows)} 条最高分, 耗时 {time.time() - start:.2f}s")
+
+    @classmethod
+    def _roll_week_locked(cls):
+        """跨周后清空本周窗口"""
+        current_week = week_start()
+        if cls._week_start != current_week:
+            cls._windows['week'] = _Window()
+            cls._week_start = current_week
+
+    @classmethod
+    def record(cls, user_id, quiz_id, score):
+        """记录一次测验成绩（排行榜尚未加载时忽略，加载时会读到该成绩）"""
+        if cls._loaded_at is None:
+            return
+        with cls._lock:
+            cls._roll_week_locked()
+            for window in cls._windows.values():
+                window.record(user_id, quiz_id, score)
+
+    @classmethod
+    def top(cls, quiz_id=None, window='all', offset=0, limit=20):
+        """
+        获取排行
+        :param quiz_id: 测验ID，None表示总榜
+        :param window: all 或 week
+        :return: (上榜人数, [{'user_id', 'score', 'rank'}])
+        """
+        cls.ensure_loaded()
+        with cls._lock:
+            cls._roll_week_locked()
+            board = cls._windows[window].board(quiz_id)
+            if board is None:
+                return 0, []
+            return len(board), board.top(offset, limit)
+
+    @classmethod
+    def rank(cls, user_id, quiz_id=None, window='all'):
+        """
+        获取用户名次
+        :return: {'rank', 'score', 'total'}，未上榜时rank和score为None
+        """
+        cls.ensure_loaded()
+        with cls._lock:
+            cls._roll_week_locked()
+            board = cls._windows[window].board(quiz_id)
+            if board is None:
+                return {'rank': None, 'score': None, 'total': 0}
+            return {'rank': board.rank(user_id), 'score': board.get(user_id), 'total': len(board)}
+
+    @classmethod
+    def reset_after_fork(cls):
+        """子进程重新创建锁（与 Catalog.reset_after_fork 相同），已构建的排行榜随fork共享"""
+        cls._lock = threading.Lock()
+        cls._build_lock = threading.Lock()
+
+Lifecycle.on_fork(Leaderboard.reset_after_fork)
@@ -0,0 +1,78 @@
+import atexit
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Lifecycle:
+    """
+    进程生命周期钩子
+    - fork后在子进程中重置不能跨进程共享的资源（MongoDB客户端、连接池、写缓冲）
+    - 退出前按注册的逆序执行清理（写入缓冲、关闭连接）
+    - 就绪状态：启动完成后就绪，开始退出后不再就绪
+    """
+
+    _lock = threading.Lock()
+    _fork_hooks = []
+    _shutdown_hooks = []
+    _ready = False
+    _draining = False
+    _shut_down = False
+
+    @classmethod
+    def on_fork(cls, callback):
+        """注册fork后在子进程中执行的回调"""
+        cls._fork_hooks.append(callback)
+        return callback
+
+    @classmethod
+    def on_shutdown(cls, callback):
+        """注册进程退出前执行的回调"""
+        cls._shutdown_hooks.append(callback)
+        return callback
+
+    @classmethod
+    def mark_ready(cls):
+        cls._ready = True
+
+    @classmethod
+    def is_ready(cls):
+        return cls._ready and not cls._draining
+
+    @classmethod
+    def begin_drain(cls):
+        """开始退出：就绪检查随即失败，负载均衡不再分配新请求"""
+        if not cls._draining:
+            cls._draining = True
+            logger.info(f"进程 {os.getpid()} 开始退出，停止接收新请求")
+
+    @classmethod
+    def after_fork(cls):
+        """子进程中执行fork回调"""
+        cls._lock = threading.Lock()
+        cls._draining = False
+        cls._shut_down = False
+        for callback in cls._fork_hooks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"fork后重置 {callback.__qualname__} 失败: {e}")
+
+    @classmethod
+    def shutdown(cls):
+        """执行退出回调（可重复调用，只执行一次）"""
+        with cls._lock:
+            if cls._shut_down:
+                return
+            cls._shut_down = True
+        cls.begin_drain()
+        for callback in reversed(cls._shutdown_hooks):
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"退出时执行 {callback.__qualname__} 失败: {e}")
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=Lifecycle.after_fork)
+atexit.register(Lifecycle.shutdown)
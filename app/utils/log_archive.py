@@ -0,0 +1,322 @@
+import gzip
+import io
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from app.config import Config
+from app.models.activity_log import ActivityLog
+from app.utils.mongo import MongoDB
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，退化为进程内加锁
+    fcntl = None
+
+try:
+    import zstandard
+except ImportError:  # 未安装 zstandard 时使用gzip归档
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+class LogArchive:
+    """
+    活动日志的分层保留
+    - 热数据：最近 LOG_RETENTION_MONTHS 个月，各月一个MongoDB集合，在线查询
+    - 冷数据：更早的月份导出为 LOG_ARCHIVE_DIR/activity_logs_YYYYMM.ndjson.zst（或 .gz），
+      每行一条 MongoDB Extended JSON，校验条数一致后删除集合；超过 LOG_ARCHIVE_RETENTION_MONTHS 的归档文件删除
+    归档文件可用 restore 重新导入对应的月份集合
+    归档与恢复由 LOG_ARCHIVE_DIR 下的文件锁在进程间串行化；已有的归档文件不会被覆盖，
+    同一月份再次归档时先把旧归档并回集合，新文件是两者的并集
+    """
+
+    EXTENSIONS = ('.ndjson.zst', '.ndjson.gz')
+    LOCK_FILE = 'archive.lock'
+
+    _lock = threading.Lock()
+
+    @staticmethod
+    def compression():
+        return 'zstd' if zstandard is not None else 'gzip'
+
+    @classmethod
+    def archive_path(cls, name, extension=None):
+        if extension is None:
+            extension = cls.EXTENSIONS[0] if zstandard is not None else cls.EXTENSIONS[1]
+        return os.path.join(Config.LOG_ARCHIVE_DIR, name + extension)
+
+    @classmethod
+    def find_archive(cls, name):
+        """已有的归档文件路径，不存在时返回None"""
+        for extension in cls.EXTENSIONS:
+            path = cls.archive_path(name, extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    @staticmethod
+    def _open(path, mode):
+        """按扩展名打开压缩文本流，mode为 'w' 或 'r'"""
+        if '.ndjson.gz' in path:
+            return gzip.open(path, mode + 't', encoding='utf-8', compresslevel=Config.LOG_ARCHIVE_LEVEL)
+        if zstandard is None:
+            raise RuntimeError(f"读取 {os.path.basename(path)} 需要安装 zstandard")
+        raw = open(path, mode + 'b')
+        if mode == 'w':
+            stream = zstandard.ZstdCompressor(level=Config.LOG_ARCHIVE_LEVEL).stream_writer(raw)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+
+    @classmethod
+    @contextmanager
+    def _file_lock(cls):
+        """跨进程文件锁（同一进程内的线程由 _lock 串行化）"""
+        os.makedirs(Config.LOG_ARCHIVE_DIR, exist_ok=True)
+        with cls._lock, open(os.path.join(Config.LOG_ARCHIVE_DIR, cls.LOCK_FILE), 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @classmethod
+    def partition_names(cls, database=None):
+        """MongoDB中现有的分月集合名"""
+        database = database if database is not None else MongoDB.get_database()
+        return sorted(name for name in database.list_collection_names()
+                      if ActivityLog.partition_month(name) is not None)
+
+    @classmethod
+    def archive_partition(cls, name):
+        """
+        导出一个月份集合并删除（调用方需持有 _file_lock）
+        已有该月归档时先把归档并回集合，再整体导出，不会用更少的数据覆盖已有归档
+        先写临时文件，导出条数与集合当前文档数一致时才改名并删除集合，否则保留集合并报错
+        :return: 导出条数，集合已不存在时为0
+        """
+        from bson import json_util
+        options = json_util.RELAXED_JSON_OPTIONS
+
+        database = MongoDB.get_database()
+        if name not in database.list_collection_names():
+            # 其他进程已归档
+            return 0
+        previous = cls.find_archive(name)
+        if previous is not None:
+            merged = cls._restore(name)
+            logger.info(f"日志分区 {name} 已有归档 {previous}，并入 {merged} 条后重新归档")
+
+        path = cls.archive_path(name)
+        temp = f"{path}.{os.getpid()}.tmp"
+        collection = database[name]
+        exported = 0
+        try:
+            with cls._open(temp, 'w') as f:
+                for document in collection.find({}).sort('_id', 1).batch_size(1000):
+                    f.write(json_util.dumps(document, json_options=options))
+                    f.write('\n')
+                    exported += 1
+            with open(temp, 'rb') as f:
+                os.fsync(f.fileno())
+
+            remaining = collection.count_documents({})
+            if remaining != exported:
+                raise RuntimeError(f"{name} 导出 {exported} 条，集合中有 {remaining} 条，保留集合待下次归档")
+            os.replace(temp, path)
+        finally:
+            if os.path.exists(temp):
+                os.remove(temp)
+        if previous is not None and previous != path:
+            # 旧归档（另一种压缩格式）的内容已包含在新文件中
+            os.remove(previous)
+
+        collection.drop()
+        ActivityLog._ensured.discard(name)
+        logger.info(f"日志分区 {name} 已归档: {exported} 条 -> {path}")
+        return exported
+
+    @classmethod
+    def archive_expired(cls, now=None):
+        """
+        归档超出保留期的月份集合，并删除超出归档保留期的文件
+        多个进程同时调用时由文件锁串行化，后进入的调用不会重复导出已删除的集合
+        :return: {'archived': {集合名: 条数}, 'deleted_archives': [...], 'compression'}
+        """
+        now = now or datetime.now(timezone.utc)
+        current = ActivityLog.month_index(now)
+        oldest_hot = current - Config.LOG_RETENTION_MONTHS + 1
+
+        with cls._file_lock():
+            archived = {}
+            for name in cls.partition_names():
+                if ActivityLog.partition_month(name) < oldest_hot:
+                    archived[name] = cls.archive_partition(name)
+
+            deleted = []
+            if Config.LOG_ARCHIVE_RETENTION_MONTHS > 0 and os.path.isdir(Config.LOG_ARCHIVE_DIR):
+                oldest_cold = current - Config.LOG_ARCHIVE_RETENTION_MONTHS + 1
+                for filename in sorted(os.listdir(Config.LOG_ARCHIVE_DIR)):
+                    extension = next((ext for ext in cls.EXTENSIONS if filename.endswith(ext)), None)
+                    if extension is None:
+                        continue
+                    month = ActivityLog.partition_month(filename[:-len(extension)])
+                    if month is not None and month < oldest_cold:
+                        os.remove(os.path.join(Config.LOG_ARCHIVE_DIR, filename))
+                        deleted.append(filename)
+
+        if deleted:
+            logger.info(f"已删除超出保留期的日志归档: {deleted}")
+        return {'archived': archived, 'deleted_archives': deleted, 'compression': cls.compression()}
+
+    @classmethod
+    def iter_archive(cls, name):
+        """逐条读取归档文件中的日志（还原为BSON类型）"""
+        from bson import json_util
+        path = cls.find_archive(name)
+        if path is None:
+            raise FileNotFoundError(f"没有 {name} 的归档文件")
+        with cls._open(path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    yield json_util.loads(line)
+
+    @classmethod
+    def restore(cls, name, batch_size=1000):
+        """
+        把归档文件重新导入对应的月份集合（已存在的_id跳过），用于在MongoDB中临时查看保留期之外的日志
+        （接口只查询保留期内的月份）；恢复的集合在下一次 archive_expired 时会与归档合并后再次归档
+        :return: 新导入的条数
+        """
+        with cls._file_lock():
+            return cls._restore(name, batch_size)
+
+    @classmethod
+    def _restore(cls, name, batch_size=1000):
+        """restore 的实现（调用方需持有 _file_lock）；除重复_id外的写入错误直接抛出，保证归档内容全部在集合中"""
+        from pymongo.errors import BulkWriteError
+        ActivityLog.ensure_partition(name)
+        collection = MongoDB.get_database()[name]
+        inserted = 0
+        batch = []
+
+        def flush():
+            try:
+                return len(collection.insert_many(batch, ordered=False).inserted_ids)
+            except BulkWriteError as e:
+                if any(error['code'] != 11000 for error in e.details['writeErrors']):
+                    raise
+                return e.details['nInserted']
+
+        for document in cls.iter_archive(name):
+            if 'u' not in document:
+                # 紧凑编码之前归档的文档
+                document = dict(ActivityLog.encode(document['user_id'], document['action_type'],
+                                                   document['timestamp'], document.get('details')),
+                                _id=document['_id'])
+            batch.append(document)
+            if len(batch) >= batch_size:
+                inserted += flush()
+                batch = []
+        if batch:
+            inserted += flush()
+        return inserted
+
+    @staticmethod
+    def _month_match(month):
+        """旧集合中某月（'YYYYMM'）日志的匹配条件"""
+        year, number = int(month[:4]), int(month[4:])
+        return {'$match': {'timestamp': {'$gte': datetime(year, number, 1, tzinfo=timezone.utc),
+                                         '$lt': datetime(year + number // 12, number % 12 + 1, 1,
+                                                         tzinfo=timezone.utc)}}}
+
+    @classmethod
+    def migrate_legacy(cls, drop=False):
+        """
+        把未分区的 activity_logs 集合按月复制到各月集合并转为紧凑编码（服务端 $merge，可重复执行）
+        保留期之外的月份同样复制，随后由 archive_expired 归档
+        :param drop: 全部复制且逐条核对后删除旧集合
+        :return: {集合名: 该月条数}
+        """
+        database = MongoDB.get_database()
+        legacy = database[ActivityLog.COLLECTION_NAME]
+        months = legacy.aggregate([
+            {'$group': {'_id': {'$dateToString': {'format': '%Y%m', 'date': '$timestamp'}},
+                        'count': {'$sum': 1}}}
+        ])
+        migrated = {}
+        for month in months:
+            if month['_id'] is None:
+                logger.warning(f"旧日志中有 {month['count']} 条没有有效时间，无法按月迁移")
+                continue
+            name = f"{ActivityLog.COLLECTION_NAME}_{month['_id']}"
+            ActivityLog.ensure_partition(name, database)
+            legacy.aggregate([
+                cls._month_match(month['_id']),
+                *ActivityLog.compact_stages(),
+                {'$merge': {'into': name, 'on': '_id',
+                            'whenMatched': 'keepExisting', 'whenNotMatched': 'insert'}}
+            ])
+            migrated[name] = month['count']
+            logger.info(f"旧日志 {month['_id']} 已复制到 {name}: {month['count']} 条")
+
+        if drop:
+            missing = cls._count_unmigrated(database)
+            if missing:
+                raise RuntimeError(f"旧集合中有 {missing} 条日志不在分月集合中，未删除旧集合")
+            legacy.drop()
+            logger.info(f"旧日志集合 {ActivityLog.COLLECTION_NAME} 已删除")
+        return migrated
+
+    @classmethod
+    def _count_unmigrated(cls, database):
+        """
+        旧集合中按_id在对应月份集合里找不到的日志数（重新按月分组，复制后旧集合又有写入时同样计入）
+        分月集合中还有迁移后新写入的日志，只比较条数无法发现复制不完整
+        """
+        legacy = database[ActivityLog.COLLECTION_NAME]
+        missing = 0
+        for month in legacy.aggregate([
+            {'$group': {'_id': {'$dateToString': {'format': '%Y%m', 'date': '$timestamp'}},
+                        'count': {'$sum': 1}}}
+        ]):
+            if month['_id'] is None:
+                missing += month['count']  # 没有有效时间的日志不会被复制
+                continue
+            for row in legacy.aggregate([
+                cls._month_match(month['_id']),
+                {'$project': {'_id': 1}},
+                {'$lookup': {'from': f"{ActivityLog.COLLECTION_NAME}_{month['_id']}",
+                             'localField': '_id', 'foreignField': '_id', 'as': 'copied'}},
+                {'$match': {'copied': {'$size': 0}}},
+                {'$count': 'missing'}
+            ]):
+                missing += row['missing']
+        return missing
+
+    @classmethod
+    def compact_partitions(cls):
+        """
+        把各月集合中的旧格式文档原地转为紧凑编码，并换成新的校验规则和索引（可重复执行）
+        先更新校验规则（moderate级别不校验本就不符合规则的旧文档的更新），删除旧索引后
+        用一条管道更新转换全部旧文档，最后建立短字段上的索引
+        :return: {集合名: 转换的文档数}
+        """
+        database = MongoDB.get_database()
+        compacted = {}
+        for name in cls.partition_names(database):
+            collection = database[name]
+            database.command('collMod', name, validator=ActivityLog.VALIDATOR,
+                             validationLevel='moderate', validationAction='error')
+            for index in ActivityLog.LEGACY_INDEXES & set(collection.index_information()):
+                collection.drop_index(index)
+            result = collection.update_many({'u': {'$exists': False}}, ActivityLog.compact_stages())
+            ActivityLog.create_indexes(collection)
+            compacted[name] = result.modified_count
+            if result.modified_count:
+                logger.info(f"日志分区 {name} 已转为紧凑编码: {result.modified_count} 条")
+        return compacted
@@ -0,0 +1,340 @@
+import hmac
+import ipaddress
+import re
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from contextvars import ContextVar
+from flask import request, Response
+from app.config import Config
+from app.utils.lifecycle import Lifecycle
+from app.schemas.response import error_response
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 请求耗时直方图的桶上界（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 慢查询样本最多保留的语句数
+SLOW_QUERY_SAMPLES = 200
+
+_current = ContextVar('request_metrics', default=None)
+# query_budget() 期间收集语句的列表（可嵌套）
+_captures = ContextVar('query_captures', default=())
+
+_WHITESPACE = re.compile(r'\s+')
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|%\(\w+\)s')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_VALUES_LIST = re.compile(r'(\bVALUES\s*\([^)]*\))(?:\s*,\s*\([^)]*\))+', re.IGNORECASE)
+
+def normalize_sql(statement):
+    """归一化SQL：字面量与占位符替换为?，IN列表和多行VALUES折叠，合并空白"""
+    if isinstance(statement, bytes):
+        statement = statement.decode('utf-8', 'replace')
+    statement = _STRING.sub('?', statement)
+    statement = _PLACEHOLDER.sub('?', statement)
+    statement = _NUMBER.sub('?', statement)
+    statement = _IN_LIST.sub('IN (...)', statement)
+    statement = _VALUES_LIST.sub(r'\1, ...', statement)
+    return _WHITESPACE.sub(' ', statement).strip()
+
+# 扇出到子线程时同一请求的计数会被并发累加；各请求共用一把锁，省去每个请求创建锁的开销
+_request_lock = threading.Lock()
+
+class RequestMetrics:
+    """单个请求的计数；扇出到子线程时共享同一对象，累加时持有 _request_lock"""
+
+    __slots__ = ('start', 'status', 'rule', 'sql_count', 'sql_time', 'sql_rows',
+                 'mongo_count', 'mongo_time', 'mongo_rows', 'statements')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.status = 500  # 没有发出响应头就抛出异常的请求按500计
+        self.rule = 'unmatched'
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.sql_rows = 0
+        self.mongo_count = 0
+        self.mongo_time = 0.0
+        self.mongo_rows = 0
+        self.statements = None  # 开启查询预算检查时记录 [(语句, 参数)]
+
+class _RouteStats:
+    __slots__ = ('count', 'latency_sum', 'buckets', 'sql_count', 'sql_time', 'sql_rows',
+                 'mongo_count', 'mongo_time', 'mongo_rows')
+
+    def __init__(self):
+        self.count = 0
+        self.latency_sum = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.sql_rows = 0
+        self.mongo_count = 0
+        self.mongo_time = 0.0
+        self.mongo_rows = 0
+
+class Metrics:
+    """
+    请求级SQL/MongoDB计时
+    - 每个请求在上下文变量中持有一个RequestMetrics，游标包装与Mongo命令监听向其累加
+    - 以WSGI中间件包在Flask应用外层：比 before/after_request 钩子少了Flask对每个钩子的协程检查，
+      Server-Timing 直接追加到发出的响应头列表，不经过响应头对象的校验和复制
+    - 请求结束时汇总到按 (路由, 方法, 状态码) 分组的进程内统计，由 /metrics 输出
+    - 超过SLOW_QUERY_MS的语句按归一化文本采样
+    统计按进程保存，多进程部署时每个进程各自计数
+    """
+
+    _lock = threading.Lock()
+    _routes = {}   # (路由, 方法, 状态码) -> _RouteStats
+    _slow = {}     # (类型, 归一化语句) -> {'count', 'total_ms', 'max_ms', 'route'}
+    _slow_seconds = Config.SLOW_QUERY_MS / 1000
+    _allow = ()    # 允许直接访问 /metrics 的网段
+
+    @classmethod
+    def init_app(cls, app):
+        if not Config.METRICS_ENABLED:
+            return
+        cls._slow_seconds = Config.SLOW_QUERY_MS / 1000
+        cls._allow = tuple(ipaddress.ip_network(item, strict=False) for item in Config.METRICS_ALLOW)
+        app.wsgi_app = cls._middleware(app.wsgi_app)
+        app.add_url_rule('/metrics', 'metrics', cls._export)
+
+    @staticmethod
+    def current():
+        return _current.get()
+
+    @classmethod
+    def _middleware(cls, wsgi_app):
+        @wraps(wsgi_app)
+        def middleware(environ, start_response):
+            metrics = RequestMetrics()
+            token = _current.set(metrics)
+
+            def timed_start_response(status, headers, exc_info=None):
+                metrics.status = int(status[:3])
+                # Flask在弹出请求上下文时会清掉environ中的Request对象，路由须在发出响应头时记下
+                req = environ.get('werkzeug.request')
+                if req is not None and req.url_rule is not None:
+                    metrics.rule = req.url_rule.rule
+                if Config.SERVER_TIMING:
+                    headers.append(('Server-Timing', cls._server_timing(metrics)))
+                return start_response(status, headers, exc_info)
+
+            try:
+                return wsgi_app(environ, timed_start_response)
+            finally:
+                # 工作线程会被复用，请求结束后不再把查询计入该请求
+                _current.reset(token)
+                cls._finish(environ, metrics)
+        return middleware
+
+    @staticmethod
+    def _server_timing(metrics):
+        """只输出本请求访问过的存储"""
+        timing = 'app;dur=%.1f' % ((time.perf_counter() - metrics.start) * 1000)
+        if metrics.sql_count:
+            timing += ', sql;dur=%.1f;desc="%d queries"' % (metrics.sql_time * 1000, metrics.sql_count)
+        if metrics.mongo_count:
+            timing += ', mongo;dur=%.1f;desc="%d ops"' % (metrics.mongo_time * 1000, metrics.mongo_count)
+        return timing
+
+    @classmethod
+    def _finish(cls, environ, metrics):
+        elapsed = time.perf_counter() - metrics.start
+        key = (metrics.rule, environ.get('REQUEST_METHOD'), metrics.status)
+
+        with cls._lock:
+            stats = cls._routes.get(key)
+            if stats is None:
+                stats = cls._routes[key] = _RouteStats()
+            stats.count += 1
+            stats.latency_sum += elapsed
+            bucket = bisect_left(LATENCY_BUCKETS, elapsed)
+            if bucket < len(LATENCY_BUCKETS):
+                stats.buckets[bucket] += 1
+            # 多数请求只访问其中一种存储，没有访问的一种跳过累加
+            if metrics.sql_count:
+                stats.sql_count += metrics.sql_count
+                stats.sql_time += metrics.sql_time
+                stats.sql_rows += metrics.sql_rows
+            if metrics.mongo_count:
+                stats.mongo_count += metrics.mongo_count
+                stats.mongo_time += metrics.mongo_time
+                stats.mongo_rows += metrics.mongo_rows
+
+    @classmethod
+    def record_sql(cls, statement, elapsed, rows, args=None):
+        metrics = _current.get()
+        if metrics is not None:
+            with _request_lock:
+                metrics.sql_count += 1
+                metrics.sql_time += elapsed
+                metrics.sql_rows += rows
+            if metrics.statements is not None:
+                metrics.statements.append((statement, args))
+        captures = _captures.get()
+        if captures:
+            for statements in captures:
+                statements.append((statement, args))
+        # 只有慢语句才做归一化（正则替换），正常语句只有上面几次累加
+        if elapsed >= cls._slow_seconds:
+            cls._sample('sql', normalize_sql(statement), elapsed)
+
+    @classmethod
+    def record_mongo(cls, command, elapsed, rows):
+        metrics = _current.get()
+        if metrics is not None:
+            with _request_lock:
+                metrics.mongo_count += 1
+                metrics.mongo_time += elapsed
+                metrics.mongo_rows += rows
+        if elapsed >= cls._slow_seconds:
+            cls._sample('mongo', command, elapsed)
+
+    @classmethod
+    def _sample(cls, kind, statement, elapsed):
+        """记录慢查询样本，超出容量时淘汰最大耗时最小的一条"""
+        elapsed_ms = elapsed * 1000
+        route = None
+        try:
+            route = request.url_rule.rule if request.url_rule else None
+        except RuntimeError:
+            pass
+        logger.warning(f"慢查询 {elapsed_ms:.1f}ms [{kind}] {statement[:500]}")
+
+        key = (kind, statement)
+        with cls._lock:
+            sample = cls._slow.get(key)
+            if sample is None:
+                if len(cls._slow) >= SLOW_QUERY_SAMPLES:
+                    del cls._slow[min(cls._slow, key=lambda k: cls._slow[k]['max_ms'])]
+                sample = cls._slow[key] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'route': route}
+            sample['count'] += 1
+            sample['total_ms'] += elapsed_ms
+            sample['max_ms'] = max(sample['max_ms'], elapsed_ms)
+
+    @classmethod
+    def slow_queries(cls, limit=50):
+        """按最大耗时降序返回慢查询样本"""
+        with cls._lock:
+            items = sorted(cls._slow.items(), key=lambda item: -item[1]['max_ms'])[:limit]
+        return [dict(sample, type=kind, statement=statement, avg_ms=round(sample['total_ms'] / sample['count'], 1))
+                for (kind, statement), sample in items]
+
+    @classmethod
+    def _authorized(cls):
+        """来源地址在 METRICS_ALLOW 中，或携带正确的 METRICS_TOKEN"""
+        try:
+            address = ipaddress.ip_address(request.remote_addr or '')
+        except ValueError:
+            address = None
+        if address is not None and any(address in network for network in cls._allow):
+            return True
+        token = request.headers.get('Authorization', '').replace('Bearer ', '')
+        return bool(Config.METRICS_TOKEN) and hmac.compare_digest(token, Config.METRICS_TOKEN)
+
+    @classmethod
+    def _export(cls):
+        """Prometheus文本格式输出"""
+        if not cls._authorized():
+            return error_response("无权访问监控指标", 403)
+
+        def labels(rule, method, status):
+            rule = rule.replace('\\', '\\\\').replace('"', '\\"')
+            return f'route="{rule}",method="{method}",status="{status}"'
+
+        with cls._lock:
+            routes = sorted(cls._routes.items())
+            slow = sorted(cls._slow.items(), key=lambda item: -item[1]['max_ms'])
+
+        lines = [
+            '# HELP http_request_duration_seconds Request latency',
+            '# TYPE http_request_duration_seconds histogram'
+        ]
+        for key, stats in routes:
+            label = labels(*key)
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{label},le="+Inf"}} {stats.count}')
+            lines.append(f'http_request_duration_seconds_sum{{{label}}} {stats.latency_sum:.6f}')
+            lines.append(f'http_request_duration_seconds_count{{{label}}} {stats.count}')
+
+        for name, attr, kind, help_text in (
+            ('db_queries_total', 'sql_count', 'counter', 'SQL statements executed'),
+            ('db_query_seconds_total', 'sql_time', 'counter', 'Time spent in SQL statements'),
+            ('db_rows_total', 'sql_rows', 'counter', 'Rows returned by SQL statements'),
+            ('mongo_operations_total', 'mongo_count', 'counter', 'MongoDB commands executed'),
+            ('mongo_operation_seconds_total', 'mongo_time', 'counter', 'Time spent in MongoDB commands'),
+            ('mongo_documents_total', 'mongo_rows', 'counter', 'Documents returned by MongoDB commands'),
+        ):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for key, stats in routes:
+                value = getattr(stats, attr)
+                lines.append(f'{name}{{{labels(*key)}}} {value:.6f}' if isinstance(value, float)
+                             else f'{name}{{{labels(*key)}}} {value}')
+
+        lines.append('# HELP slow_query_max_milliseconds Slowest observed duration per normalized statement')
+        lines.append('# TYPE slow_query_max_milliseconds gauge')
+        for (kind, statement), sample in slow:
+            statement = statement[:200].replace('\\', '\\\\').replace('"', '\\"')
+            lines.append(f'slow_query_max_milliseconds{{type="{kind}",statement="{statement}"}} {sample["max_ms"]:.1f}')
+
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+    @classmethod
+    def reset_after_fork(cls):
+        """子进程从零开始计数"""
+        global _request_lock
+        _request_lock = threading.Lock()
+        cls._lock = threading.Lock()
+        cls._routes = {}
+        cls._slow = {}
+
+class InstrumentedCursor:
+    """游标包装：对execute/executemany计时并计入当前请求"""
+
+    __slots__ = ('_cursor',)
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, query, args=None):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(query, args)
+        finally:
+            cursor = self._cursor
+            Metrics.record_sql(query, time.perf_counter() - start,
+                               max(cursor.rowcount, 0) if cursor.description else 0, args)
+
+    def executemany(self, query, args):
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, args)
+        finally:
+            Metrics.record_sql(query, time.perf_counter() - start, 0, args)
+
+    # 常用方法直接转发，避免每次经过__getattr__
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        return self._cursor.close()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+Lifecycle.on_fork(Metrics.reset_after_fork)
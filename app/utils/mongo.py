@@ -1,12 +1,16 @@
-from pymongo import MongoClient
 from contextlib import contextmanager
 from app.config import Config
+from app.utils.lifecycle import Lifecycle
 import logging
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class MongoDB:
+    """
+    MongoDB客户端
+    pymongo在首次使用时才导入（约占应用导入耗时的一半），不使用日志功能的进程不加载驱动
+    """
+
     _client = None
     _db = None
 
@@ -15,7 +19,12 @@ class MongoDB:
         """获取MongoDB客户端"""
         if cls._client is None:
             try:
-                cls._client = MongoClient(Config.MONGO_URI)
+                from pymongo import MongoClient
+                listeners = []
+                if Config.METRICS_ENABLED:
+                    from app.utils.mongo_monitoring import CommandMetrics
+                    listeners.append(CommandMetrics())
+                cls._client = MongoClient(Config.MONGO_URI, event_listeners=listeners)
                 # 测试连接
                 cls._client.admin.command('ping')
                 logger.info("MongoDB连接成功")
@@ -40,6 +49,15 @@ class MongoDB:
             cls._client = None
             cls._db = None
 
+    @classmethod
+    def reset_after_fork(cls):
+        """MongoClient不能跨fork使用，子进程丢弃继承的客户端，首次使用时重新连接"""
+        cls._client = None
+        cls._db = None
+
+Lifecycle.on_fork(MongoDB.reset_after_fork)
+Lifecycle.on_shutdown(MongoDB.close_connection)
+
 @contextmanager
 def get_mongo_collection(collection_name):
     """获取MongoDB集合的上下文管理器"""
@@ -0,0 +1,38 @@
+from pymongo import monitoring
+from app.utils.metrics import Metrics
+
+class CommandMetrics(monitoring.CommandListener):
+    """把MongoDB命令耗时计入当前请求（回调在执行命令的线程中调用）"""
+
+    # 连接握手、心跳等内部命令不计入
+    IGNORED = {'hello', 'ismaster', 'isMaster', 'ping', 'saslStart', 'saslContinue',
+               'authenticate', 'endSessions', 'buildInfo'}
+
+    def __init__(self):
+        self._shapes = {}  # (连接, 请求ID) -> 命令形状
+
+    def started(self, event):
+        if event.command_name in self.IGNORED:
+            return
+        command = event.command
+        collection = command.get(event.command_name)
+        detail = command.get('filter') or command.get('q') or {}
+        if event.command_name == 'aggregate':
+            keys = [next(iter(stage), '') for stage in command.get('pipeline', [])]
+        else:
+            keys = sorted(detail) if isinstance(detail, dict) else []
+        self._shapes[(event.connection_id, event.request_id)] = \
+            f"{event.command_name} {collection} {{{', '.join(keys)}}}"
+
+    def succeeded(self, event):
+        shape = self._shapes.pop((event.connection_id, event.request_id), None)
+        if shape is None:
+            return
+        reply = event.reply.get('cursor') if isinstance(event.reply, dict) else None
+        documents = reply.get('firstBatch', reply.get('nextBatch', [])) if reply else []
+        Metrics.record_mongo(shape, event.duration_micros / 1e6, len(documents))
+
+    def failed(self, event):
+        shape = self._shapes.pop((event.connection_id, event.request_id), None)
+        if shape is not None:
+            Metrics.record_mongo(shape, event.duration_micros / 1e6, 0)
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+from app.config import Config
+from app.utils.db import get_db_cursor
+from app.utils.change_journal import ChangeJournal
+from app.utils.lifecycle import Lifecycle
+
+class NicknameResolver:
+    """
+    用户昵称批量解析
+    列表接口不再关联 user_profile（该表含头像大字段），而是对本次响应涉及的
+    user_id 去重后用一条 IN 查询取昵称，并缓存在LRU中；
+    修改昵称的worker通过变更日志通知其他worker，读取缓存前先丢弃被修改的条目
+    """
+
+    _lock = threading.Lock()
+    _cache = OrderedDict()  # user_id -> (nickname, 过期时间)
+    _journal = ChangeJournal('nicknames')
+
+    @classmethod
+    def resolve_many(cls, user_ids):
+        """
+        批量获取昵称
+        :param user_ids: 用户ID集合
+        :return: {user_id: nickname}，不存在的用户不在结果中
+        """
+        result, missing = cls.from_cache(user_ids)
+        if missing:
+            with get_db_cursor(commit=False) as cursor:
+                cursor.execute(cls.lookup_sql(len(missing)), missing)
+                fetched = {row['user_id']: row['nickname'] for row in cursor.fetchall()}
+            cls.remember(fetched)
+            result.update(fetched)
+        return result
+
+    @classmethod
+    def from_cache(cls, user_ids):
+        """
+        从缓存取昵称（异步接口自行查询缺失部分后调用remember()）
+        :return: ({user_id: nickname}, 缓存中没有的user_id列表)
+        """
+        cls._sync()
+        now = time.time()
+        result = {}
+        missing = []
+        with cls._lock:
+            for user_id in set(user_ids):
+                if user_id is None:
+                    continue
+                entry = cls._cache.get(user_id)
+                if entry and entry[1] > now:
+                    cls._cache.move_to_end(user_id)
+                    result[user_id] = entry[0]
+                else:
+                    missing.append(user_id)
+        return result, missing
+
+    @staticmethod
+    def lookup_sql(count):
+        placeholders = ', '.join(['%s'] * count)
+        return f"SELECT user_id, nickname FROM user_profile WHERE user_id IN ({placeholders})"
+
+    @classmethod
+    def remember(cls, fetched):
+        """写入查询到的昵称"""
+        expires_at = time.time() + Config.NICKNAME_CACHE_TTL
+        with cls._lock:
+            for user_id, nickname in fetched.items():
+                cls._cache[user_id] = (nickname, expires_at)
+                cls._cache.move_to_end(user_id)
+            while len(cls._cache) > Config.NICKNAME_CACHE_SIZE:
+                cls._cache.popitem(last=False)
+
+    @classmethod
+    def resolve(cls, user_id):
+        """获取单个用户昵称"""
+        return cls.resolve_many([user_id]).get(user_id)
+
+    @classmethod
+    def attach(cls, *row_lists, key='user_id', field='nickname'):
+        """
+        为多组记录统一补充昵称字段（所有记录只查询一次）
+        :param row_lists: 一组或多组字典记录
+        :return: 第一组记录，便于直接嵌入响应
+        """
+        nicknames = cls.resolve_many(row[key] for rows in row_lists for row in rows)
+        for rows in row_lists:
+            for row in rows:
+                row[field] = nicknames.get(row[key])
+        return row_lists[0] if row_lists else []
+
+    @classmethod
+    def invalidate(cls, user_id):
+        """用户修改昵称后使本进程缓存失效，并通知其他worker"""
+        with cls._lock:
+            cls._cache.pop(user_id, None)
+        cls._journal.append([user_id])
+
+    @classmethod
+    def _sync(cls):
+        """丢弃其他worker修改过昵称的缓存条目"""
+        user_ids = cls._journal.changes()
+        if user_ids is None:
+            # 首次读取或日志被替换：从当前位置开始跟踪，之前的缓存全部丢弃
+            cls._journal.mark()
+            with cls._lock:
+                cls._cache.clear()
+        elif user_ids:
+            with cls._lock:
+                for user_id in user_ids:
+                    cls._cache.pop(user_id, None)
+
+    @classmethod
+    def reset_after_fork(cls):
+        """子进程重新创建锁（含变更日志的读取锁），缓存随fork共享"""
+        cls._lock = threading.Lock()
+        cls._journal._lock = threading.Lock()
+
+Lifecycle.on_fork(NicknameResolver.reset_after_fork)
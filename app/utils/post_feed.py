@@ -0,0 +1,239 @@
+import math
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+from app.config import Config
+from app.utils.db import get_db_cursor
+from app.utils.search_index import SearchIndex
+from app.utils.change_journal import ChangeJournal
+import logging
+
+logger = logging.getLogger(__name__)
+
+def hot_score(comment_count, created_at):
+    """
+    热度得分：评论数取对数 + 发布时间线性加分
+    得分与当前时间无关，排序只需在评论数或状态变化时调整
+    """
+    return math.log10(1 + comment_count) + created_at.timestamp() / Config.HOT_DECAY_SECONDS
+
+class PostFeed:
+    """
+    已审核帖子的内存检索索引与热度排行
+    - 标题/内容的BM25倒排索引
+    - 全部与各分类下按热度排序的有序数组
+    发帖、审核时记入变更日志并更新本进程索引（未加载时只记日志），各worker使用前从主库加载变更的帖子；
+    新增评论只记入评论日志，各worker（包括写入方）使用前按日志累加评论数，不访问数据库
+    """
+
+    ALL = None  # 不区分分类的排行
+
+    _lock = threading.RLock()
+    _build_lock = threading.Lock()
+    _loaded_at = None
+
+    _posts = {}            # post_id -> 帖子记录（含comment_count）
+    _index = SearchIndex()
+    _hot = {}              # 分类（ALL表示全部） -> [(-score, -post_id)]，有序
+    _hot_keys = {}         # post_id -> (-score, -post_id)
+    _journal = ChangeJournal('posts')
+    _comments = ChangeJournal('post_comments')  # 每行为新增评论的post_id
+
+    # 帖子及其评论数（重建时加 status 条件，增量加载时按ID）
+    SELECT_SQL = """
+        SELECT p.*,
+               (SELECT COUNT(*) FROM comment WHERE post_id = p.post_id) as comment_count
+        FROM post p
+    """
+
+    @classmethod
+    def ensure_loaded(cls):
+        """首次使用时加载，超过刷新间隔后重建"""
+        loaded_at = cls._loaded_at
+        refresh = Config.SEARCH_INDEX_REFRESH
+        if loaded_at is not None and (refresh <= 0 or time.time() - loaded_at < refresh):
+            cls._sync()
+            return
+
+        if not cls._build_lock.acquire(blocking=loaded_at is None):
+            return
+        try:
+            if cls._loaded_at is loaded_at:
+                cls.rebuild()
+        finally:
+            cls._build_lock.release()
+
+    @classmethod
+    def rebuild(cls):
+        """从MySQL加载全部已审核帖子"""
+        start = time.time()
+        cls._journal.mark()
+        cls._comments.mark()
+        with get_db_cursor(commit=False) as cursor:
+            cursor.execute(cls.SELECT_SQL + " WHERE p.status = 'approved'")
+            rows = cursor.fetchall()
+
+        posts = {}
+        index = SearchIndex()
+        hot = {cls.ALL: []}
+        hot_keys = {}
+        for row in rows:
+            posts[row['post_id']] = row
+            index.add(row['post_id'], row['title'] or '', row['content'] or '', category=row['category'])
+            key = (-hot_score(row['comment_count'], row['created_at']), -row['post_id'])
+            hot_keys[row['post_id']] = key
+            hot[cls.ALL].append(key)
+            hot.setdefault(row['category'], []).append(key)
+        for keys in hot.values():
+            keys.sort()
+
+        with cls._lock:
+            cls._posts = posts
+            cls._index = index
+            cls._hot = hot
+            cls._hot_keys = hot_keys
+            cls._loaded_at = time.time()
+
+        logger.info(f"帖子索引构建完成: {len(posts)} 篇, 耗时 {time.time() - start:.2f}s")
+
+    @classmethod
+    def _sync(cls):
+        """回放其他worker的变更和新增评论；日志被替换时重建（其余线程继续使用旧索引）"""
+        post_ids = cls._journal.changes()
+        commented = cls._comments.changes()
+        if post_ids is None or commented is None:
+            if cls._build_lock.acquire(blocking=False):
+                try:
+                    cls.rebuild()
+                finally:
+                    cls._build_lock.release()
+            return
+        # 先累加评论数，再按ID重新加载的帖子以主库的评论数为准
+        if commented:
+            cls._add_comments(Counter(commented))
+        if post_ids:
+            cls._reload(post_ids)
+
+    @classmethod
+    def _reload(cls, post_ids):
+        """从主库加载变更的帖子（含评论数），已删除或不再是approved的移出索引"""
+        post_ids = list(set(post_ids))
+        placeholders = ', '.join(['%s'] * len(post_ids))
+        with get_db_cursor(commit=False, primary=True) as cursor:
+            cursor.execute(cls.SELECT_SQL + f" WHERE p.post_id IN ({placeholders})", post_ids)
+            rows = {row['post_id']: row for row in cursor.fetchall()}
+        with cls._lock:
+            for post_id in post_ids:
+                if post_id in rows:
+                    cls._upsert_locked(rows[post_id])
+                else:
+                    cls._remove_locked(post_id)
+
+    @classmethod
+    def upsert(cls, post):
+        """新增或更新帖子；非approved状态的帖子会被移出索引"""
+        cls.upsert_many([post])
+
+    @classmethod
+    def upsert_many(cls, posts):
+        """批量新增或更新帖子（一次加锁完成整批变更）"""
+        cls._journal.append(post['post_id'] for post in posts)
+        if cls._loaded_at is None:
+            return  # 本进程尚未加载，加载时会读取最新数据
+        with cls._lock:
+            for post in posts:
+                cls._upsert_locked(post)
+
+    @classmethod
+    def _upsert_locked(cls, post):
+        old = cls._posts.get(post['post_id'])
+        if post['status'] != 'approved':
+            cls._remove_locked(post['post_id'])
+            return
+        post = dict(post, comment_count=post.get('comment_count') or 0)
+        if old is not None:
+            cls._remove_hot_locked(old)
+        cls._posts[post['post_id']] = post
+        # 回放时多数帖子只有评论数变化，文本不变时不重建倒排项
+        if old is None or any(old[field] != post[field] for field in ('title', 'content', 'category')):
+            cls._index.add(post['post_id'], post['title'] or '', post['content'] or '',
+                           category=post['category'])
+        cls._insert_hot_locked(post)
+
+    @classmethod
+    def remove(cls, post_id):
+        """从索引中移除帖子"""
+        cls._journal.append([post_id])
+        if cls._loaded_at is None:
+            return
+        with cls._lock:
+            cls._remove_locked(post_id)
+
+    @classmethod
+    def on_comment(cls, post_id):
+        """新增评论：只记入评论日志，各worker在下次使用时合并累加评论数并调整热度位置"""
+        cls._comments.append([post_id])
+
+    @classmethod
+    def _add_comments(cls, counts):
+        with cls._lock:
+            for post_id, count in counts.items():
+                post = cls._posts.get(post_id)
+                if post is None:
+                    continue
+                cls._remove_hot_locked(post)
+                post['comment_count'] += count
+                cls._insert_hot_locked(post)
+
+    @classmethod
+    def _insert_hot_locked(cls, post):
+        key = (-hot_score(post['comment_count'], post['created_at']), -post['post_id'])
+        cls._hot_keys[post['post_id']] = key
+        insort(cls._hot[cls.ALL], key)
+        insort(cls._hot.setdefault(post['category'], []), key)
+
+    @classmethod
+    def _remove_hot_locked(cls, post):
+        key = cls._hot_keys.pop(post['post_id'], None)
+        if key is None:
+            return
+        for category in (cls.ALL, post['category']):
+            keys = cls._hot.get(category, [])
+            pos = bisect_left(keys, key)
+            if pos < len(keys) and keys[pos] == key:
+                del keys[pos]
+
+    @classmethod
+    def _remove_locked(cls, post_id):
+        post = cls._posts.pop(post_id, None)
+        if post is None:
+            return
+        cls._remove_hot_locked(post)
+        cls._index.remove(post_id)
+
+    @classmethod
+    def hot(cls, category=None, page=1, per_page=20):
+        """
+        按热度分页
+        :return: (总数, 帖子列表)
+        """
+        cls.ensure_loaded()
+        offset = (page - 1) * per_page
+        with cls._lock:
+            keys = cls._hot.get(category or cls.ALL, [])
+            posts = [dict(cls._posts[-post_id]) for _, post_id in keys[offset:offset + per_page]]
+            return len(keys), posts
+
+    @classmethod
+    def search(cls, query, category=None, page=1, per_page=20):
+        """
+        按关键词检索，结果按相关度排序
+        :return: (命中总数, 帖子列表)
+        """
+        cls.ensure_loaded()
+        offset = (page - 1) * per_page
+        predicate = (lambda doc: doc['category'] == category) if category else None
+        with cls._lock:
+            total, hits = cls._index.search_page(query, offset, per_page, predicate)
+            return total, [dict(cls._posts[post_id], score=round(score, 4)) for score, post_id, _ in hits]
@@ -0,0 +1,161 @@
+import os
+import threading
+import time
+from app.config import Config
+from app.utils.db import get_db_cursor, note_write
+from app.utils.lifecycle import Lifecycle
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 进度类型 -> progress表字段
+PROGRESS_FIELDS = {
+    'vocab': 'vocab_learned',
+    'grammar': 'grammar_learned',
+    'listening': 'listening_done'
+}
+
+class ProgressBuffer:
+    """
+    学习进度计数的写后合并缓冲
+    已学集合变化后只记下 用户 -> 待同步的内容类型，由后台线程按固定间隔或
+    累积用户数达到阈值时批量把 learned_items.item_count 复制到progress。
+    写入是复制而不是累加，提交结果未知时整批重试也不会重复计数；
+    读取进度时待同步（包括正在写入、尚未提交的一批）的字段直接取集合数量。
+    缓冲的用户数达到 PROGRESS_BUFFER_MAX 后新的用户直接同步写库，
+    数据库不可用时请求失败而不是无限堆积
+    """
+
+    # 单条UPDATE最多涉及的用户数
+    MAX_USERS_PER_STATEMENT = 1000
+
+    _lock = threading.Lock()
+    _pending = {}          # user_id -> 待同步的内容类型集合
+    _inflight = {}         # 正在写入的一批，提交前读取进度时仍需视为待同步
+    _flush_lock = threading.Lock()
+    _wakeup = threading.Event()
+    _flusher = None
+    _flusher_pid = None
+
+    @classmethod
+    def touch(cls, user_id, content_type):
+        """
+        记录用户某类内容的已学集合已变化，需要同步到progress
+        :param user_id: 用户ID
+        :param content_type: vocab, grammar, listening
+        """
+        if not Config.PROGRESS_WRITE_BEHIND:
+            cls._write({user_id: {content_type}})
+            return
+
+        with cls._lock:
+            full = user_id not in cls._pending and \
+                len(cls._pending) + len(cls._inflight) >= Config.PROGRESS_BUFFER_MAX
+            if not full:
+                cls._pending.setdefault(user_id, set()).add(content_type)
+            size = len(cls._pending)
+        if full:
+            cls._wakeup.set()
+            cls._write({user_id: {content_type}})
+            return
+        # 计数最长 FLUSH_INTERVAL 秒后才落库，会话在此之后仍需从主库读取
+        note_write(Config.PROGRESS_FLUSH_INTERVAL)
+        cls._ensure_flusher()
+        if size >= Config.PROGRESS_FLUSH_THRESHOLD:
+            cls._wakeup.set()
+
+    @classmethod
+    def pending_for(cls, user_id):
+        """获取某用户尚未同步到progress的内容类型集合"""
+        with cls._lock:
+            return cls._pending.get(user_id, set()) | cls._inflight.get(user_id, set())
+
+    @classmethod
+    def flush(cls):
+        """立即把缓冲中的全部用户同步到progress，失败时放回缓冲等待重试"""
+        with cls._flush_lock:
+            with cls._lock:
+                batch, cls._pending = cls._pending, {}
+                cls._inflight = batch
+            if not batch:
+                return 0
+            try:
+                cls._write(batch)
+                with cls._lock:
+                    cls._inflight = {}
+                return len(batch)
+            except Exception as e:
+                logger.error(f"写入学习进度失败，{len(batch)} 个用户将在下次重试: {e}")
+                # 写入是幂等的复制，即使服务端其实已提交，重试也只会写入相同（或更新）的计数
+                with cls._lock:
+                    for user_id, content_types in batch.items():
+                        cls._pending.setdefault(user_id, set()).update(content_types)
+                    cls._inflight = {}
+                raise
+
+    @classmethod
+    def _write(cls, batch):
+        """按内容类型分组，把已学集合的数量复制到progress对应字段"""
+        by_type = {}
+        for user_id, content_types in batch.items():
+            for content_type in content_types:
+                by_type.setdefault(content_type, []).append(user_id)
+
+        with get_db_cursor() as cursor:
+            for content_type, user_ids in by_type.items():
+                field = PROGRESS_FIELDS[content_type]
+                for i in range(0, len(user_ids), cls.MAX_USERS_PER_STATEMENT):
+                    chunk = user_ids[i:i + cls.MAX_USERS_PER_STATEMENT]
+                    placeholders = ', '.join(['%s'] * len(chunk))
+                    cursor.execute(f"""
+                        UPDATE progress p
+                        JOIN learned_items l
+                          ON l.user_id = p.user_id AND l.content_type = %s
+                        SET p.{field} = l.item_count,
+                            p.last_update = CURRENT_TIMESTAMP
+                        WHERE p.user_id IN ({placeholders})
+                    """, [content_type] + chunk)
+
+    @classmethod
+    def _ensure_flusher(cls):
+        """按需启动后台刷新线程（fork出的子进程需要重新启动）"""
+        if cls._flusher_pid == os.getpid() and cls._flusher and cls._flusher.is_alive():
+            return
+        with cls._lock:
+            if cls._flusher_pid == os.getpid() and cls._flusher and cls._flusher.is_alive():
+                return
+            cls._flusher = threading.Thread(target=cls._run, name='progress-flusher', daemon=True)
+            cls._flusher_pid = os.getpid()
+            cls._flusher.start()
+
+    @classmethod
+    def _run(cls):
+        while True:
+            # 最长延迟不超过PROGRESS_FLUSH_INTERVAL，达到阈值时提前唤醒
+            cls._wakeup.wait(Config.PROGRESS_FLUSH_INTERVAL)
+            cls._wakeup.clear()
+            try:
+                cls.flush()
+            except Exception:
+                time.sleep(Config.PROGRESS_FLUSH_INTERVAL)
+
+    @classmethod
+    def reset_after_fork(cls):
+        """子进程不继承父进程的锁、缓冲和刷新线程，缓冲内容仍由父进程负责同步"""
+        cls._lock = threading.Lock()
+        cls._flush_lock = threading.Lock()
+        cls._pending = {}
+        cls._inflight = {}
+        cls._wakeup = threading.Event()
+        cls._flusher = None
+
+    @classmethod
+    def shutdown(cls):
+        """进程退出前同步剩余的进度计数"""
+        try:
+            cls.flush()
+        except Exception as e:
+            logger.error(f"退出时写入学习进度失败: {e}")
+
+Lifecycle.on_fork(ProgressBuffer.reset_after_fork)
+Lifecycle.on_shutdown(ProgressBuffer.shutdown)
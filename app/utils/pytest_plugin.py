@@ -0,0 +1,30 @@
+"""
+查询预算的pytest夹具
+在 conftest.py 中声明 pytest_plugins = ['app.utils.pytest_plugin'] 后使用
+"""
+import pytest
+from app.config import Config
+from app.utils.query_budget import query_budget
+
+@pytest.fixture
+def assert_queries():
+    """
+    断言代码块中的SQL条数与重复语句
+
+        def test_vocab_list(client, assert_queries):
+            with assert_queries(2):
+                client.get('/api/learning/vocab')
+    """
+    def factory(max_queries=None, repeat_limit=None):
+        return query_budget(max_queries, repeat_limit, label='assert_queries', mode='raise')
+    return factory
+
+@pytest.fixture
+def query_budget_mode(monkeypatch):
+    """
+    按 Config.QUERY_BUDGETS 检查每个请求，超出预算的请求抛出QueryBudgetExceeded
+    需在创建应用之前生效，应用夹具应依赖本夹具
+    """
+    monkeypatch.setattr(Config, 'METRICS_ENABLED', True)
+    monkeypatch.setattr(Config, 'QUERY_BUDGET_MODE', 'raise')
+    return Config.QUERY_BUDGETS
@@ -0,0 +1,145 @@
+from collections import Counter
+from contextlib import contextmanager
+from flask import request, g
+from app.config import Config
+from app.utils.metrics import Metrics, normalize_sql, _captures
+import logging
+
+logger = logging.getLogger(__name__)
+
+class QueryBudgetExceeded(AssertionError):
+    """SQL条数超出预算，或同一语句被重复执行"""
+
+class QueryReport:
+    """一个请求（或一段代码）中执行的SQL"""
+
+    def __init__(self, statements=None):
+        self.statements = statements if statements is not None else []  # [(语句, 参数)]
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def repeated(self, limit):
+        """
+        同一归一化语句执行超过limit次，通常是在循环中逐条查询（N+1）
+        :return: {归一化语句: 次数}
+        """
+        counts = Counter(normalize_sql(statement) for statement, _ in self.statements)
+        return {statement: n for statement, n in counts.items() if n > limit}
+
+    def duplicates(self):
+        """
+        语句和参数完全相同、执行了多次的查询（结果可以复用）
+        :return: {归一化语句: 多余的执行次数}
+        """
+        counts = Counter((statement, repr(args)) for statement, args in self.statements)
+        result = Counter()
+        for (statement, _), n in counts.items():
+            if n > 1:
+                result[normalize_sql(statement)] += n - 1
+        return dict(result)
+
+    def violations(self, max_queries=None, repeat_limit=None):
+        """超出预算的各项说明，未超出时返回空列表"""
+        problems = []
+        if max_queries is not None and self.count > max_queries:
+            problems.append(f"执行了 {self.count} 条SQL，预算 {max_queries} 条")
+        repeated = self.repeated(Config.QUERY_REPEAT_LIMIT if repeat_limit is None else repeat_limit)
+        for statement, n in repeated.items():
+            problems.append(f"同一语句执行 {n} 次（疑似N+1）: {statement[:200]}")
+        for statement, n in self.duplicates().items():
+            if statement not in repeated:
+                problems.append(f"相同语句和参数多执行了 {n} 次: {statement[:200]}")
+        return problems
+
+def enforce(label, report, max_queries=None, repeat_limit=None, mode='raise'):
+    """
+    按模式处理预算检查结果
+    :param mode: off 不处理，warn 记录警告日志，raise 抛出QueryBudgetExceeded
+    :return: 超出预算的各项说明
+    """
+    if mode == 'off':
+        return []
+    problems = report.violations(max_queries, repeat_limit)
+    if problems:
+        message = f"{label} 超出查询预算: " + '; '.join(problems)
+        if mode == 'raise':
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+    return problems
+
+@contextmanager
+def query_budget(max_queries=None, repeat_limit=None, label='query_budget', mode='raise'):
+    """
+    统计代码块中执行的SQL并在结束时检查预算（需要开启 METRICS_ENABLED）
+    子线程通过 contextvars 继承时同样计入
+
+        with query_budget(max_queries=3) as report:
+            client.get('/api/learning/vocab')
+
+    :param max_queries: 最多执行的SQL条数，None表示不限
+    :param repeat_limit: 同一归一化语句最多执行次数，默认 QUERY_REPEAT_LIMIT
+    """
+    report = QueryReport()
+    token = _captures.set(_captures.get() + (report.statements,))
+    try:
+        yield report
+    finally:
+        _captures.reset(token)
+    enforce(label, report, max_queries, repeat_limit, mode)
+
+class QueryBudget:
+    """
+    按端点检查每个请求的SQL条数与重复语句
+    预算见 Config.QUERY_BUDGETS，由 QUERY_BUDGET_MODE 决定记录警告还是让请求失败，
+    用于测试和预发环境，让性能退化在上线前暴露
+    raise模式下写事务提交前先检查一次，超出预算时事务回滚；提交之后才超出预算的请求
+    已无法撤销写入，只记录警告
+    """
+
+    @classmethod
+    def init_app(cls, app):
+        if Config.QUERY_BUDGET_MODE == 'off' or not Config.METRICS_ENABLED:
+            return
+        # 本请求的计数对象由 Metrics 的WSGI中间件在进入Flask之前创建
+        app.before_request(cls._begin)
+        app.after_request(cls._check)
+
+    @staticmethod
+    def _begin():
+        metrics = Metrics.current()
+        if metrics is not None:
+            metrics.statements = []
+
+    @staticmethod
+    def _enforce(statements, mode):
+        endpoint = request.endpoint
+        return enforce(
+            f"{request.method} {request.path} ({endpoint})",
+            QueryReport(statements),
+            Config.QUERY_BUDGETS.get(endpoint, Config.QUERY_BUDGET_DEFAULT),
+            Config.QUERY_REPEAT_LIMIT,
+            mode
+        )
+
+    @classmethod
+    def before_commit(cls):
+        """由 get_db_cursor 在提交前调用：raise模式下超出预算时抛出异常，事务随之回滚"""
+        metrics = Metrics.current()
+        if metrics is None or metrics.statements is None:
+            return
+        cls._enforce(list(metrics.statements), 'raise')
+        g._query_budget_committed = True
+
+    @classmethod
+    def _check(cls, response):
+        metrics = Metrics.current()
+        if metrics is None or metrics.statements is None:
+            return response
+        mode = Config.QUERY_BUDGET_MODE
+        if mode == 'raise' and g.get('_query_budget_committed'):
+            mode = 'warn'
+        if cls._enforce(metrics.statements, mode):
+            response.headers['X-Query-Budget'] = 'exceeded'
+        return response
@@ -0,0 +1,211 @@
+import heapq
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+from app.config import Config
+from app.utils.db import get_db_cursor
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 各等级对应的目标难度（答错率）
+LEVEL_TARGETS = {'A1': 0.15, 'A2': 0.3, 'B1': 0.45, 'B2': 0.6, 'C1': 0.75, 'C2': 0.9}
+# 难度偏离目标时权重按高斯衰减；保留最小权重使任意题目都有机会被抽到
+DIFFICULTY_SIGMA = 0.15
+MIN_WEIGHT = 0.01
+# 难度平滑：把全局正确率当作这么多次作答的先验，样本少的题目向均值收缩
+PRIOR_WEIGHT = 20
+
+class AliasTable:
+    """Vose别名表：O(n)构建，之后每次按权重抽样O(1)"""
+
+    __slots__ = ('_prob', '_alias', '_weights')
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = sum(weights)
+        scaled = [w * n / total for w in weights]
+        prob = [1.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] += scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        self._prob = prob
+        self._alias = alias
+        self._weights = weights
+
+    def __len__(self):
+        return len(self._prob)
+
+    def sample(self, rng):
+        i = int(rng.random() * len(self._prob))
+        return i if rng.random() < self._prob[i] else self._alias[i]
+
+    def sample_distinct(self, rng, k):
+        """
+        不放回抽取k个位置
+        k远小于总数时用别名表抽样并丢弃重复，期望O(k)；
+        k接近总数时重复过多，改用加权随机键取前k个
+        """
+        n = len(self._prob)
+        if k >= n:
+            order = list(range(n))
+            rng.shuffle(order)
+            return order
+        if k <= n // 2:
+            picked = {}
+            while len(picked) < k:
+                picked.setdefault(self.sample(rng), None)
+            return list(picked)
+        keys = ((rng.random() ** (1.0 / w), i) for i, w in enumerate(self._weights))
+        return [i for _, i in heapq.nlargest(k, keys)]
+
+class QuizBank:
+    """
+    自适应组卷题库
+    按逐题作答统计（缺失时用测验成绩历史）预先计算每道题的难度，并按 (题型, 等级) 缓存别名表，
+    组卷只需O(N)次抽样，与题库大小无关；同一种子生成的试卷缓存在LRU中
+    """
+
+    _lock = threading.Lock()
+    _build_lock = threading.Lock()
+    _loaded_at = None
+
+    _questions = {}   # quiz_type -> ([question_id], [难度])
+    _tables = {}      # (quiz_type 或 None, 等级) -> (题目ID列表, AliasTable)
+    _generated = OrderedDict()  # (seed, quiz_type, level, count) -> [question_id]
+
+    @classmethod
+    def ensure_loaded(cls):
+        """首次使用时加载题库统计，超过刷新间隔后重建"""
+        loaded_at = cls._loaded_at
+        refresh = Config.QUIZ_BANK_REFRESH
+        if loaded_at is not None and (refresh <= 0 or time.time() - loaded_at < refresh):
+            return
+
+        # 已有旧数据时，只由一个线程重建，其余请求继续使用旧数据
+        if not cls._build_lock.acquire(blocking=loaded_at is None):
+            return
+        try:
+            if cls._loaded_at is loaded_at:
+                cls.rebuild()
+        finally:
+            cls._build_lock.release()
+
+    @classmethod
+    def rebuild(cls):
+        """从MySQL重新计算题目难度"""
+        start = time.time()
+        with get_db_cursor(commit=False) as cursor:
+            cursor.execute("""
+                SELECT qq.question_id, qq.quiz_id, q.quiz_type
+                FROM quiz_question qq
+                JOIN quiz q ON qq.quiz_id = q.quiz_id
+            """)
+            questions = cursor.fetchall()
+
+            # quiz_result 只记录整卷的答对数，没有逐题统计的题目取所在测验的平滑答错率
+            cursor.execute("""
+                SELECT quiz_id, SUM(correct_cnt) as correct, SUM(total_cnt) as total
+                FROM quiz_result
+                GROUP BY quiz_id
+            """)
+            stats = {row['quiz_id']: (int(row['correct'] or 0), int(row['total'] or 0))
+                     for row in cursor.fetchall()}
+
+            # 已有逐题作答统计的题目直接使用该题自己的答对数
+            cursor.execute("SELECT question_id, correct, answered FROM quiz_item_stats")
+            item_stats = {row['question_id']: (row['correct'], row['answered'])
+                          for row in cursor.fetchall()}
+
+        all_correct = sum(c for c, _ in stats.values())
+        all_total = sum(t for _, t in stats.values())
+        prior = all_correct / all_total if all_total else 0.5
+
+        by_type = {}
+        for row in questions:
+            correct, total = item_stats.get(row['question_id']) or stats.get(row['quiz_id'], (0, 0))
+            accuracy = (correct + prior * PRIOR_WEIGHT) / (total + PRIOR_WEIGHT)
+            ids, difficulties = by_type.setdefault(row['quiz_type'], ([], []))
+            ids.append(row['question_id'])
+            difficulties.append(1.0 - accuracy)
+
+        with cls._lock:
+            cls._questions = by_type
+            cls._tables = {}
+            cls._loaded_at = time.time()
+
+        logger.info(f"题库统计构建完成: {len(questions)} 道题目, 耗时 {time.time() - start:.2f}s")
+
+    @classmethod
+    def invalidate(cls):
+        """题库变更后让下一次组卷触发重建"""
+        if cls._loaded_at is not None:
+            cls._loaded_at = 0
+
+    @classmethod
+    def _table(cls, quiz_type, level):
+        """获取 (题型, 等级) 的别名表，首次使用时构建"""
+        key = (quiz_type, level)
+        with cls._lock:
+            entry = cls._tables.get(key)
+            questions = cls._questions
+        if entry:
+            return entry
+
+        ids = []
+        difficulties = []
+        for t, (type_ids, type_difficulties) in questions.items():
+            if quiz_type is None or t == quiz_type:
+                ids.extend(type_ids)
+                difficulties.extend(type_difficulties)
+        if not ids:
+            return [], None
+
+        target = LEVEL_TARGETS[level]
+        weights = [math.exp(-0.5 * ((d - target) / DIFFICULTY_SIGMA) ** 2) + MIN_WEIGHT
+                   for d in difficulties]
+        entry = (ids, AliasTable(weights))
+        with cls._lock:
+            # 构建期间题库被重建则不缓存旧结果
+            if cls._questions is questions:
+                cls._tables[key] = entry
+        return entry
+
+    @classmethod
+    def generate(cls, seed, quiz_type, level, count):
+        """
+        按种子组卷，相同参数与种子在缓存有效期内返回相同题目
+        :param seed: 随机种子
+        :param quiz_type: vocab, grammar, listening，None表示不限
+        :param level: A1-C2
+        :param count: 题目数量
+        :return: 题目ID列表（可能少于count，题库不足时）
+        """
+        key = (seed, quiz_type, level, count)
+        with cls._lock:
+            cached = cls._generated.get(key)
+            if cached is not None:
+                cls._generated.move_to_end(key)
+                return list(cached)
+
+        cls.ensure_loaded()
+        ids, table = cls._table(quiz_type, level)
+        if table is None:
+            return []
+        rng = random.Random(seed)
+        question_ids = [ids[i] for i in table.sample_distinct(rng, count)]
+
+        with cls._lock:
+            cls._generated[key] = question_ids
+            while len(cls._generated) > Config.QUIZ_CACHE_SIZE:
+                cls._generated.popitem(last=False)
+        return list(question_ids)
@@ -0,0 +1,173 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from flask import request, jsonify
+from app.config import Config
+from app.utils.auth_utils import verify_token
+from app.schemas.response import error_response
+import logging
+
+logger = logging.getLogger(__name__)
+
+class MemoryStore:
+    """
+    进程内令牌桶存储（单进程部署或测试使用）
+    按最近使用顺序保留有限数量的桶，淘汰的桶下次视为已满
+    """
+
+    def __init__(self, max_keys=100000):
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()  # 键 -> (剩余令牌, 更新时间)
+        self._max_keys = max_keys
+
+    def consume(self, key, capacity, rate, cost=1):
+        """
+        尝试从桶中取出令牌
+        :param capacity: 桶容量（允许的突发请求数）
+        :param rate: 每秒补充的令牌数
+        :return: (是否放行, 需等待的秒数)
+        """
+        now = time.monotonic()
+        with self._lock:
+            state = self._buckets.get(key)
+            if state is None:
+                tokens = capacity
+            else:
+                tokens = min(capacity, state[0] + (now - state[1]) * rate)
+                self._buckets.move_to_end(key)
+            if tokens >= cost:
+                tokens -= cost
+                result = (True, 0.0)
+            else:
+                result = (False, (cost - tokens) / rate)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+# 在Redis中原子地完成补充与扣减，时间取Redis服务器时间，各进程一致
+_REDIS_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+if tokens == nil then
+    tokens = capacity
+else
+    tokens = math.min(capacity, tokens + (now - tonumber(state[2])) * rate)
+end
+local allowed = 0
+local retry = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(retry)}
+"""
+
+class RedisStore:
+    """多进程/多实例共享的令牌桶存储，需要安装redis包"""
+
+    def __init__(self, url, prefix='ratelimit:'):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(_REDIS_SCRIPT)
+        self._prefix = prefix
+
+    def consume(self, key, capacity, rate, cost=1):
+        allowed, retry = self._script(keys=[self._prefix + key], args=[capacity, rate, cost])
+        return bool(allowed), float(retry)
+
+    def reset(self):
+        for key in self._client.scan_iter(match=self._prefix + '*'):
+            self._client.delete(key)
+
+def create_store(storage):
+    """根据配置创建存储：memory 或 redis://..."""
+    if storage.startswith('redis://') or storage.startswith('rediss://'):
+        return RedisStore(storage)
+    return MemoryStore(Config.RATE_LIMIT_MAX_KEYS)
+
+def client_ip():
+    """客户端IP，只有部署在可信代理之后时才采用X-Forwarded-For"""
+    if Config.RATE_LIMIT_TRUST_PROXY:
+        forwarded = request.headers.get('X-Forwarded-For')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.remote_addr or 'unknown'
+
+def _key_value(kind):
+    """提取限流维度的值，取不到时返回None（该规则跳过）"""
+    if kind == 'ip':
+        return client_ip()
+    if kind == 'email':
+        data = request.get_json(silent=True)
+        email = data.get('email') if isinstance(data, dict) else None
+        return email.strip().lower() if isinstance(email, str) and email.strip() else None
+    if kind == 'user':
+        # 只校验JWT签名，不查询数据库；未登录的请求按IP限流
+        token = request.headers.get('Authorization', '').replace('Bearer ', '')
+        user_id = verify_token(token) if token else None
+        return f"u{user_id}" if user_id else f"ip{client_ip()}"
+    raise ValueError(f"未知的限流维度: {kind}")
+
+class RateLimiter:
+    """
+    按路由配置的令牌桶限流
+    在请求进入视图之前检查，超限时直接返回429，不会访问MySQL/MongoDB
+    """
+
+    _store = None
+
+    @classmethod
+    def init_app(cls, app):
+        if not Config.RATE_LIMIT_ENABLED:
+            return
+        cls._store = create_store(Config.RATE_LIMIT_STORAGE)
+        app.before_request(cls._check)
+
+    @classmethod
+    def _check(cls):
+        rules = Config.RATE_LIMIT_RULES.get(request.endpoint)
+        if not rules:
+            return None
+
+        retry_after = 0.0
+        for kind, limit, period in rules:
+            value = _key_value(kind)
+            if value is None:
+                continue
+            try:
+                allowed, wait = cls._store.consume(f"{request.endpoint}:{kind}:{value}", limit, limit / period)
+            except Exception as e:
+                # 存储不可用时放行，避免限流组件拖垮整个服务
+                logger.error(f"限流存储不可用: {e}")
+                return None
+            if not allowed:
+                retry_after = max(retry_after, wait)
+
+        if retry_after > 0:
+            body, code = error_response("请求过于频繁，请稍后再试", 429)
+            response = jsonify(body)
+            response.status_code = code
+            response.headers['Retry-After'] = str(math.ceil(retry_after))
+            return response
+        return None
+
+    @classmethod
+    def reset(cls):
+        """清空全部桶"""
+        if cls._store is not None:
+            cls._store.reset()
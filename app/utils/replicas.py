@@ -0,0 +1,241 @@
+import itertools
+import os
+import threading
+import time
+import pymysql
+from flask import g, request
+from app.config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Replica:
+    """单个只读从库及其状态"""
+
+    __slots__ = ('name', 'pool', 'lag', 'ejected_until', 'checked_at', 'error')
+
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        self.lag = None          # 复制延迟（秒），None表示未知或复制未运行
+        self.ejected_until = 0.0 # 摘除截止时间（monotonic）
+        self.checked_at = None
+        self.error = None
+
+    def available(self, now):
+        return self.ejected_until <= now and self.lag is not None and self.lag <= Config.REPLICA_MAX_LAG
+
+class ReplicaSet:
+    """
+    MySQL只读从库
+    - 按 REPLICA_STRATEGY 轮询或选择使用中连接最少的从库
+    - 连接失败的从库摘除 REPLICA_EJECT_SECONDS 秒，后台检查通过后恢复
+    - 后台线程每 REPLICA_CHECK_INTERVAL 秒查询复制延迟，超过 REPLICA_MAX_LAG 或复制未运行时不再使用
+    - 没有可用从库时返回None，由调用方回退到主库
+    """
+
+    def __init__(self, configs, pool_factory):
+        self._replicas = [Replica(f"{config['host']}:{config['port']}", pool_factory(config))
+                          for config in configs]
+        self._counter = itertools.count()
+        self._init_state()
+
+    def _init_state(self):
+        self._lock = threading.Lock()
+        self._checker = None
+        self._checker_pid = None
+
+    def __bool__(self):
+        return bool(self._replicas)
+
+    def choose(self):
+        """选择一个可用从库，没有时返回None"""
+        self._ensure_checker()
+        now = time.monotonic()
+        candidates = [replica for replica in self._replicas if replica.available(now)]
+        if not candidates:
+            return None
+        start = next(self._counter) % len(candidates)
+        if Config.REPLICA_STRATEGY == 'least_connections':
+            # 从轮询位置开始比较，使用中连接数相同时仍然轮流分配
+            rotated = candidates[start:] + candidates[:start]
+            return min(rotated, key=lambda replica: replica.pool.in_use)
+        return candidates[start]
+
+    def eject(self, replica, error):
+        """连接出错后暂时摘除从库"""
+        replica.ejected_until = time.monotonic() + Config.REPLICA_EJECT_SECONDS
+        replica.error = str(error)
+        logger.warning(f"从库 {replica.name} 不可用，摘除 {Config.REPLICA_EJECT_SECONDS}s: {error}")
+
+    @staticmethod
+    def replication_lag(replica):
+        """
+        查询复制延迟（需要 REPLICATION CLIENT 权限）
+        :return: 延迟秒数；复制线程未运行时为None；不是从库时为0
+        """
+        connection = replica.pool.acquire(timeout=Config.HEALTH_CHECK_TIMEOUT)
+        discard = False
+        try:
+            with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+                try:
+                    cursor.execute("SHOW REPLICA STATUS")
+                except pymysql.err.ProgrammingError:
+                    # MySQL 8.0.22 之前的版本
+                    cursor.execute("SHOW SLAVE STATUS")
+                row = cursor.fetchone()
+        except Exception:
+            discard = True
+            raise
+        finally:
+            replica.pool.release(connection, discard=discard)
+        if row is None:
+            return 0
+        return row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+
+    def check_all(self):
+        """检查全部从库的可用性和复制延迟"""
+        for replica in self._replicas:
+            try:
+                replica.lag = self.replication_lag(replica)
+                replica.error = None if replica.lag is not None else "复制线程未运行"
+                replica.ejected_until = 0.0
+            except Exception as e:
+                replica.lag = None
+                self.eject(replica, e)
+            replica.checked_at = time.time()
+        return {'replicas': len(self._replicas),
+                'available': sum(replica.available(time.monotonic()) for replica in self._replicas)}
+
+    def _ensure_checker(self):
+        """按需启动后台检查线程（fork出的子进程需要重新启动）"""
+        if self._checker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._checker_pid == os.getpid():
+                return
+            self._checker = threading.Thread(target=self._run, name='replica-checker', daemon=True)
+            self._checker_pid = os.getpid()
+            self._checker.start()
+
+    def _run(self):
+        while True:
+            self.check_all()
+            time.sleep(Config.REPLICA_CHECK_INTERVAL)
+
+    def stats(self):
+        now = time.monotonic()
+        return [{
+            'name': replica.name,
+            'available': replica.available(now),
+            'lag_seconds': replica.lag,
+            'ejected': replica.ejected_until > now,
+            'in_use': replica.pool.in_use,
+            'error': replica.error
+        } for replica in self._replicas]
+
+    def reset_after_fork(self):
+        """子进程丢弃继承的连接和检查线程"""
+        for replica in self._replicas:
+            replica.pool.reset_after_fork()
+        self._init_state()
+
+    def close_all(self):
+        for replica in self._replicas:
+            replica.pool.close_all()
+
+class ReadYourWrites:
+    """
+    写后读一致性：请求写入主库后，同一会话在 REPLICA_RYW_SECONDS 秒内的读取都走主库
+    - 同一请求内写入之后的读取
+    - 本进程内按会话标识（JWT用户、请求中的user_id；两者都没有时用客户端IP）记录的写入时间
+    - 客户端回传的 X-Read-After 头（写请求的响应中返回），用于请求落到其他进程或实例的情况
+    """
+
+    HEADER = 'X-Read-After'
+    MAX_SESSIONS = 100000
+
+    _lock = threading.Lock()
+    _pins = {}  # 会话标识 -> 截止时间（time.time()）
+
+    @staticmethod
+    def session_keys():
+        """
+        当前请求的会话标识，同一请求内缓存
+        只有请求中没有任何用户标识时才按客户端IP区分：部署在负载均衡之后时许多用户共用一个IP，
+        按IP固定会让一个用户的写入把所有人的读取都切到主库
+        """
+        keys = g.get('_ryw_keys')
+        if keys is None:
+            from app.utils.auth_utils import verify_token
+            from app.utils.rate_limit import client_ip
+            keys = set()
+            token = request.headers.get('Authorization', '').replace('Bearer ', '')
+            user_id = verify_token(token) if token else None
+            data = request.get_json(silent=True)
+            for candidate in (user_id,
+                              (request.view_args or {}).get('user_id'),
+                              request.args.get('user_id'),
+                              data.get('user_id') if isinstance(data, dict) else None):
+                if candidate is not None:
+                    keys.add(f"u{candidate}")
+            if not keys:
+                keys.add(f"ip{client_ip()}")
+            g._ryw_keys = keys
+        return keys
+
+    @classmethod
+    def pinned(cls):
+        """当前请求的读取是否必须走主库"""
+        if g.get('_ryw_until'):
+            return True
+        now = time.time()
+        try:
+            if float(request.headers.get(cls.HEADER, 0)) > now:
+                return True
+        except ValueError:
+            pass
+        pins = cls._pins
+        if not pins:
+            return False
+        return any(pins.get(key, 0) > now for key in cls.session_keys())
+
+    @classmethod
+    def note_write(cls, delay=0):
+        """
+        记录当前请求的写入
+        :param delay: 写入进入写缓冲、稍后才落库时，最长的落库延迟（秒），固定时间相应延长
+        """
+        g._ryw_until = cls.pin(cls.session_keys(), delay)
+
+    @classmethod
+    def pin(cls, keys, delay=0):
+        """
+        把会话固定到主库（不依赖Flask请求上下文，异步应用的写入同样调用）
+        :param keys: 会话标识，如 {'u42'}
+        :return: 固定的截止时间，写请求的响应以 X-Read-After 头返回
+        """
+        until = time.time() + Config.REPLICA_RYW_SECONDS + delay
+        with cls._lock:
+            if len(cls._pins) >= cls.MAX_SESSIONS:
+                now = time.time()
+                cls._pins = {key: expiry for key, expiry in cls._pins.items() if expiry > now}
+            for key in keys:
+                cls._pins[key] = until
+        return until
+
+    @classmethod
+    def init_app(cls, app):
+        app.after_request(cls._set_header)
+
+    @classmethod
+    def _set_header(cls, response):
+        until = g.get('_ryw_until')
+        if until:
+            cls.set_header(response, until)
+        return response
+
+    @classmethod
+    def set_header(cls, response, until):
+        response.headers[cls.HEADER] = '%.3f' % until
+        return response
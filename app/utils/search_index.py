@@ -0,0 +1,188 @@
+import math
+import pickle
+import threading
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from heapq import nlargest
+from app.utils.text import tokenize
+
+class SearchIndex:
+    """
+    BM25倒排索引
+    文档使用内部递增编号，倒排表为 (编号数组, 词频数组)，编号数组保持递增；
+    删除或替换文档时按编号二分移除其倒排项，序列化时只需重新编号
+    """
+
+    FORMAT_VERSION = 1
+    TITLE_BOOST = 2
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._next_num = 0
+        self._docs = {}       # 内部编号 -> (key, 文档长度, 文档数据)
+        self._keys = {}       # key -> 内部编号
+        self._postings = {}   # 词元 -> (array('I') 编号, array('H') 词频)
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def add(self, key, title, body, **meta):
+        """
+        添加或替换文档
+        :param key: 文档唯一标识（可哈希、可序列化）
+        :param title: 标题，权重为正文的TITLE_BOOST倍
+        :param body: 正文
+        :param meta: 随文档保存的其他字段，用于过滤和返回
+        """
+        tokens = tokenize(title) * self.TITLE_BOOST + tokenize(body)
+        doc = dict(meta, title=title, body=body)
+        with self._lock:
+            self._remove_locked(key)
+            num = self._next_num
+            self._next_num += 1
+            self._docs[num] = (key, len(tokens), doc)
+            self._keys[key] = num
+            self._total_length += len(tokens)
+            for token, tf in Counter(tokens).items():
+                posting = self._postings.get(token)
+                if posting is None:
+                    posting = self._postings[token] = (array('I'), array('H'))
+                posting[0].append(num)
+                posting[1].append(min(tf, 0xFFFF))
+
+    def remove(self, key):
+        """删除文档"""
+        with self._lock:
+            self._remove_locked(key)
+
+    def _remove_locked(self, key):
+        num = self._keys.pop(key, None)
+        if num is None:
+            return
+        _, length, doc = self._docs.pop(num)
+        self._total_length -= length
+        for token in set(tokenize(doc['title']) + tokenize(doc['body'])):
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            nums, tfs = posting
+            pos = bisect_left(nums, num)
+            if pos < len(nums) and nums[pos] == num:
+                del nums[pos]
+                del tfs[pos]
+                if not nums:
+                    del self._postings[token]
+
+    def get(self, key):
+        """按key获取文档数据"""
+        num = self._keys.get(key)
+        return self._docs[num][2] if num is not None else None
+
+    def search(self, query, limit=20, predicate=None):
+        """
+        BM25检索
+        :param query: 查询文本
+        :param limit: 返回条数
+        :param predicate: 可选过滤函数，参数为文档数据
+        :return: [(score, key, doc)]，按得分降序
+        """
+        _, hits = self.search_page(query, 0, limit, predicate)
+        return hits
+
+    def search_page(self, query, offset, limit, predicate=None):
+        """
+        分页BM25检索
+        :return: (命中总数, [(score, key, doc)])
+        """
+        tokens = set(tokenize(query))
+        with self._lock:
+            n = len(self._docs)
+            if not tokens or not n:
+                return 0, []
+            avgdl = self._total_length / n
+            k1, b = self.k1, self.b
+            docs = self._docs
+            scores = {}
+            for token in tokens:
+                posting = self._postings.get(token)
+                if posting is None:
+                    continue
+                nums, tfs = posting
+                df = len(nums)
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                for num, tf in zip(nums, tfs):
+                    entry = docs.get(num)
+                    if entry is None:
+                        continue
+                    norm = k1 * (1 - b + b * entry[1] / avgdl)
+                    scores[num] = scores.get(num, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+            if predicate is not None:
+                candidates = [(s, num) for num, s in scores.items() if predicate(docs[num][2])]
+            else:
+                candidates = [(s, num) for num, s in scores.items()]
+            top = nlargest(offset + limit, candidates)[offset:]
+            return len(candidates), [(score, docs[num][0], docs[num][2]) for score, num in top]
+
+    def dumps(self):
+        """序列化为紧凑的二进制格式（重新编号并丢弃已删除文档的倒排项）"""
+        with self._lock:
+            ordered = sorted(self._docs)
+            docs = [self._docs[num] for num in ordered]
+            if len(ordered) == self._next_num:
+                # 没有删除过文档，编号本身就是连续的，直接输出
+                postings = {token: (nums.tobytes(), tfs.tobytes())
+                            for token, (nums, tfs) in self._postings.items()}
+            else:
+                postings = self._compact_postings({num: i for i, num in enumerate(ordered)})
+            payload = {
+                'version': self.FORMAT_VERSION,
+                'k1': self.k1,
+                'b': self.b,
+                'docs': docs,
+                'postings': postings
+            }
+        return zlib.compress(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+    def _compact_postings(self, renumber):
+        postings = {}
+        for token, (nums, tfs) in self._postings.items():
+            new_nums = array('I')
+            new_tfs = array('H')
+            for num, tf in zip(nums, tfs):
+                new_num = renumber.get(num)
+                if new_num is not None:
+                    new_nums.append(new_num)
+                    new_tfs.append(tf)
+            if new_nums:
+                postings[token] = (new_nums.tobytes(), new_tfs.tobytes())
+        return postings
+
+    @classmethod
+    def loads(cls, data):
+        """从dumps()的结果恢复索引（仅用于读取本服务自己写出的文件）"""
+        payload = pickle.loads(zlib.decompress(data))
+        if payload.get('version') != cls.FORMAT_VERSION:
+            raise ValueError(f"不支持的索引格式版本: {payload.get('version')}")
+
+        index = cls(k1=payload['k1'], b=payload['b'])
+        for num, (key, length, doc) in enumerate(payload['docs']):
+            index._docs[num] = (key, length, doc)
+            index._keys[key] = num
+            index._total_length += length
+        index._next_num = len(payload['docs'])
+        for token, (nums, tfs) in payload['postings'].items():
+            num_arr = array('I')
+            num_arr.frombytes(nums)
+            tf_arr = array('H')
+            tf_arr.frombytes(tfs)
+            index._postings[token] = (num_arr, tf_arr)
+        return index
@@ -0,0 +1,74 @@
+import html
+import re
+
+# 英文单词（含撇号缩写）按词切分，中文按单字切分
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?|[一-鿿]")
+
+def tokenize(text):
+    """将文本切分为小写词元列表"""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.lower())
+
+def edit_distance(a, b, max_distance=2):
+    """
+    计算两个字符串的编辑距离（允许相邻字符交换）
+    超过max_distance时提前返回max_distance + 1
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    prev_prev = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if (prev_prev is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                cur[j] = min(cur[j], prev_prev[j - 2] + 1)
+            row_min = min(row_min, cur[j])
+        if row_min > max_distance:
+            return max_distance + 1
+        prev_prev, prev = prev, cur
+    return prev[-1]
+
+def highlight(text, tokens, width=80, tag='em'):
+    """
+    截取包含检索词的片段并高亮
+    :param text: 原文
+    :param tokens: 检索词元
+    :param width: 片段长度
+    :param tag: 高亮使用的HTML标签
+    :return: 已转义的HTML片段
+    """
+    if not text:
+        return ''
+    # 英文词元按整词匹配，中文单字直接匹配
+    alternatives = []
+    for token in set(tokens):
+        if token.isascii():
+            alternatives.append(r"\b%s\b" % re.escape(token))
+        elif token:
+            alternatives.append(re.escape(token))
+    if not alternatives:
+        return html.escape(text[:width])
+    pattern = re.compile('|'.join(alternatives), re.IGNORECASE)
+    first = pattern.search(text)
+    start = max(0, first.start() - width // 3) if first else 0
+    end = min(len(text), start + width)
+    fragment = text[start:end]
+
+    parts = []
+    pos = 0
+    for match in pattern.finditer(fragment):
+        parts.append(html.escape(fragment[pos:match.start()]))
+        parts.append(f"<{tag}>{html.escape(match.group(0))}</{tag}>")
+        pos = match.end()
+    parts.append(html.escape(fragment[pos:]))
+
+    prefix = '...' if start > 0 else ''
+    suffix = '...' if end < len(text) else ''
+    return prefix + ''.join(parts) + suffix
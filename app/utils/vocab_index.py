@@ -0,0 +1,288 @@
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_left, insort
+from app.config import Config
+from app.utils.db import get_db_cursor
+from app.utils.lifecycle import Lifecycle
+from app.utils.text import tokenize, edit_distance
+from app.utils.change_journal import ChangeJournal
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 索引中的删除变体最多删除的字符数，与容错检索的最大编辑距离一致
+MAX_DISTANCE = 2
+
+# 删除变体按crc32的高16位分桶，桶内无序；增删只改动所在的小数组，构建时也不需要全局排序
+DELETE_BUCKET_BITS = 16
+
+def _deletes(word, depth=1):
+    """生成单词删除最多depth个字符后的所有变体（含原词），depth不超过2"""
+    n = len(word)
+    variants = {word}
+    if depth >= 1:
+        variants.update([word[:i] + word[i + 1:] for i in range(n)])
+    if depth >= 2:
+        # 直接按位置对 i < j 删除，不再从一次删除的结果重复展开
+        variants.update([word[:i] + word[i + 1:j] + word[j + 1:] for j in range(1, n) for i in range(j)])
+    return variants
+
+def _delete_keys(word, word_id):
+    """将删除变体编码为 (crc32 << 32 | word_id) 形式的整数键"""
+    return [(zlib.crc32(v.encode('utf-8')) << 32) | word_id for v in _deletes(word, MAX_DISTANCE)]
+
+def _bucket(key):
+    return key >> (64 - DELETE_BUCKET_BITS)
+
+class VocabIndex:
+    """
+    词汇内存索引
+    - 按单词排序的数组，使用bisect做前缀补全
+    - 释义/例句的倒排索引
+    - 删除变体哈希桶，用于容错（拼写错误）检索
+    管理端的增删改记入变更日志并写入本进程索引（未加载时只记日志），其他worker使用索引前从主库加载变更的词汇
+    """
+
+    _lock = threading.RLock()
+    _build_lock = threading.Lock()
+    _loaded_at = None
+
+    _rows = {}            # word_id -> 词汇记录
+    _words = []           # [(小写单词, word_id)]，有序
+    _postings = {}        # 词元 -> {word_id}
+    _deletes = []         # 删除变体键，按 _bucket 分桶的 array('Q') 列表
+    _journal = ChangeJournal('vocab')
+
+    @classmethod
+    def ensure_loaded(cls):
+        """首次使用时加载索引，超过刷新间隔后重建"""
+        loaded_at = cls._loaded_at
+        refresh = Config.SEARCH_INDEX_REFRESH
+        if loaded_at is not None and (refresh <= 0 or time.time() - loaded_at < refresh):
+            cls._sync()
+            return
+
+        # 已有旧索引时，只由一个线程重建，其余请求继续使用旧索引
+        if not cls._build_lock.acquire(blocking=loaded_at is None):
+            return
+        try:
+            if cls._loaded_at is loaded_at:
+                cls.rebuild()
+        finally:
+            cls._build_lock.release()
+
+    @classmethod
+    def rebuild(cls):
+        """从MySQL全量重建索引"""
+        start = time.time()
+        cls._journal.mark()
+        with get_db_cursor(commit=False) as cursor:
+            cursor.execute("SELECT word_id, word, meaning, example, level FROM vocab")
+            rows = cursor.fetchall()
+
+        index_rows = {}
+        words = []
+        postings = {}
+        deletes = [array('Q') for _ in range(1 << DELETE_BUCKET_BITS)]
+        for row in rows:
+            word_id = row['word_id']
+            index_rows[word_id] = row
+            word = (row['word'] or '').lower()
+            words.append((word, word_id))
+            for token in set(tokenize(row['meaning']) + tokenize(row['example'])):
+                postings.setdefault(token, set()).add(word_id)
+            for key in _delete_keys(word, word_id):
+                deletes[_bucket(key)].append(key)
+        words.sort()
+
+        with cls._lock:
+            cls._rows = index_rows
+            cls._words = words
+            cls._postings = postings
+            cls._deletes = deletes
+            cls._loaded_at = time.time()
+
+        logger.info(f"词汇索引构建完成: {len(index_rows)} 个词汇, 耗时 {time.time() - start:.2f}s")
+
+    @classmethod
+    def _sync(cls):
+        """回放其他worker的变更；变更日志被替换时重建（其余线程继续使用旧索引）"""
+        word_ids = cls._journal.changes()
+        if word_ids is None:
+            if cls._build_lock.acquire(blocking=False):
+                try:
+                    cls.rebuild()
+                finally:
+                    cls._build_lock.release()
+        elif word_ids:
+            cls._reload(word_ids)
+
+    @classmethod
+    def _reload(cls, word_ids):
+        """从主库加载变更的词汇，已删除的移出索引"""
+        word_ids = list(set(word_ids))
+        placeholders = ', '.join(['%s'] * len(word_ids))
+        with get_db_cursor(commit=False, primary=True) as cursor:
+            cursor.execute(f"""
+                SELECT word_id, word, meaning, example, level FROM vocab WHERE word_id IN ({placeholders})
+            """, word_ids)
+            rows = {row['word_id']: row for row in cursor.fetchall()}
+        # 删除变体在持锁前生成，检索只在替换时短暂等待
+        keys = {word_id: _delete_keys((row['word'] or '').lower(), word_id) for word_id, row in rows.items()}
+        with cls._lock:
+            for word_id in word_ids:
+                if word_id in rows:
+                    cls._upsert_locked(rows[word_id], keys[word_id])
+                else:
+                    cls._remove_locked(word_id)
+
+    @classmethod
+    def upsert(cls, row):
+        """新增或更新一个词汇（本进程索引尚未加载时只记入变更日志，加载时会读取最新数据）"""
+        cls._journal.append([row['word_id']])
+        if cls._loaded_at is None:
+            return
+        keys = _delete_keys((row['word'] or '').lower(), row['word_id'])
+        with cls._lock:
+            cls._upsert_locked(row, keys)
+
+    @classmethod
+    def _upsert_locked(cls, row, keys):
+        cls._remove_locked(row['word_id'])
+        word_id = row['word_id']
+        word = (row['word'] or '').lower()
+        cls._rows[word_id] = row
+        insort(cls._words, (word, word_id))
+        for token in set(tokenize(row.get('meaning')) + tokenize(row.get('example'))):
+            cls._postings.setdefault(token, set()).add(word_id)
+        for key in keys:
+            cls._deletes[_bucket(key)].append(key)
+
+    @classmethod
+    def remove(cls, word_id):
+        """从索引中删除词汇（本进程索引尚未加载时只记入变更日志）"""
+        cls._journal.append([word_id])
+        if cls._loaded_at is None:
+            return
+        with cls._lock:
+            cls._remove_locked(word_id)
+
+    @classmethod
+    def _remove_locked(cls, word_id):
+        row = cls._rows.pop(word_id, None)
+        if not row:
+            return
+        word = (row['word'] or '').lower()
+        pos = bisect_left(cls._words, (word, word_id))
+        if pos < len(cls._words) and cls._words[pos] == (word, word_id):
+            del cls._words[pos]
+        for token in set(tokenize(row.get('meaning')) + tokenize(row.get('example'))):
+            ids = cls._postings.get(token)
+            if ids is not None:
+                ids.discard(word_id)
+                if not ids:
+                    del cls._postings[token]
+        for key in _delete_keys(word, word_id):
+            bucket = cls._deletes[_bucket(key)]
+            if key in bucket:
+                bucket.remove(key)
+
+    @classmethod
+    def search(cls, query, level=None, limit=20, fuzzy=False):
+        """
+        搜索词汇
+        :param query: 关键词
+        :param level: 可选难度等级过滤
+        :param limit: 最多返回条数
+        :param fuzzy: 是否启用拼写容错
+        :return: 词汇列表，每条带有match字段（prefix/text/fuzzy）
+        """
+        cls.ensure_loaded()
+        results = []
+        seen = set()
+
+        def collect(word_ids, match):
+            for word_id in word_ids:
+                if len(results) >= limit:
+                    return
+                if word_id in seen:
+                    continue
+                row = cls._rows.get(word_id)
+                if row is None or (level and row['level'] != level):
+                    continue
+                seen.add(word_id)
+                results.append(dict(row, match=match))
+
+        with cls._lock:
+            collect(cls._prefix_ids(query.lower()), 'prefix')
+            if len(results) < limit:
+                collect(cls._text_ids(query, level, limit + len(results)), 'text')
+            if fuzzy and len(results) < limit:
+                collect(cls._fuzzy_ids(query.lower()), 'fuzzy')
+        return results
+
+    @classmethod
+    def _prefix_ids(cls, prefix):
+        """按单词前缀在有序数组中顺序产出word_id"""
+        pos = bisect_left(cls._words, (prefix,))
+        while pos < len(cls._words):
+            word, word_id = cls._words[pos]
+            if not word.startswith(prefix):
+                break
+            yield word_id
+            pos += 1
+
+    @classmethod
+    def _text_ids(cls, query, level, limit):
+        """释义/例句全文检索，多个词元取交集"""
+        tokens = set(tokenize(query))
+        if not tokens:
+            return []
+        sets = sorted((cls._postings.get(t, set()) for t in tokens), key=len)
+        smallest, rest = sets[0], sets[1:]
+        # 从最小的倒排表出发逐个校验，凑够limit条即停止，避免高频词元的全量求交
+        matched = []
+        for word_id in smallest:
+            if all(word_id in s for s in rest) and (not level or cls._rows[word_id]['level'] == level):
+                matched.append(word_id)
+                if len(matched) >= limit:
+                    break
+        return matched
+
+    @classmethod
+    def _fuzzy_ids(cls, term):
+        """
+        拼写容错：通过删除变体召回候选，再用编辑距离校验
+        查询词和索引两侧各删除最多max_distance个字符，可召回编辑距离不超过max_distance的全部单词
+        """
+        if len(term) < 3 or ' ' in term:
+            return []
+        max_distance = 1 if len(term) <= 5 else MAX_DISTANCE
+        candidates = set()
+        for variant in _deletes(term, max_distance):
+            h = zlib.crc32(variant.encode('utf-8'))
+            for key in cls._deletes[_bucket(h << 32)]:
+                if key >> 32 == h:
+                    candidates.add(key & 0xFFFFFFFF)
+
+        scored = []
+        for word_id in candidates:
+            row = cls._rows.get(word_id)
+            if row is None:
+                continue
+            distance = edit_distance(term, (row['word'] or '').lower(), max_distance)
+            if 0 < distance <= max_distance:
+                scored.append((distance, row['word'], word_id))
+        scored.sort()
+        return [word_id for _, _, word_id in scored]
+
+    @classmethod
+    def reset_after_fork(cls):
+        """子进程重新创建锁（含变更日志的读取锁），索引本身随fork共享"""
+        cls._lock = threading.RLock()
+        cls._build_lock = threading.Lock()
+        cls._journal._lock = threading.Lock()
+
+Lifecycle.on_fork(VocabIndex.reset_after_fork)
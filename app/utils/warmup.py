@@ -0,0 +1,155 @@
+import threading
+import time
+from app.config import Config
+from app.utils.db import pool, replicas
+from app.utils.mongo import MongoDB
+import logging
+
+logger = logging.getLogger(__name__)
+
+def open_mysql():
+    """建立连接池连接，首批请求不再等待TCP握手和认证"""
+    connections = []
+    try:
+        for _ in range(min(Config.WARMUP_DB_CONNECTIONS, Config.DB_POOL_SIZE)):
+            connections.append(pool.acquire())
+    finally:
+        for connection in connections:
+            pool.release(connection)
+    return {'connections': len(connections)}
+
+def check_replicas():
+    """建立从库连接并查询复制延迟，首批读取即可使用从库"""
+    if not replicas:
+        return {'replicas': 0}
+    return replicas.check_all()
+
+def ping_mongo():
+    """创建MongoDB客户端（导入驱动、建立连接并ping）"""
+    MongoDB.get_client()
+    return {}
+
+def load_catalog():
+    from app.utils.catalog import Catalog
+    Catalog.ensure_loaded()
+    return {}
+
+def load_answer_keys():
+    from app.utils.catalog import Catalog
+    return {'quizzes': Catalog.preload_answer_keys(Config.WARMUP_QUIZZES)}
+
+def load_vocab_index():
+    from app.utils.vocab_index import VocabIndex
+    VocabIndex.ensure_loaded()
+    return {'words': len(VocabIndex._rows)}
+
+def load_leaderboard():
+    from app.utils.leaderboard import Leaderboard
+    Leaderboard.ensure_loaded()
+    return {}
+
+class Warmup:
+    """
+    启动预热：建立数据库连接、预加载热点数据，完成后进程才标记为就绪
+    各步骤独立计时，失败或超过WARMUP_STEP_TIMEOUT只记录日志（数据在首次访问时再加载）；
+    依赖的步骤失败时跳过，避免数据库不可用时每一步都等到连接超时
+    """
+
+    # 步骤名 -> (函数, 依赖的步骤)
+    STEPS = {
+        'mysql': (open_mysql, None),
+        'replicas': (check_replicas, None),
+        'mongo': (ping_mongo, None),
+        'catalog': (load_catalog, 'mysql'),
+        'answer_keys': (load_answer_keys, 'mysql'),
+        'leaderboard': (load_leaderboard, 'mysql'),
+        'vocab_index': (load_vocab_index, 'mysql'),
+    }
+
+    # 连接不能跨fork使用，gunicorn预加载模式下由每个工作进程重新执行
+    CONNECTION_STEPS = ('mysql', 'replicas', 'mongo')
+
+    _results = {}  # 步骤名 -> {'status', 'ms', ...}
+    _pending = []  # 超时后仍在后台执行的步骤线程
+
+    @classmethod
+    def enabled_steps(cls):
+        steps = [name for name in Config.WARMUP_STEPS if name in cls.STEPS]
+        if not Config.LEADERBOARD_PRELOAD and 'leaderboard' in steps:
+            steps.remove('leaderboard')
+        return steps
+
+    @classmethod
+    def run(cls, steps=None):
+        """
+        按顺序执行预热步骤
+        :param steps: 步骤名列表，默认使用WARMUP_STEPS
+        :return: 本次执行的结果 {步骤名: {'status': 'ok'/'failed'/'timeout'/'skipped', 'ms', ...}}
+        """
+        steps = cls.enabled_steps() if steps is None else steps
+        results = {}
+        start = time.perf_counter()
+        for name in steps:
+            step, requires = cls.STEPS[name]
+            if requires and results.get(requires, {}).get('status') not in (None, 'ok'):
+                results[name] = {'status': 'skipped', 'ms': 0.0}
+                continue
+            step_start = time.perf_counter()
+            result = cls._run_step(name, step)
+            result['ms'] = round((time.perf_counter() - step_start) * 1000, 1)
+            results[name] = result
+
+        total = (time.perf_counter() - start) * 1000
+        summary = ', '.join(f"{name} {result['ms']}ms" + ('' if result['status'] == 'ok' else f"({result['status']})")
+                            for name, result in results.items())
+        failed = {name: result['error'] for name, result in results.items() if 'error' in result}
+        if failed:
+            logger.warning(f"预热部分失败，相关数据将在首次访问时加载: {failed}")
+        logger.info(f"预热完成，耗时 {total:.1f}ms: {summary}")
+
+        cls._results = dict(cls._results, **results)
+        return results
+
+    @classmethod
+    def _run_step(cls, name, step):
+        """在线程中执行单个步骤并限时等待，超时的步骤继续在后台完成（fork前由 wait_pending 等待）"""
+        outcome = {}
+
+        def target():
+            try:
+                outcome.update(step(), status='ok')
+            except Exception as e:
+                outcome.update(status='failed', error=str(e))
+
+        worker = threading.Thread(target=target, name=f'warmup-{name}', daemon=True)
+        worker.start()
+        worker.join(Config.WARMUP_STEP_TIMEOUT)
+        if worker.is_alive():
+            cls._pending.append(worker)
+            return {'status': 'timeout', 'error': f"超过 {Config.WARMUP_STEP_TIMEOUT}s 未完成"}
+        return dict(outcome)
+
+    @classmethod
+    def wait_pending(cls):
+        """
+        等待超时后仍在执行的步骤完成
+        gunicorn主进程fork工作进程前调用：步骤线程可能持有构建锁或连接，带着它们fork会让
+        工作进程继承一把永远不会释放的锁
+        """
+        for worker in cls._pending:
+            if worker.is_alive():
+                logger.info(f"等待预热步骤 {worker.name} 完成后再启动工作进程")
+                worker.join()
+        cls._pending = []
+
+    @classmethod
+    def report(cls):
+        """最近一次各步骤的结果（预加载模式下连接步骤为工作进程自己的结果）"""
+        return cls._results
+
+    @staticmethod
+    def release_connections():
+        """gunicorn主进程预热后关闭连接，不带着连接fork，也不在主进程中保留空闲连接"""
+        pool.close_all()
+        replicas.close_all()
+        MongoDB.close_connection()
@@ -0,0 +1,24 @@
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.exceptions import HTTPException
+from app import create_app
+from app.aio import create_async_app
+
+# 异步模式入口：hypercorn asgi:app
+# 异步应用中存在的路由（路径和方法都匹配）由其处理，其余请求交给同步应用
+async_app = create_async_app()
+sync_app = WsgiToAsgi(create_app())
+_routes = async_app.url_map.bind('localhost')
+
+def _is_async(scope):
+    try:
+        _routes.match(scope['path'], method=scope.get('method', 'GET'))
+        return True
+    except HTTPException:
+        return False
+
+async def app(scope, receive, send):
+    # lifespan事件只交给异步应用，用于创建和关闭连接池
+    if scope['type'] == 'lifespan' or (scope['type'] == 'http' and _is_async(scope)):
+        await async_app(scope, receive, send)
+    else:
+        await sync_app(scope, receive, send)
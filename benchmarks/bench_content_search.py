@@ -0,0 +1,102 @@
+"""
+语法/听力全文检索基准测试
+
+在合成语料上测量索引构建、BM25检索、摘要高亮以及快照读写的耗时
+
+用法:
+    python benchmarks/bench_content_search.py --docs 50000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from itertools import accumulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.search_index import SearchIndex
+from app.utils.text import tokenize, highlight
+
+LEVELS = ['A1', 'A2', 'B1', 'B2', 'C1', 'C2']
+
+def make_vocabulary(size, rng):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return [''.join(rng.choice(letters) for _ in range(rng.randint(2, 10))) for _ in range(size)]
+
+def make_corpus(n_docs, vocabulary, rng, min_len, max_len):
+    # 按齐普夫分布取词，接近真实文本的词频分布
+    cum_weights = list(accumulate(1.0 / (rank + 1) for rank in range(len(vocabulary))))
+    docs = []
+    for i in range(n_docs):
+        length = rng.randint(min_len, max_len)
+        title = ' '.join(rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(2, 6)))
+        body = ' '.join(rng.choices(vocabulary, cum_weights=cum_weights, k=length))
+        docs.append((i, title, body, rng.choice(LEVELS)))
+    return docs
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=50000)
+    parser.add_argument('--vocabulary', type=int, default=20000)
+    parser.add_argument('--min-len', type=int, default=40)
+    parser.add_argument('--max-len', type=int, default=200)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    docs = make_corpus(args.docs, vocabulary, rng, args.min_len, args.max_len)
+
+    index = SearchIndex()
+    start = time.perf_counter()
+    for doc_id, title, body, level in docs:
+        index.add(('grammar', doc_id), title, body, type='grammar', id=doc_id, level=level)
+    build_time = time.perf_counter() - start
+
+    # 查询词取自中低频区间，混合1~3个词
+    query_pool = vocabulary[50:5000]
+    latencies = []
+    snippet_latencies = []
+    for _ in range(args.queries):
+        query = ' '.join(rng.sample(query_pool, rng.randint(1, 3)))
+        start = time.perf_counter()
+        results = index.search(query, limit=20, predicate=lambda d: d['level'] != 'C2')
+        latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        tokens = tokenize(query)
+        for _, _, doc in results:
+            highlight(doc['body'], tokens, 120)
+        snippet_latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    data = index.dumps()
+    dump_time = time.perf_counter() - start
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        f.write(data)
+        path = f.name
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        SearchIndex.loads(f.read())
+    load_time = time.perf_counter() - start
+    os.unlink(path)
+
+    raw_size = sum(len(title) + len(body) for _, title, body, _ in docs)
+    print(f"documents:        {args.docs}")
+    print(f"build:            {build_time:.2f}s")
+    print(f"search p50/p95/p99: {percentile(latencies, 50) * 1000:.2f} / "
+          f"{percentile(latencies, 95) * 1000:.2f} / {percentile(latencies, 99) * 1000:.2f} ms")
+    print(f"snippets p50/p99: {percentile(snippet_latencies, 50) * 1000:.2f} / "
+          f"{percentile(snippet_latencies, 99) * 1000:.2f} ms (20 results)")
+    print(f"snapshot:         {len(data) / 1024 / 1024:.1f} MiB (raw text {raw_size / 1024 / 1024:.1f} MiB)")
+    print(f"dump / load:      {dump_time:.2f}s / {load_time:.2f}s")
+
+if __name__ == '__main__':
+    main()
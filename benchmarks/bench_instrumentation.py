@@ -0,0 +1,207 @@
+"""
+请求级计时开销基准测试
+
+像gunicorn一样直接调用WSGI应用反复请求 /api/learning/vocab（总数来自目录缓存，每次一条SQL），
+MySQL替换为固定延迟的假连接，交替测量开启/关闭计时时的单请求耗时，报告计时
+（游标包装、上下文变量、路由汇总、Server-Timing）带来的开销。
+
+不同的应用实例之间即使配置相同也有几十微秒的差异（内存布局不同），因此两种配置在同一个
+应用实例上切换：关闭时去掉 Metrics 的WSGI中间件并关闭 METRICS_ENABLED（不包装游标），
+与 init_app 未注册时的请求路径相同。两种配置按批成对交替、切换后先预热若干次、测量期间关闭GC，
+开销取各对差值的中位数；在多个应用实例上重复，并以同一实例上两批都关闭计时的差值（A/A对照）
+作为噪声基线。此外用只执行语句的最小WSGI应用直接计时中间件和游标包装，得到每个请求的固定开销和每条语句的开销
+
+用法:
+    python benchmarks/bench_instrumentation.py --requests 20000 --db-latency-us 300
+"""
+import argparse
+import gc
+import os
+import statistics
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('WARMUP_ENABLED', 'false')
+os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+
+import pymysql
+from werkzeug.test import EnvironBuilder
+from app.config import Config
+
+ROWS = [{'word_id': i, 'word': f'word{i}', 'meaning': '释义', 'example': 'An example.', 'level': 'A1'}
+        for i in range(20)]
+
+def spin(seconds):
+    # sleep()的精度在百微秒级，忙等更接近真实的往返延迟
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+class FakeCursor:
+    def __init__(self, latency):
+        self.latency = latency
+        self.rows = []
+        self.rowcount = 0
+        self.description = None
+
+    def execute(self, query, args=None):
+        spin(self.latency)
+        self.rows = [{'level': 'A1', 'total': len(ROWS)}] if 'COUNT(*)' in query else ROWS
+        self.rowcount = len(self.rows)
+        self.description = (('col',),)
+        return self.rowcount
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    open = True
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def cursor(self, cursor_class=None):
+        return FakeCursor(self.latency)
+
+    def begin(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        pass
+
+ENVIRON = EnvironBuilder(path='/api/learning/vocab', query_string='level=A1&per_page=20').get_environ()
+
+def start_response(status, headers, exc_info=None):
+    assert status.startswith('200'), status
+
+def measure(app, n):
+    timings = []
+    for _ in range(n):
+        start = time.perf_counter()
+        body = app(dict(ENVIRON), start_response)
+        b''.join(body)
+        body.close()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+class Toggle:
+    """在同一个应用实例上开启/关闭计时（关闭时去掉 Metrics 的WSGI中间件）"""
+
+    def __init__(self, app):
+        self.app = app
+        self.on = app.wsgi_app
+        self.off = app.wsgi_app.__wrapped__
+
+    def __call__(self, enabled):
+        Config.METRICS_ENABLED = enabled
+        self.app.wsgi_app = self.on if enabled else self.off
+
+def compare(app, toggle, first, second, blocks, block, warmup):
+    """
+    成对交替测量同一应用的两种配置（切换后先执行warmup次请求不计时，实际部署中不会来回切换）
+    :param first, second: 是否开启计时
+    :return: (第一种各批平均耗时, 各对批次差值 second - first)，单位微秒
+    """
+    means = ([], [])
+    gc.disable()
+    try:
+        for i in range(blocks):
+            # 每对批次内的先后顺序交替，抵消先运行的一方被预热/降频影响
+            order = ((1, second), (0, first)) if i % 2 else ((0, first), (1, second))
+            for index, enabled in order:
+                toggle(enabled)
+                gc.collect()
+                measure(app, warmup)
+                means[index].append(statistics.mean(measure(app, block)) * 1e6)
+    finally:
+        gc.enable()
+    return means[0], [b - a for a, b in zip(*means)]
+
+def quartiles(values):
+    return statistics.quantiles(values, n=4)
+
+def measure_hooks(statements, n=100000):
+    """直接计时：一次请求经过计时中间件并执行若干条语句，与不包装游标、不经过中间件时的差值（微秒）"""
+    from app.utils.metrics import Metrics, InstrumentedCursor
+
+    query = 'SELECT word_id, word FROM vocab WHERE level = %s LIMIT %s OFFSET %s'
+
+    def endpoint(cursor):
+        def wsgi_app(environ, start_response):
+            for _ in range(statements):
+                cursor.execute(query, ('A1', 20, 0))
+            start_response('200 OK', [('Content-Type', 'application/json')])
+            return [b'']
+        return wsgi_app
+
+    plain = endpoint(FakeCursor(0))
+    instrumented = Metrics._middleware(endpoint(InstrumentedCursor(FakeCursor(0))))
+    best = {}
+    for name, app in (('plain', plain), ('instrumented', instrumented)):
+        best[name] = min(timeit.repeat(lambda: app(dict(ENVIRON), start_response), number=n, repeat=5)) / n * 1e6
+    return best['instrumented'] - best['plain']
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=20000, help='每种配置的请求数')
+    parser.add_argument('--block', type=int, default=50, help='每批连续请求数，两种配置按批交替')
+    parser.add_argument('--warmup', type=int, default=10, help='每次切换配置后不计时的请求数')
+    parser.add_argument('--apps', type=int, default=4, help='重复测量的应用实例数')
+    parser.add_argument('--db-latency-us', type=int, default=300, help='每条SQL的模拟往返延迟（微秒）')
+    args = parser.parse_args()
+
+    latency = args.db_latency_us / 1e6
+    pymysql.connect = lambda **kwargs: FakeConnection(latency)
+
+    from app import create_app
+
+    blocks = max(1, args.requests // args.block // args.apps)
+    off_means, diffs, control = [], [], []
+    for _ in range(args.apps):
+        # init_app在创建应用时读取开关，游标包装在每次取游标时读取
+        Config.METRICS_ENABLED = True
+        app = create_app()
+        toggle = Toggle(app)
+        for enabled in (True, False):
+            toggle(enabled)
+            measure(app, 500)
+        means, pairs = compare(app, toggle, False, True, blocks, args.block, args.warmup)
+        off_means.extend(means)
+        diffs.extend(pairs)
+        # A/A对照：两批都关闭计时，差值只来自噪声
+        control.extend(compare(app, toggle, False, False, blocks, args.block, args.warmup)[1])
+
+    off = statistics.median(off_means)
+    print(f"请求: {args.apps * blocks * args.block} 次/配置（{args.apps} 个应用实例 × {blocks} 对批次 × "
+          f"{args.block}）, 模拟SQL延迟 {args.db_latency_us}µs × 1 条")
+    print(f"关闭计时批次中位数: {off:.1f}µs/请求")
+    for label, values in (('开启-关闭', diffs), ('A/A对照', control)):
+        q1, q2, q3 = quartiles(values)
+        print(f"{label}: 成对差值中位数 {q2:.1f}µs/请求 ({q2 / off * 100:.2f}%)，"
+              f"四分位 [{q1:.1f}, {q3:.1f}]µs ([{q1 / off * 100:.2f}%, {q3 / off * 100:.2f}%])")
+
+    Config.METRICS_ENABLED = True
+    for statements in (1, 2, 10):
+        cost = measure_hooks(statements)
+        print(f"钩子直接开销（{statements} 条SQL）: {cost:.1f}µs/请求 "
+              f"（占关闭计时批次中位数的 {cost / off * 100:.2f}%）")
+
+if __name__ == '__main__':
+    main()
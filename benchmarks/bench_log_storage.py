@@ -0,0 +1,157 @@
+"""
+活动日志存储与工作集对比：旧格式（完整字段名、昵称、操作类型字符串）与紧凑编码
+
+按接近线上的操作类型比例生成日志，比较
+- 文档BSON大小：WiredTiger缓存中保存的是未压缩的文档，决定热数据（当月集合）占用的内存
+- 索引键大小：三个索引的键值之和（不含索引自身的结构开销），按时间倒序分页时索引需常驻内存
+指定 --mongo 时还会把两种格式分别写入临时集合并读取 collStats（磁盘压缩后大小、索引大小），结束后删除
+
+用法:
+    python benchmarks/bench_log_storage.py --events 200000 --per-day 50000
+    python benchmarks/bench_log_storage.py --events 200000 --mongo mongodb://localhost:27017/bench_logs
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('WARMUP_ENABLED', 'false')
+
+import bson
+from app.models.activity_log import ActivityLog
+
+# 操作类型所占比例
+ACTION_WEIGHTS = {
+    'learning_progress': 55,
+    'quiz_attempt': 20,
+    'user_login': 12,
+    'user_logout': 6,
+    'comment_created': 4,
+    'post_created': 2,
+    'admin_action': 1
+}
+
+LEGACY_INDEXES = [
+    [('user_id', 1), ('timestamp', -1)],
+    [('action_type', 1), ('timestamp', -1)],
+    [('timestamp', -1)]
+]
+
+def make_details(action, rng):
+    if action == 'learning_progress':
+        return {'content_type': rng.choice(['vocab', 'grammar', 'listening']),
+                'content_id': rng.randint(1, 5000),
+                'action': rng.choice(['started', 'completed', 'reviewed'])}
+    if action == 'quiz_attempt':
+        score = rng.randint(0, 100)
+        return {'quiz_id': rng.randint(1, 300), 'quiz_title': f"A{rng.randint(1, 2)}词汇测试 第{rng.randint(1, 50)}套",
+                'score': score, 'accuracy': float(score)}
+    if action == 'user_login':
+        return {'ip_address': f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"}
+    if action == 'post_created':
+        return {'post_id': rng.randint(1, 10 ** 6), 'post_title': '请教一个语法问题', 'category': 'grammar'}
+    if action == 'comment_created':
+        return {'post_id': rng.randint(1, 10 ** 6), 'comment_id': rng.randint(1, 10 ** 7)}
+    if action == 'admin_action':
+        return {'action': 'approve', 'target_type': 'post', 'target_id': rng.randint(1, 10 ** 6)}
+    return {}
+
+def generate(count, users, seed=1):
+    """生成 (旧格式文档, 紧凑文档) 对，两者 _id 相同"""
+    rng = random.Random(seed)
+    nicknames = {user_id: ''.join(rng.choice('小明红刚英语学习者abcdefgh') for _ in range(rng.randint(3, 12)))
+                 for user_id in range(1, users + 1)}
+    actions = rng.choices(list(ACTION_WEIGHTS), weights=list(ACTION_WEIGHTS.values()), k=count)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    for i, action in enumerate(actions):
+        _id = bson.ObjectId()
+        user_id = rng.randint(1, users)
+        timestamp = start + timedelta(seconds=i * 2)
+        details = make_details(action, rng)
+        legacy = {'_id': _id, 'user_id': user_id, 'nickname': nicknames[user_id],
+                  'action_type': action, 'timestamp': timestamp, 'details': details}
+        compact = dict(ActivityLog.encode(user_id, action, timestamp, details), _id=_id)
+        yield legacy, compact
+
+def index_key_bytes(document, indexes):
+    """各索引键值的BSON大小之和（近似索引叶子节点中的键）"""
+    total = 0
+    for keys in indexes:
+        total += len(bson.encode({'': [document[field] for field, _ in keys]})) - 5
+    return total
+
+def measure(count, users):
+    totals = {'legacy': [0, 0], 'compact': [0, 0]}
+    for legacy, compact in generate(count, users):
+        totals['legacy'][0] += len(bson.encode(legacy))
+        totals['legacy'][1] += index_key_bytes(legacy, LEGACY_INDEXES)
+        totals['compact'][0] += len(bson.encode(compact))
+        totals['compact'][1] += index_key_bytes(compact, ActivityLog.INDEXES)
+    return totals
+
+def measure_mongo(uri, count, users):
+    """写入临时集合并读取 collStats"""
+    from pymongo import MongoClient
+    client = MongoClient(uri)
+    database = client.get_database()
+    names = {'legacy': 'bench_activity_logs_legacy', 'compact': 'bench_activity_logs_compact'}
+    try:
+        for name in names.values():
+            database.drop_collection(name)
+        batches = {'legacy': [], 'compact': []}
+        for legacy, compact in generate(count, users):
+            batches['legacy'].append(legacy)
+            batches['compact'].append(compact)
+            if len(batches['legacy']) >= 5000:
+                for kind, batch in batches.items():
+                    database[names[kind]].insert_many(batch, ordered=False)
+                    batch.clear()
+        for kind, batch in batches.items():
+            if batch:
+                database[names[kind]].insert_many(batch, ordered=False)
+        for keys in LEGACY_INDEXES:
+            database[names['legacy']].create_index(keys)
+        ActivityLog.create_indexes(database[names['compact']])
+        return {kind: database.command('collStats', name) for kind, name in names.items()}
+    finally:
+        for name in names.values():
+            database.drop_collection(name)
+        client.close()
+
+def reduction(before, after):
+    return f"{(1 - after / before) * 100:.1f}%" if before else '-'
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--per-day', type=int, default=50000, help='每天的日志数，用于估算当月热数据大小')
+    parser.add_argument('--mongo', help='MongoDB连接串（含数据库名），指定时测量实际存储')
+    args = parser.parse_args()
+
+    totals = measure(args.events, args.users)
+    month = args.per_day * 30
+    print(f"{args.events} 条日志，{args.users} 个用户")
+    print(f"{'':<22}{'旧格式':>12}{'紧凑编码':>12}{'减少':>10}")
+    (legacy_doc, legacy_index), (compact_doc, compact_index) = totals['legacy'], totals['compact']
+    print(f"{'平均文档(B)':<22}{legacy_doc / args.events:>12.1f}{compact_doc / args.events:>12.1f}"
+          f"{reduction(legacy_doc, compact_doc):>10}")
+    print(f"{'平均索引键(B)':<22}{legacy_index / args.events:>12.1f}{compact_index / args.events:>12.1f}"
+          f"{reduction(legacy_index, compact_index):>10}")
+    legacy_month = (legacy_doc + legacy_index) / args.events * month / 2 ** 20
+    compact_month = (compact_doc + compact_index) / args.events * month / 2 ** 20
+    print(f"{'当月工作集(MiB)':<22}{legacy_month:>12.1f}{compact_month:>12.1f}"
+          f"{reduction(legacy_month, compact_month):>10}   （每天 {args.per_day} 条）")
+
+    if args.mongo:
+        stats = measure_mongo(args.mongo, args.events, args.users)
+        print(f"\ncollStats{'':<13}{'旧格式':>12}{'紧凑编码':>12}{'减少':>10}")
+        for field, label in (('size', '数据(未压缩)'), ('storageSize', '数据(磁盘)'),
+                             ('totalIndexSize', '索引')):
+            before, after = stats['legacy'][field] / 2 ** 20, stats['compact'][field] / 2 ** 20
+            print(f"{label + '(MiB)':<22}{before:>12.1f}{after:>12.1f}{reduction(before, after):>10}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+词汇间隔复习（SRS）调度基准测试
+
+一组活跃用户每天学习新词并完成到期复习，对比两种取到期批次的方式：
+按到期时间组织的优先队列（对应 vocab_review 的 (user_id, due_at) 索引）
+与逐词扫描该用户全部状态；同时统计SM-2评分吞吐，
+并按 vocab_review 行宽估算全部用户×全部词汇的存储规模
+
+用法:
+    python benchmarks/bench_srs.py --users 100000 --words 5000
+"""
+import argparse
+import heapq
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.vocab_review import sm2, DEFAULT_EASINESS
+
+# vocab_review 行宽：user_id/word_id INT + easiness/interval SMALLINT
+# + repetitions/lapses TINYINT + due_at DATETIME
+ROW_BYTES = 4 + 4 + 2 + 2 + 1 + 1 + 5
+# InnoDB 行头、事务ID/回滚指针及页填充的近似开销
+ROW_OVERHEAD = 24
+# 二级索引 (user_id, due_at) 叶子节点带主键
+INDEX_BYTES = 4 + 5 + 4 + 4 + 14
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+class SimUser:
+    """单个用户的复习状态：state[word_id] = [easiness, interval, reps, lapses, due_day]"""
+
+    __slots__ = ('state', 'queue', 'next_word', 'memory')
+
+    def __init__(self, rng):
+        self.state = {}
+        self.queue = []       # (due_day, word_id)，可能包含已过期的旧条目
+        self.next_word = 0
+        self.memory = rng.uniform(0.75, 0.95)
+
+    def due_from_queue(self, day, limit):
+        batch = []
+        while self.queue and self.queue[0][0] <= day and len(batch) < limit:
+            due_day, word_id = heapq.heappop(self.queue)
+            # 评分后旧条目作废，以状态中的到期日为准
+            if self.state[word_id][4] == due_day:
+                batch.append(word_id)
+        return batch
+
+    def due_by_scan(self, day, limit):
+        due = [(s[4], word_id) for word_id, s in self.state.items() if s[4] <= day]
+        due.sort()
+        return [word_id for _, word_id in due[:limit]]
+
+def simulate(args, rng):
+    users = [SimUser(rng) for _ in range(args.active)]
+    queue_latencies = []
+    scan_latencies = []
+    grades = 0
+    grade_time = 0.0
+    due_left = 0
+
+    for day in range(args.days):
+        for user in users:
+            # 学习新词：首次学完即一次成功回忆
+            for _ in range(args.new_per_day):
+                if user.next_word >= args.words:
+                    break
+                word_id = user.next_word
+                user.next_word += 1
+                user.state[word_id] = [DEFAULT_EASINESS, 1, 1, 0, day + 1]
+                heapq.heappush(user.queue, (day + 1, word_id))
+
+            start = time.perf_counter()
+            user.due_by_scan(day, args.batch)
+            scan_latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            batch = user.due_from_queue(day, args.batch)
+            queue_latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for word_id in batch:
+                s = user.state[word_id]
+                recall = user.memory + (s[0] - DEFAULT_EASINESS) / 1000
+                quality = rng.choice((4, 5)) if rng.random() < recall else rng.choice((1, 2))
+                s[0], s[1], s[2], s[3] = sm2(s[0], s[1], s[2], s[3], quality)
+                s[4] = day + s[1]
+                heapq.heappush(user.queue, (s[4], word_id))
+            grade_time += time.perf_counter() - start
+            grades += len(batch)
+
+        if day == args.days - 1:
+            due_left = sum(len(u.due_by_scan(day, args.words)) for u in users)
+
+    states = sum(len(u.state) for u in users)
+    return users, states, grades, grade_time, due_left, queue_latencies, scan_latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100000, help='用户总数（用于存储估算）')
+    parser.add_argument('--words', type=int, default=5000, help='词库大小')
+    parser.add_argument('--active', type=int, default=1000, help='逐日模拟的活跃用户数')
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--new-per-day', type=int, default=20)
+    parser.add_argument('--batch', type=int, default=100, help='每天复习批次上限')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    users, states, grades, grade_time, due_left, queue_lat, scan_lat = simulate(args, rng)
+    total_time = time.perf_counter() - start
+
+    intervals = sorted(s[1] for u in users for s in u.state.values())
+    enrolled_ratio = states / (args.active * args.words)
+    full_rows = args.users * args.words
+    projected_rows = int(full_rows * enrolled_ratio)
+    per_row = ROW_BYTES + ROW_OVERHEAD + INDEX_BYTES
+
+    print(f"simulated:        {args.active} active users x {args.days} days, {args.words} words")
+    print(f"review states:    {states} ({enrolled_ratio:.0%} of user x word matrix)")
+    print(f"grades:           {grades} in {grade_time:.2f}s ({grades / max(grade_time, 1e-9):,.0f}/s), "
+          f"total run {total_time:.1f}s")
+    print(f"due batch queue p50/p99: {percentile(queue_lat, 50) * 1e6:.1f} / {percentile(queue_lat, 99) * 1e6:.1f} us")
+    print(f"due batch scan  p50/p99: {percentile(scan_lat, 50) * 1e6:.1f} / {percentile(scan_lat, 99) * 1e6:.1f} us")
+    print(f"backlog at end:   {due_left / args.active:.1f} due words per user")
+    print(f"interval p50/p90: {percentile(intervals, 50)} / {percentile(intervals, 90)} days")
+    print(f"storage ({args.users} users): ~{per_row} B/row, "
+          f"{projected_rows * per_row / 1024 ** 3:.2f} GiB at current enrollment, "
+          f"{full_rows * per_row / 1024 ** 3:.2f} GiB if every user enrolls every word")
+
+if __name__ == '__main__':
+    main()
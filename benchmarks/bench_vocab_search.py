@@ -0,0 +1,134 @@
+"""
+词汇检索基准测试
+
+在合成词表上测量 VocabIndex 的构建、前缀/全文/容错检索耗时、单个词汇的增量更新耗时，
+以及另一线程持续更新词汇（管理端编辑或回放其他worker的变更）时检索的尾延迟
+MySQL由返回合成词表的假游标代替，变更日志写入临时目录
+
+用法:
+    python benchmarks/bench_vocab_search.py --words 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('WARMUP_ENABLED', 'false')
+os.environ.setdefault('SEARCH_INDEX_DIR', tempfile.mkdtemp(prefix='bench_vocab_'))
+os.environ.setdefault('SEARCH_INDEX_REFRESH', '0')
+
+import app.utils.vocab_index as vocab_index
+from app.utils.vocab_index import VocabIndex
+
+LEVELS = ['A1', 'A2', 'B1', 'B2', 'C1', 'C2']
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+
+def make_word(rng):
+    return ''.join(rng.choice(LETTERS) for _ in range(rng.randint(3, 12)))
+
+def make_rows(count, rng):
+    gloss = [make_word(rng) for _ in range(5000)]
+    return [{'word_id': i, 'word': make_word(rng), 'meaning': ' '.join(rng.sample(gloss, 3)),
+             'example': ' '.join(rng.sample(gloss, 8)), 'level': rng.choice(LEVELS)}
+            for i in range(1, count + 1)]
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, query, args=None):
+        self.result = [self.rows[i - 1] for i in args] if args else self.rows
+
+    def fetchall(self):
+        return self.result
+
+def patch_database(rows):
+    @contextmanager
+    def get_db_cursor(commit=True, primary=False):
+        yield FakeCursor(rows)
+    vocab_index.get_db_cursor = get_db_cursor
+
+def typo(word, rng):
+    """随机替换/删除/插入一个字符"""
+    i = rng.randrange(len(word))
+    op = rng.choice('sdi')
+    if op == 's':
+        return word[:i] + rng.choice(LETTERS) + word[i + 1:]
+    if op == 'd':
+        return word[:i] + word[i + 1:]
+    return word[:i] + rng.choice(LETTERS) + word[i:]
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def fmt(values):
+    return (f"{percentile(values, 50) * 1000:.3f} / {percentile(values, 95) * 1000:.3f} / "
+            f"{percentile(values, 99) * 1000:.3f} ms")
+
+def timed_searches(queries, fuzzy):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        VocabIndex.search(query, limit=20, fuzzy=fuzzy)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--words', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--updates', type=int, default=500)
+    parser.add_argument('--replay-interval', type=float, default=0.01, help='回放变更的间隔（秒）')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rows = make_rows(args.words, rng)
+    patch_database(rows)
+
+    start = time.perf_counter()
+    VocabIndex.rebuild()
+    build_time = time.perf_counter() - start
+
+    sample = rng.sample(rows, min(args.queries, len(rows)))
+    prefix = timed_searches([row['word'][:3] for row in sample], False)
+    text = timed_searches([row['meaning'].split()[0] for row in sample], False)
+    fuzzy = timed_searches([typo(row['word'], rng) for row in sample], True)
+
+    updates = []
+    for row in rng.sample(rows, args.updates):
+        changed = dict(row, word=make_word(rng))
+        start = time.perf_counter()
+        VocabIndex.upsert(changed)
+        updates.append(time.perf_counter() - start)
+        rows[row['word_id'] - 1] = changed
+
+    # 另一线程每隔 --replay-interval 回放一批变更时的检索延迟
+    stop = threading.Event()
+
+    def writer():
+        while not stop.wait(args.replay_interval):
+            VocabIndex._reload([rng.randint(1, args.words) for _ in range(5)])
+
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+    contended = timed_searches([typo(row['word'], rng) for row in sample], True)
+    stop.set()
+    thread.join()
+
+    print(f"words:                   {args.words}")
+    print(f"build:                   {build_time:.2f}s")
+    print(f"prefix p50/p95/p99:      {fmt(prefix)}")
+    print(f"text p50/p95/p99:        {fmt(text)}")
+    print(f"fuzzy p50/p95/p99:       {fmt(fuzzy)}")
+    print(f"upsert p50/p95/p99:      {fmt(updates)} (incl. journal append)")
+    print(f"fuzzy during replay:     {fmt(contended)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+对比两次压测结果
+
+逐流程列出 p50/p95/p99 与吞吐的变化，延迟升高或吞吐下降超过阈值的标为退化，
+存在退化时以状态码1退出，可直接用于CI
+
+用法:
+    python benchmarks/loadtest/compare.py baselines/abc1234.json baselines/def5678.json
+    python benchmarks/loadtest/compare.py old.json new.json --threshold 15
+"""
+import argparse
+import json
+import sys
+
+METRICS = [('p50_ms', False), ('p95_ms', False), ('p99_ms', False), ('throughput_rps', True)]
+
+def change(old, new):
+    if not old:
+        return 0.0
+    return (new - old) / old * 100
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10, help='视为退化的变化百分比')
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(args.candidate, encoding='utf-8') as f:
+        new = json.load(f)
+
+    for key in ('concurrency', 'duration_s', 'mix'):
+        if old['meta'].get(key) != new['meta'].get(key):
+            print(f"注意: 两次压测的 {key} 不同（{old['meta'].get(key)} → {new['meta'].get(key)}）")
+    if old['meta'].get('dataset') != new['meta'].get('dataset'):
+        print("注意: 两次压测的数据规模不同")
+
+    print(f"{old['meta']['commit']} → {new['meta']['commit']}，阈值 ±{args.threshold:.0f}%\n")
+    header = f"{'流程':<20}" + ''.join(f"{name:>24}" for name, _ in METRICS)
+    print(header)
+
+    regressions = []
+    rows = [(name, old['flows'][name], new['flows'][name]) for name in new['flows'] if name in old['flows']]
+    rows.append(('总计', old['overall'], new['overall']))
+    for name, before, after in rows:
+        cells = []
+        for metric, higher_is_better in METRICS:
+            pct = change(before[metric], after[metric])
+            worse = -pct if higher_is_better else pct
+            mark = ' !' if worse > args.threshold else '  '
+            if worse > args.threshold:
+                regressions.append(f"{name}.{metric} {before[metric]} → {after[metric]} ({pct:+.1f}%)")
+            cells.append(f"{before[metric]:.1f}→{after[metric]:.1f} ({pct:+.0f}%){mark}".rjust(24))
+        errors = ''
+        if after['errors'] > before['errors']:
+            errors = f"  错误 {before['errors']} → {after['errors']}"
+            regressions.append(f"{name} 错误数 {before['errors']} → {after['errors']}")
+        print(f"{name:<20}" + ''.join(cells) + errors)
+
+    if regressions:
+        print("\n退化:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\n未发现超过阈值的退化")
+
+if __name__ == '__main__':
+    main()
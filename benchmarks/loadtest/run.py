@@ -0,0 +1,284 @@
+"""
+接口压测
+
+以固定并发（闭环：每个虚拟用户收到响应后立即发下一个请求）按权重混合驱动主要流程，
+统计各流程的 p50/p95/p99、吞吐和错误数，结果保存为JSON基线，
+用 compare.py 对比两次提交之间的差异
+
+被测服务需连接 seed.py 生成的数据并关闭限流，例如:
+    set -a; . benchmarks/loadtest/bench.env; set +a
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+用法:
+    python benchmarks/loadtest/run.py --concurrency 32 --duration 60
+    python benchmarks/loadtest/run.py --mix vocab=1,feed=1 --output /tmp/feed.json
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+BASELINE_DIR = os.path.join(HERE, 'baselines')
+
+# 流程权重：按学习端的真实访问比例粗略设定，管理端与日志查询占少数
+DEFAULT_MIX = ('login=2,vocab=30,quiz_fetch=15,quiz_submit=8,feed=25,'
+               'admin_stats=2,quiz_performance=1,my_logs=12,log_stats=2,recent_activities=3')
+
+class Client:
+    """单个虚拟用户的keep-alive连接"""
+
+    def __init__(self, base_url, timeout):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.timeout = timeout
+        self.conn = None
+
+    def request(self, method, path, body=None, token=None):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        payload = json.dumps(body) if body is not None else None
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request(method, path, payload, headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                return response.status, data
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # 服务端关闭了空闲连接，重连一次
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+def login(client, email, password):
+    status, data = client.request('POST', '/api/auth/login', {'email': email, 'password': password})
+    if status != 200:
+        raise RuntimeError(f"登录 {email} 失败: {status} {data[:200]!r}")
+    return json.loads(data)['data']
+
+class VirtualUser:
+    """一个虚拟用户：持有自己的登录态，按权重选择流程"""
+
+    def __init__(self, args, dataset, admin_token, rng):
+        self.client = Client(args.base_url, args.timeout)
+        self.dataset = dataset
+        self.admin_token = admin_token
+        self.rng = rng
+        self.user_id = rng.randint(2, dataset['users'])
+        self.email = dataset['user_email'].format(self.user_id)
+        self.token = login(self.client, self.email, dataset['password'])['token']
+        self.questions = {}  # quiz_id -> [question_id]
+
+    def quiz_id(self):
+        # 少数测验被频繁访问
+        return min(self.dataset['quizzes'], int(self.rng.paretovariate(1.0)))
+
+    def login(self):
+        return self.client.request('POST', '/api/auth/login',
+                                   {'email': self.email, 'password': self.dataset['password']})
+
+    def vocab(self):
+        level = self.rng.choice(self.dataset['levels'])
+        pages = max(1, self.dataset['vocab_per_level'] // 20)
+        page = min(pages, int(self.rng.paretovariate(1.2)))
+        return self.client.request('GET', f'/api/learning/vocab?level={level}&page={page}&per_page=20')
+
+    def quiz_fetch(self, quiz_id=None):
+        quiz_id = quiz_id or self.quiz_id()
+        status, data = self.client.request('GET', f'/api/quiz/{quiz_id}/questions')
+        if status == 200:
+            self.questions[quiz_id] = [q['question_id'] for q in json.loads(data)['data']['questions']]
+        return status, data
+
+    def quiz_submit(self):
+        quiz_id = self.quiz_id()
+        if quiz_id not in self.questions:
+            status, data = self.quiz_fetch(quiz_id)
+            if status != 200:
+                return status, data
+        answers = {str(q): self.rng.choice('ABCD') for q in self.questions[quiz_id]}
+        return self.client.request('POST', f'/api/quiz/{quiz_id}/submit',
+                                   {'user_id': self.user_id, 'answers': answers})
+
+    def feed(self):
+        page = min(50, int(self.rng.paretovariate(1.5)))
+        return self.client.request('GET', f'/api/community/posts?page={page}&per_page=20')
+
+    def admin_stats(self):
+        return self.client.request('GET', '/api/admin/statistics', token=self.admin_token)
+
+    def quiz_performance(self):
+        return self.client.request('GET', '/api/admin/statistics/quiz-performance', token=self.admin_token)
+
+    def my_logs(self):
+        page = min(10, int(self.rng.paretovariate(2.0)))
+        return self.client.request('GET', f'/api/logs/my-logs?page={page}&per_page=20', token=self.token)
+
+    def log_stats(self):
+        return self.client.request('GET', '/api/logs/statistics', token=self.admin_token)
+
+    def recent_activities(self):
+        return self.client.request('GET', '/api/logs/recent-activities?limit=20', token=self.token)
+
+FLOWS = ['login', 'vocab', 'quiz_fetch', 'quiz_submit', 'feed', 'admin_stats',
+         'quiz_performance', 'my_logs', 'log_stats', 'recent_activities']
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in FLOWS:
+            sys.exit(f"未知流程 {name}，可选: {', '.join(FLOWS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else 0.0
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--concurrency', type=int, default=32, help='虚拟用户数')
+    parser.add_argument('--duration', type=float, default=60, help='计入统计的压测时长（秒）')
+    parser.add_argument('--warmup', type=float, default=10, help='预热时长（秒），不计入统计')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='流程=权重，逗号分隔')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--dataset', default=os.path.join(HERE, 'dataset.json'))
+    parser.add_argument('--output', help='结果文件，默认 baselines/<提交>.json')
+    parser.add_argument('--label', default='', help='写入结果的备注')
+    args = parser.parse_args()
+
+    with open(args.dataset, encoding='utf-8') as f:
+        dataset = json.load(f)
+    mix = parse_mix(args.mix)
+    names, weights = list(mix), list(mix.values())
+
+    probe = Client(args.base_url, args.timeout)
+    status, data = probe.request('GET', '/health/ready')
+    if status != 200:
+        sys.exit(f"服务未就绪: {status} {data[:300]!r}")
+    admin_token = login(probe, dataset['admin_email'], dataset['password'])['token']
+
+    print(f"登录 {args.concurrency} 个虚拟用户...")
+    users = [VirtualUser(args, dataset, admin_token, random.Random(args.seed * 1000 + i))
+             for i in range(args.concurrency)]
+
+    lock = threading.Lock()
+    results = {name: ([], [0]) for name in names}
+    errors_sample = []
+    measuring = threading.Event()
+    stop = threading.Event()
+
+    def worker(user):
+        local = {name: ([], [0]) for name in names}
+        while not stop.is_set():
+            name = user.rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                status, data = getattr(user, name)()
+                failed = status >= 400
+            except Exception as e:
+                status, data, failed = None, repr(e).encode(), True
+            elapsed = time.perf_counter() - start
+            if not measuring.is_set():
+                continue
+            latencies, errors = local[name]
+            latencies.append(elapsed)
+            if failed:
+                errors[0] += 1
+                if len(errors_sample) < 20:
+                    errors_sample.append({'flow': name, 'status': status, 'body': data[:200].decode('utf-8', 'replace')})
+        with lock:
+            for name, (latencies, errors) in local.items():
+                results[name][0].extend(latencies)
+                results[name][1][0] += errors[0]
+
+    threads = [threading.Thread(target=worker, args=(user,), daemon=True) for user in users]
+    for thread in threads:
+        thread.start()
+    print(f"预热 {args.warmup:.0f}s...")
+    time.sleep(args.warmup)
+    measuring.set()
+    started = time.perf_counter()
+    print(f"压测 {args.duration:.0f}s，并发 {args.concurrency}...")
+    time.sleep(args.duration)
+    stop.set()
+    elapsed = time.perf_counter() - started
+    for thread in threads:
+        thread.join(args.timeout)
+
+    flows = {name: summarize(latencies, errors[0], elapsed) for name, (latencies, errors) in results.items()}
+    overall = summarize([x for latencies, _ in results.values() for x in latencies],
+                        sum(errors[0] for _, errors in results.values()), elapsed)
+
+    commit = git_commit()
+    report = {
+        'meta': {
+            'commit': commit,
+            'label': args.label,
+            'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'base_url': args.base_url,
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'warmup_s': args.warmup,
+            'mix': mix,
+            'dataset': dataset,
+            'host': {'python': platform.python_version(), 'platform': platform.platform(),
+                     'cpus': os.cpu_count()}
+        },
+        'overall': overall,
+        'flows': flows,
+        'error_samples': errors_sample
+    }
+
+    output = args.output or os.path.join(BASELINE_DIR, f'{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print(f"\n{'流程':<20}{'请求数':>8}{'错误':>6}{'吞吐/s':>9}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+    for name, stats in list(flows.items()) + [('总计', overall)]:
+        print(f"{name:<20}{stats['requests']:>8}{stats['errors']:>6}{stats['throughput_rps']:>9.1f}"
+              f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+    print(f"\n结果已保存到 {output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+从 数据库.md 建表
+
+依次执行文档中的全部 ```sql 代码块（建表、索引、存储函数），
+压测库的表结构因此始终与文档一致；MongoDB集合与索引由 seed.py 创建
+
+用法:
+    python benchmarks/loadtest/schema.py [--drop]
+"""
+import argparse
+import os
+import re
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+import pymysql
+from app.config import Config
+
+SCHEMA_DOC = os.path.join(ROOT, '数据库.md')
+
+def sql_blocks(path=SCHEMA_DOC):
+    with open(path, encoding='utf-8') as f:
+        return re.findall(r'```sql\n(.*?)```', f.read(), re.S)
+
+def split_statements(block):
+    """按分号拆分语句，支持 DELIMITER 切换（存储函数）"""
+    statements = []
+    delimiter = ';'
+    buffer = []
+    for line in block.splitlines():
+        stripped = line.strip()
+        if stripped.upper().startswith('DELIMITER'):
+            delimiter = stripped.split()[1]
+            continue
+        if not buffer and (not stripped or stripped.startswith('--')):
+            continue
+        buffer.append(line)
+        if stripped.endswith(delimiter):
+            statement = '\n'.join(buffer).strip()
+            statements.append(statement[:-len(delimiter)].strip())
+            buffer = []
+    if ''.join(buffer).strip():
+        statements.append('\n'.join(buffer).strip())
+    return statements
+
+def table_names(statements):
+    return [m.group(1) for s in statements for m in [re.search(r'CREATE TABLE\s+(\w+)', s)] if m]
+
+def apply_schema(drop=False):
+    statements = [s for block in sql_blocks() for s in split_statements(block)]
+    config = dict(Config.DB_CONFIG)
+    database = config.pop('database')
+    connection = pymysql.connect(**config, autocommit=True)
+    try:
+        with connection.cursor() as cursor:
+            if drop:
+                cursor.execute(f"DROP DATABASE IF EXISTS `{database}`")
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database}` DEFAULT CHARSET utf8mb4")
+            cursor.execute(f"USE `{database}`")
+            cursor.execute("SHOW TABLES")
+            if cursor.fetchall():
+                print(f"数据库 {database} 已有表，跳过建表（使用 --drop 重建）")
+                return
+            for statement in statements:
+                cursor.execute(statement)
+        print(f"已在 {database} 中创建 {len(table_names(statements))} 张表，执行 {len(statements)} 条语句")
+    finally:
+        connection.close()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--drop', action='store_true', help='删除并重建数据库')
+    args = parser.parse_args()
+    apply_schema(args.drop)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""
+压测数据生成
+
+按规模生成用户、各CEFR等级词汇、语法/听力、测验与题目、测验成绩、
+帖子与评论，以及MongoDB活动日志；随机数种子固定，同一参数生成的数据相同。
+用户ID 1 为管理员，全部账号密码相同，账号信息写入 dataset.json 供 run.py 使用
+
+用法:
+    python benchmarks/loadtest/schema.py --drop
+    python benchmarks/loadtest/seed.py --scale medium
+    python benchmarks/loadtest/seed.py --scale small --logs 5000000 --reset
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(HERE)))
+
+import pymysql
+from pymongo import MongoClient
+from app.config import Config
+from app.models.activity_log import ActivityLog
+
+LEVELS = ['A1', 'A2', 'B1', 'B2', 'C1', 'C2']
+QUIZ_TYPES = ['vocab', 'grammar', 'listening']
+PASSWORD = 'bench-password'
+ADMIN_EMAIL = 'admin@bench.local'
+DATASET_FILE = os.path.join(HERE, 'dataset.json')
+
+# 各规模的默认数量，可被同名参数单独覆盖
+SCALES = {
+    'small': dict(users=1000, vocab_per_level=500, lessons_per_level=50, quizzes=50, questions=20,
+                  results=20000, posts=5000, comments=20000, logs=200000),
+    'medium': dict(users=10000, vocab_per_level=2000, lessons_per_level=200, quizzes=200, questions=20,
+                   results=200000, posts=50000, comments=200000, logs=2000000),
+    'large': dict(users=100000, vocab_per_level=5000, lessons_per_level=500, quizzes=500, questions=25,
+                  results=2000000, posts=500000, comments=2000000, logs=20000000),
+}
+
+# 活动日志的操作类型分布
+LOG_ACTIONS = [('learning_progress', 55), ('quiz_attempt', 20), ('user_login', 15),
+               ('comment_created', 5), ('post_created', 3), ('user_logout', 2)]
+
+CHUNK = 5000
+
+def hash_password(password, salt):
+    """与存储函数 hash_password 相同：UPPER(SHA2(CONCAT(plain, salt), 256))"""
+    return hashlib.sha256((password + salt).encode()).hexdigest().upper()
+
+def chunks(rows, size=CHUNK):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def insert(cursor, connection, sql, rows, label):
+    start = time.perf_counter()
+    count = 0
+    for batch in chunks(rows):
+        cursor.executemany(sql, batch)
+        connection.commit()
+        count += len(batch)
+    print(f"  {label:<14}{count:>12,} 行  {time.perf_counter() - start:6.1f}s")
+    return count
+
+def random_time(rng, now, days):
+    return now - timedelta(seconds=rng.randint(0, days * 86400))
+
+def words(rng, n):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return ' '.join(''.join(rng.choice(letters) for _ in range(rng.randint(2, 9))) for _ in range(n))
+
+def reset(cursor, connection):
+    cursor.execute("SHOW TABLES")
+    tables = [list(row.values())[0] for row in cursor.fetchall()]
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    for table in tables:
+        cursor.execute(f"TRUNCATE TABLE `{table}`")
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+    connection.commit()
+
+def seed_mysql(args, rng):
+    now = datetime.now()
+    connection = pymysql.connect(**Config.DB_CONFIG, cursorclass=pymysql.cursors.DictCursor)
+    try:
+        with connection.cursor() as cursor:
+            if args.reset:
+                reset(cursor, connection)
+            cursor.execute("SELECT COUNT(*) AS n FROM user_auth")
+            if cursor.fetchone()['n']:
+                sys.exit("user_auth 已有数据，使用 --reset 清空后再生成（ID需从1开始）")
+
+            print("MySQL:")
+            users = []
+            for user_id in range(1, args.users + 1):
+                salt = '%016x' % rng.getrandbits(64)
+                email = ADMIN_EMAIL if user_id == 1 else f'user{user_id}@bench.local'
+                users.append((email, hash_password(PASSWORD, salt), salt, random_time(rng, now, args.days)))
+            insert(cursor, connection, """
+                INSERT INTO user_auth (email, pwd_hash, salt, created_at) VALUES (%s, %s, %s, %s)
+            """, users, 'user_auth')
+            insert(cursor, connection, """
+                INSERT INTO user_profile (user_id, nickname, role) VALUES (%s, %s, %s)
+            """, ((user_id, f'learner{user_id}', 'admin' if user_id == 1 else 'student')
+                  for user_id in range(1, args.users + 1)), 'user_profile')
+            insert(cursor, connection, """
+                INSERT INTO progress (user_id, vocab_learned, grammar_learned, listening_done, last_update)
+                VALUES (%s, %s, %s, %s, %s)
+            """, ((user_id, rng.randint(0, 800), rng.randint(0, 60), rng.randint(0, 80),
+                   random_time(rng, now, 30)) for user_id in range(1, args.users + 1)), 'progress')
+
+            insert(cursor, connection, """
+                INSERT INTO vocab (word, meaning, example, level) VALUES (%s, %s, %s, %s)
+            """, ((words(rng, 1), words(rng, 3), words(rng, 8), level)
+                  for level in LEVELS for _ in range(args.vocab_per_level)), 'vocab')
+            insert(cursor, connection, """
+                INSERT INTO grammar (title, content, level) VALUES (%s, %s, %s)
+            """, ((words(rng, 4), words(rng, 300), level)
+                  for level in LEVELS for _ in range(args.lessons_per_level)), 'grammar')
+            insert(cursor, connection, """
+                INSERT INTO listening (title, audio_url, transcript, level) VALUES (%s, %s, %s, %s)
+            """, ((words(rng, 4), f'https://cdn.bench.local/audio/{i}.mp3', words(rng, 200), level)
+                  for i, level in enumerate(level for level in LEVELS for _ in range(args.lessons_per_level))),
+                'listening')
+
+            insert(cursor, connection, """
+                INSERT INTO quiz (quiz_type, title) VALUES (%s, %s)
+            """, ((QUIZ_TYPES[i % 3], f'{LEVELS[i % 6]} {QUIZ_TYPES[i % 3]} quiz {i + 1}')
+                  for i in range(args.quizzes)), 'quiz')
+            insert(cursor, connection, """
+                INSERT INTO quiz_question (quiz_id, question, option_a, option_b, option_c, option_d, correct_opt, score)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """, ((quiz_id, words(rng, 10), words(rng, 2), words(rng, 2), words(rng, 2), words(rng, 2),
+                   rng.choice('ABCD'), 5)
+                  for quiz_id in range(1, args.quizzes + 1) for _ in range(args.questions)), 'quiz_question')
+
+            def results():
+                for _ in range(args.results):
+                    correct = rng.randint(0, args.questions)
+                    yield (rng.randint(1, args.users), rng.randint(1, args.quizzes), correct * 5,
+                           correct, args.questions, random_time(rng, now, args.days))
+            insert(cursor, connection, """
+                INSERT INTO quiz_result (user_id, quiz_id, score, correct_cnt, total_cnt, taken_at)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, results(), 'quiz_result')
+
+            def posts():
+                for _ in range(args.posts):
+                    status = rng.choices(['approved', 'pending', 'rejected'], [85, 10, 5])[0]
+                    yield (rng.randint(1, args.users), words(rng, 6), words(rng, rng.randint(20, 200)),
+                           rng.choice(['general', 'question']), status, random_time(rng, now, args.days))
+            insert(cursor, connection, """
+                INSERT INTO post (user_id, title, content, category, status, created_at)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, posts(), 'post')
+            # 评论集中在少数热门帖子上
+            insert(cursor, connection, """
+                INSERT INTO comment (post_id, user_id, content, created_at) VALUES (%s, %s, %s, %s)
+            """, ((min(args.posts, int(rng.paretovariate(1.2))), rng.randint(1, args.users),
+                   words(rng, rng.randint(3, 40)), random_time(rng, now, args.days))
+                  for _ in range(args.comments)), 'comment')
+    finally:
+        connection.close()
+
+def log_details(rng, action, args):
+    if action == 'learning_progress':
+        content_type = rng.choice(QUIZ_TYPES)
+        return {'content_type': content_type, 'content_id': rng.randint(1, args.vocab_per_level * 6),
+                'action': rng.choice(['started', 'completed', 'reviewed'])}
+    if action == 'quiz_attempt':
+        correct = rng.randint(0, args.questions)
+        quiz_id = rng.randint(1, args.quizzes)
+        return {'quiz_id': quiz_id, 'quiz_title': f'quiz {quiz_id}', 'score': correct * 5,
+                'accuracy': round(correct / args.questions * 100, 2)}
+    if action == 'user_login':
+        return {'ip_address': f'10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}'}
+    if action == 'post_created':
+        return {'post_id': rng.randint(1, args.posts), 'post_title': words(rng, 4), 'category': 'general'}
+    if action == 'comment_created':
+        return {'post_id': rng.randint(1, args.posts), 'comment_id': rng.randint(1, args.comments)}
+    return {}
+
+def seed_mongo(args, rng):
+    client = MongoClient(Config.MONGO_URI)
+    try:
+        database = client.get_database()
+        # 与应用写入相同：按UTC月份分集合、紧凑编码，集合与索引由 ActivityLog.ensure_partition 创建
+        existing = [name for name in database.list_collection_names()
+                    if name == ActivityLog.COLLECTION_NAME or ActivityLog.partition_month(name) is not None]
+        if args.reset:
+            for name in existing:
+                database.drop_collection(name)
+            ActivityLog._ensured.clear()
+        elif any(database[name].estimated_document_count() for name in existing):
+            sys.exit("activity_logs 已有数据，使用 --reset 清空后再生成")
+
+        print("MongoDB:")
+        start = time.perf_counter()
+        now = datetime.now(timezone.utc)
+        actions, weights = zip(*LOG_ACTIONS)
+        counts = {}
+
+        def documents():
+            for _ in range(args.logs):
+                user_id = rng.randint(1, args.users)
+                action = rng.choices(actions, weights)[0]
+                timestamp = random_time(rng, now, args.days)
+                yield ActivityLog.partition_for(timestamp), ActivityLog.encode(
+                    user_id, action, timestamp, log_details(rng, action, args))
+
+        for batch in chunks(documents(), 10000):
+            partitions = {}
+            for name, document in batch:
+                partitions.setdefault(name, []).append(document)
+            for name, rows in partitions.items():
+                ActivityLog.ensure_partition(name, database)
+                database[name].insert_many(rows, ordered=False)
+                counts[name] = counts.get(name, 0) + len(rows)
+        elapsed = time.perf_counter() - start
+        for name in sorted(counts):
+            print(f"  {name:<22}{counts[name]:>12,} 条")
+        print(f"  {'activity_logs':<22}{sum(counts.values()):>12,} 条  {elapsed:6.1f}s")
+    finally:
+        client.close()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    for name in SCALES['small']:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, help=f'覆盖规模中的 {name}')
+    parser.add_argument('--days', type=int, default=180, help='数据的时间跨度（天）')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset', action='store_true', help='清空已有数据')
+    parser.add_argument('--skip-mongo', action='store_true')
+    args = parser.parse_args()
+    for name, value in SCALES[args.scale].items():
+        if getattr(args, name) is None:
+            setattr(args, name, value)
+
+    rng = random.Random(args.seed)
+    seed_mysql(args, rng)
+    if not args.skip_mongo:
+        seed_mongo(args, rng)
+
+    dataset = {name: getattr(args, name) for name in SCALES['small']}
+    dataset.update(scale=args.scale, seed=args.seed, days=args.days, levels=LEVELS,
+                   admin_email=ADMIN_EMAIL, user_email='user{}@bench.local', password=PASSWORD)
+    with open(DATASET_FILE, 'w', encoding='utf-8') as f:
+        json.dump(dataset, f, indent=2)
+    print(f"数据规模已写入 {DATASET_FILE}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+工作进程冷启动耗时
+
+在全新的解释器中执行 `from app import create_app; create_app()`，重复多次取中位数，
+并用 -X importtime 按包统计导入耗时。自动扩容时新实例从进程启动到可以处理请求
+的时间主要由这一段决定（gunicorn preload 模式下由主进程承担，fork出的工作进程不再导入）
+
+不连接数据库：关闭启动预热（WARMUP_ENABLED=false），只测量导入和应用构建；预热耗时见启动日志
+
+用法:
+    python benchmarks/startup/profile_startup.py               # 输出耗时和导入最慢的包
+    python benchmarks/startup/profile_startup.py --save        # 更新 importtime_baseline.txt 和 baseline.json
+    python benchmarks/startup/profile_startup.py --check       # 超过目标或加载了延迟导入的驱动时返回1
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+BASELINE = os.path.join(HERE, 'baseline.json')
+IMPORTTIME_BASELINE = os.path.join(HERE, 'importtime_baseline.txt')
+
+# create_app() 完成（含导入）的目标耗时，单位毫秒
+DEFAULT_TARGET_MS = 350
+
+# 启动时不应加载的模块：只在首次使用时导入
+LAZY_MODULES = ('pymongo', 'bson', 'motor')
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+from app import create_app
+create_app()
+elapsed = (time.perf_counter() - start) * 1000
+lazy = sorted(name for name in %r if name in sys.modules)
+print(json.dumps({'create_app_ms': elapsed, 'lazy_loaded': lazy}))
+""" % (LAZY_MODULES,)
+
+def run_once():
+    env = dict(os.environ, PYTHONPATH=ROOT, WARMUP_ENABLED='false')
+    started = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE],
+                             cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    result = json.loads(started.stdout.strip().splitlines()[-1])
+    return result, started.stderr
+
+def parse_importtime(output):
+    """
+    解析 -X importtime 输出
+    :return: [(模块, 自身耗时us, 累计耗时us)]
+    """
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+def by_package(rows):
+    """按顶层包汇总自身耗时（不含其导入的其他包，各包之和等于总导入耗时）"""
+    totals = {}
+    for name, self_us, _ in rows:
+        package = name.split('.')[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--top', type=int, default=15, help='输出导入耗时最多的包数')
+    parser.add_argument('--target-ms', type=float,
+                        default=float(os.getenv('STARTUP_TARGET_MS', DEFAULT_TARGET_MS)))
+    parser.add_argument('--save', action='store_true', help='写入基线文件')
+    parser.add_argument('--check', action='store_true', help='未达标时以状态码1退出')
+    args = parser.parse_args()
+
+    # 第一次运行用于生成字节码缓存，不计入统计
+    run_once()
+    runs = [run_once() for _ in range(args.runs)]
+    timings = [result['create_app_ms'] for result, _ in runs]
+    median = statistics.median(timings)
+    # 取耗时最接近中位数的一次作为导入明细
+    result, importtime = min(runs, key=lambda run: abs(run[0]['create_app_ms'] - median))
+    packages = by_package(parse_importtime(importtime))
+
+    print(f"create_app: 中位数 {median:.1f}ms  最小 {min(timings):.1f}ms  最大 {max(timings):.1f}ms"
+          f"  （目标 {args.target_ms:.0f}ms）")
+    print(f"{'包':<28}{'导入(ms)':>10}")
+    for name, us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{name:<28}{us / 1000:>10.1f}")
+    if result['lazy_loaded']:
+        print(f"启动时加载了应延迟导入的模块: {', '.join(result['lazy_loaded'])}")
+
+    if args.save:
+        with open(IMPORTTIME_BASELINE, 'w') as f:
+            f.write(importtime)
+        with open(BASELINE, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'runs': args.runs,
+                'create_app_ms': {'median': round(median, 1), 'min': round(min(timings), 1),
+                                  'max': round(max(timings), 1)},
+                'packages_ms': {name: round(us / 1000, 1) for name, us in
+                                sorted(packages.items(), key=lambda item: -item[1])[:args.top]},
+                'lazy_loaded': result['lazy_loaded']
+            }, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        print(f"已写入 {os.path.relpath(BASELINE, ROOT)}、{os.path.relpath(IMPORTTIME_BASELINE, ROOT)}")
+
+    if args.check and (median > args.target_ms or result['lazy_loaded']):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+gunicorn 生产部署配置
+
+用法:
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+主进程预加载应用并预热（路由、排行榜、目录缓存等在fork前构建一次，子进程共享内存页），
+fork后的重置由 app.utils.lifecycle 通过 os.register_at_fork 完成
+"""
+import signal
+from app.config import Config
+
+bind = Config.SERVER_BIND
+workers = Config.SERVER_WORKERS
+threads = Config.SERVER_THREADS
+worker_class = 'gthread'
+preload_app = True
+timeout = Config.SERVER_TIMEOUT
+# 收到SIGTERM后停止接收新连接，最多等待这么久处理完进行中的请求
+graceful_timeout = Config.SERVER_GRACEFUL_TIMEOUT
+keepalive = 5
+accesslog = '-'
+
+def when_ready(server):
+    """主进程预加载并预热后（等待超时的步骤执行完）关闭连接，工作进程不继承连接和步骤线程持有的锁"""
+    from app.utils.warmup import Warmup
+    Warmup.wait_pending()
+    Warmup.release_connections()
+
+def post_worker_init(worker):
+    """
+    工作进程开始接收请求前重新建立连接（预加载的数据随fork共享，不需要重新加载），
+    SIGTERM时先让就绪检查失败，再交给gunicorn排空请求
+    """
+    from app.utils.lifecycle import Lifecycle
+    from app.utils.warmup import Warmup
+
+    if Config.WARMUP_ENABLED:
+        Warmup.run([name for name in Warmup.enabled_steps() if name in Warmup.CONNECTION_STEPS])
+
+    handle_exit = signal.getsignal(signal.SIGTERM)
+
+    def handle_term(signum, frame):
+        Lifecycle.begin_drain()
+        if callable(handle_exit):
+            handle_exit(signum, frame)
+
+    signal.signal(signal.SIGTERM, handle_term)
+
+def worker_exit(server, worker):
+    """工作进程退出前写入缓冲中的进度和作答记录，关闭连接"""
+    from app.utils.lifecycle import Lifecycle
+    Lifecycle.shutdown()
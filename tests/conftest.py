@@ -0,0 +1,129 @@
+"""
+测试夹具：MySQL替换为按语句返回固定结果的假连接，不需要真实数据库
+应用在启用查询预算（raise模式）的配置下创建，超出 Config.QUERY_BUDGETS 的请求直接让测试失败
+"""
+import os
+import tempfile
+import threading
+
+os.environ.setdefault('WARMUP_ENABLED', 'false')
+os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+os.environ.setdefault('ITEM_STATS_INTERVAL', '0')
+# 昵称等缓存的变更日志写在临时目录，不落到 instance/ 下
+os.environ.setdefault('SEARCH_INDEX_DIR', tempfile.mkdtemp(prefix='search-index-'))
+
+import pymysql
+import pytest
+
+pytest_plugins = ['app.utils.pytest_plugin']
+
+class Row(dict):
+    """查询结果行，未给出的列为0（统计类查询只关心条数）"""
+
+    def __missing__(self, key):
+        return 0
+
+class FakeDatabase:
+    """所有假连接共享的结果表与事务记录"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.results = []    # [(语句片段, 行列表)]，按顺序匹配第一个
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def connect(self):
+        return FakeConnection(self)
+
+    def on(self, fragment, rows):
+        self.results.append((fragment, [Row(row) for row in rows]))
+
+    def rows_for(self, query):
+        with self.lock:
+            self.statements.append(query)
+        for fragment, rows in self.results:
+            if fragment in query:
+                return rows
+        return [Row()]
+
+class FakeCursor:
+    def __init__(self, database):
+        self.database = database
+        self.rows = []
+        self.rowcount = 0
+        self.description = None
+        self.lastrowid = 0
+
+    def execute(self, query, args=None):
+        self.rows = self.database.rows_for(query)
+        self.rowcount = len(self.rows)
+        self.description = (('col',),)
+        return self.rowcount
+
+    def executemany(self, query, args):
+        for item in args:
+            self.execute(query, item)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    open = True
+
+    def __init__(self, database):
+        self.database = database
+
+    def cursor(self, cursor_class=None):
+        return FakeCursor(self.database)
+
+    def begin(self):
+        pass
+
+    def commit(self):
+        with self.database.lock:
+            self.database.commits += 1
+
+    def rollback(self):
+        with self.database.lock:
+            self.database.rollbacks += 1
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        pass
+
+_database = FakeDatabase()
+# 连接池会保留已建立的连接，假连接统一指向 _database，每个测试开始时重置其内容
+pymysql.connect = lambda **kwargs: _database.connect()
+
+@pytest.fixture
+def db():
+    _database.__init__()
+    return _database
+
+@pytest.fixture
+def app(db, query_budget_mode):
+    from app import create_app
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def admin_headers(app, db):
+    from app.utils.auth_utils import generate_token
+    db.on('nickname, role FROM user_profile', [{'nickname': 'admin', 'role': 'admin'}])
+    with app.app_context():
+        token = generate_token(1)
+    return {'Authorization': f'Bearer {token}'}
@@ -0,0 +1,255 @@
+"""
+异步接口与同步接口的JSON契约一致性（冒烟测试）
+同一份假数据分别交给同步应用和异步应用，比较响应的结构（字段名与值类型）
+未安装 requirements-async.txt 时跳过
+"""
+import asyncio
+from datetime import datetime, timezone
+import pytest
+
+pytest.importorskip('quart')
+pytest.importorskip('aiomysql')
+pytest.importorskip('motor')
+
+import bson
+from app.aio import create_async_app
+from app.aio.db import AsyncDB
+from app.aio.mongo import AsyncMongo
+from app.models.activity_log import ActivityLog
+from app.utils.catalog import Catalog
+from app.utils.mongo import MongoDB
+
+# 按顺序匹配语句片段，靠前的更具体
+RESULTS = [
+    ('user_id IN', [{'user_id': 1, 'nickname': 'admin'}, {'user_id': 2, 'nickname': 'student'}]),
+    ('GROUP BY level', [{'level': 'A1', 'total': 2}]),
+    ('total_users', [{'total_users': 2, 'admin_count': 1, 'student_count': 1}]),
+    ('total_posts', [{'total_posts': 1, 'pending_posts': 0, 'approved_posts': 1}]),
+    ('today_users', [{'today_users': 1}]),
+    ('COUNT(*) as total', [{'total': 2}]),
+    ('fn_calc_accuracy', [{'accuracy': 50.0, 'level': 'C'}]),
+    ('fn_get_level', [{'level': 'C'}]),
+    ('correct_opt', [{'question_id': 1, 'correct_opt': 'A', 'score': 5},
+                     {'question_id': 2, 'correct_opt': 'B', 'score': 5}]),
+    ('option_a', [{'question_id': i, 'question': f'Q{i}', 'option_a': 'a', 'option_b': 'b',
+                   'option_c': 'c', 'option_d': 'd', 'score': 5} for i in (1, 2)]),
+    ('total_points', [{'quiz_id': 1, 'quiz_type': 'vocab', 'title': 'A1词汇', 'total_points': 10}]),
+    ('FROM vocab', [{'word_id': i, 'word': f'word{i}', 'meaning': '释义', 'example': 'An example.',
+                     'level': 'A1'} for i in (1, 2)]),
+    ('FROM post p', [{'post_id': 1, 'user_id': 2, 'title': '标题', 'content': '内容', 'category': 'grammar',
+                      'status': 'approved', 'created_at': datetime(2025, 1, 1), 'comment_count': 0}]),
+]
+
+def _matches(document, query):
+    for key, condition in query.items():
+        value = document.get(key)
+        if isinstance(condition, dict):
+            for op, operand in condition.items():
+                if value is None or not {'$gte': value >= operand, '$lte': value <= operand,
+                                         '$gt': value > operand, '$lt': value < operand}[op]:
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+class FakeMongoCursor:
+    def __init__(self, documents):
+        self.documents = list(documents)
+
+    def sort(self, key, direction):
+        self.documents.sort(key=lambda document: document[key], reverse=direction < 0)
+        return self
+
+    def skip(self, count):
+        self.documents = self.documents[count:]
+        return self
+
+    def limit(self, count):
+        self.documents = self.documents[:count]
+        return self
+
+    def __iter__(self):
+        return iter(self.documents)
+
+    async def to_list(self, length=None):
+        return self.documents[:length]
+
+class FakeCollection:
+    def __init__(self):
+        self.documents = []
+
+    def find(self, query=None):
+        return FakeMongoCursor(d for d in self.documents if _matches(d, query or {}))
+
+    def count_documents(self, query, limit=None):
+        count = sum(1 for d in self.documents if _matches(d, query))
+        return min(count, limit) if limit else count
+
+    def estimated_document_count(self):
+        return len(self.documents)
+
+    def aggregate(self, pipeline):
+        return FakeMongoCursor([])
+
+class FakeMongoDatabase(dict):
+    def __missing__(self, name):
+        collection = self[name] = FakeCollection()
+        return collection
+
+class AsyncCollection:
+    """motor风格：返回游标的方法不变，其余方法变为协程"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def find(self, query=None):
+        return self.collection.find(query)
+
+    def aggregate(self, pipeline):
+        return self.collection.aggregate(pipeline)
+
+    async def count_documents(self, query, limit=None):
+        return self.collection.count_documents(query, limit)
+
+    async def estimated_document_count(self):
+        return self.collection.estimated_document_count()
+
+class AsyncMongoDatabase:
+    def __init__(self, database):
+        self.database = database
+
+    def __getitem__(self, name):
+        return AsyncCollection(self.database[name])
+
+class FakeAsyncCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, query, args=None):
+        return self.cursor.execute(query, args)
+
+    async def fetchone(self):
+        return self.cursor.fetchone()
+
+    async def fetchall(self):
+        return self.cursor.fetchall()
+
+class FakeAsyncConnection:
+    def __init__(self, connection):
+        self.connection = connection
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def cursor(self, cursor_class=None):
+        return FakeAsyncCursor(self.connection.cursor())
+
+    async def begin(self):
+        self.connection.begin()
+
+    async def commit(self):
+        self.connection.commit()
+
+    async def rollback(self):
+        self.connection.rollback()
+
+class FakeAsyncPool:
+    def __init__(self, database):
+        self.database = database
+
+    def acquire(self):
+        return FakeAsyncConnection(self.database.connect())
+
+def shape(value):
+    """响应结构：字典保留键，列表取首个元素，标量只保留类型"""
+    if isinstance(value, dict):
+        return {key: shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [shape(value[0])] if value else []
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, (int, float)):
+        return 'number'
+    return 'null' if value is None else type(value).__name__
+
+@pytest.fixture
+def mongo(monkeypatch):
+    database = FakeMongoDatabase()
+    now = datetime.now(timezone.utc)
+    database[ActivityLog.partition_for(now)].documents.append(
+        dict(ActivityLog.encode(1, 'user_login', now, {'ip_address': '10.0.0.1'}), _id=bson.ObjectId()))
+    monkeypatch.setattr(MongoDB, '_db', database)
+    monkeypatch.setattr(AsyncMongo, '_db', AsyncMongoDatabase(database))
+    return database
+
+@pytest.fixture
+def contract(client, admin_headers, db, mongo, monkeypatch):
+    for fragment, rows in RESULTS:
+        db.on(fragment, rows)
+    Catalog.invalidate()
+    monkeypatch.setattr(AsyncDB, '_pool', FakeAsyncPool(db))
+    async_app = create_async_app()
+    async_app.config['TESTING'] = True
+
+    def compare(method, path, **kwargs):
+        sync_response = client.open(path, method=method, headers=admin_headers, **kwargs)
+
+        async def call():
+            response = await async_app.test_client().open(path, method=method, headers=admin_headers, **kwargs)
+            return response.status_code, await response.get_json()
+
+        status, body = asyncio.run(call())
+        assert (status, shape(body)) == (sync_response.status_code, shape(sync_response.get_json()))
+        return body
+    return compare
+
+def test_vocab_list(contract):
+    body = contract('GET', '/api/learning/vocab?level=A1')
+    assert body['data']['total'] == 2
+
+def test_quiz_questions(contract):
+    body = contract('GET', '/api/quiz/1/questions')
+    assert len(body['data']['questions']) == 2
+
+def test_quiz_submit(contract):
+    body = contract('POST', '/api/quiz/1/submit', json={'user_id': 2, 'answers': {'1': 'A', '2': 'C'}})
+    assert body['data']['score'] == 5
+
+def test_posts(contract):
+    body = contract('GET', '/api/community/posts')
+    assert body['data']['data'][0]['nickname'] == 'student'
+
+def test_user_logs(contract):
+    body = contract('GET', '/api/logs/user/1/logs')
+    assert body['data']['logs'][0]['action_type'] == 'user_login'
+
+def test_log_statistics(contract):
+    contract('GET', '/api/logs/statistics')
+
+def test_admin_statistics(contract):
+    body = contract('GET', '/api/admin/statistics')
+    assert body['data']['vocab_count'] == 2
+
+def test_quiz_submit_pins_sync_reads(contract, app, monkeypatch):
+    from app.config import Config
+    from app.utils.replicas import ReadYourWrites
+    monkeypatch.setattr(Config, 'DB_REPLICAS', [dict(Config.DB_CONFIG)])
+    async_app = create_async_app()
+
+    async def call():
+        return await async_app.test_client().post('/api/quiz/1/submit', json={'user_id': 2, 'answers': {'1': 'A'}})
+
+    response = asyncio.run(call())
+    until = response.headers[ReadYourWrites.HEADER]
+    # 落到同步应用（其他进程）的读取带回该请求头
+    with app.test_request_context('/api/user/progress/2', headers={ReadYourWrites.HEADER: until}):
+        assert ReadYourWrites.pinned()
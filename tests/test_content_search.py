@@ -0,0 +1,26 @@
+import pytest
+from app.config import Config
+from app.utils.content_search import ContentSearch
+from app.utils.search_index import SearchIndex
+
+@pytest.fixture
+def search_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'SEARCH_INDEX_DIR', str(tmp_path))
+    monkeypatch.setattr(ContentSearch, '_index', SearchIndex())
+    ContentSearch._write_snapshot()
+    # 模拟尚未加载检索索引的管理端worker
+    monkeypatch.setattr(ContentSearch, '_index', None)
+    monkeypatch.setattr(ContentSearch, '_snapshot_mtime', None)
+    return tmp_path
+
+def test_add_on_unloaded_worker_is_journaled(search_dir):
+    ContentSearch.add('grammar', 7, 'Present perfect', 'have been doing', 'B1')
+    results = ContentSearch.search('perfect')
+    assert [(r['type'], r['id']) for r in results] == [('grammar', 7)]
+
+def test_add_on_loaded_worker_reaches_other_workers(search_dir):
+    ContentSearch.ensure_loaded()
+    ContentSearch.add('listening', 3, 'Airport announcement', 'boarding gate', 'A2')
+    # 其他worker：重新加载快照并回放日志
+    ContentSearch._index = None
+    assert [r['id'] for r in ContentSearch.search('boarding')] == [3]
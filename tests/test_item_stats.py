@@ -0,0 +1,16 @@
+from app.models.item_stats import ItemStats
+from app.utils.answer_batch import encode_batch
+
+def test_refresh_selects_unaggregated_batches_and_marks_them(db):
+    db.on('FROM quiz_answer_batch', [
+        {'batch_id': 3, 'data': encode_batch([(80, [(11, 'A', True), (12, 'C', False)])])},
+        {'batch_id': 9, 'data': encode_batch([(50, [(11, 'B', False)])])},
+    ])
+    result = ItemStats.refresh(max_batches=10)
+    assert result == {'batches': 2, 'answers': 3, 'has_more': False}
+
+    select = next(s for s in db.statements if 'FROM quiz_answer_batch' in s)
+    # 按标记而不是ID位置选取：提交较晚、ID较小的批次也会被汇总
+    assert 'aggregated = 0' in select and 'batch_id >' not in select
+    assert 'SKIP LOCKED' in select
+    assert any('SET aggregated = 1' in s for s in db.statements)
@@ -0,0 +1,35 @@
+import pytest
+
+@pytest.mark.parametrize('content_ids', ['123', [1, '2'], [-1], [True], [2 ** 32], None])
+def test_put_progress_rejects_bad_content_ids(client, content_ids):
+    response = client.put('/api/user/progress/1', json={'type': 'vocab', 'content_ids': content_ids})
+    assert response.status_code == 400
+
+def test_put_progress_requires_content_ids(client, db):
+    response = client.put('/api/user/progress/1', json={'type': 'vocab', 'increment': 1})
+    assert response.status_code == 400
+    assert not any('UPDATE progress' in statement for statement in db.statements)
+
+@pytest.mark.parametrize('content_ids', ['123', [3.5], [-4]])
+def test_mark_learned_rejects_bad_content_ids(client, content_ids):
+    response = client.post('/api/user/learned/1', json={'type': 'grammar', 'content_ids': content_ids})
+    assert response.status_code == 400
+
+def test_put_progress_marks_learned_items(client, db):
+    response = client.put('/api/user/progress/1', json={'type': 'vocab', 'content_ids': [12, 15]})
+    assert response.status_code == 200
+    assert response.get_json()['data']['count'] == 2
+
+@pytest.mark.parametrize('content_id', ['abc', '12', -1, True, 3.5])
+def test_log_learning_progress_rejects_bad_content_id(client, db, admin_headers, content_id):
+    response = client.post('/api/logs/log-learning-progress', headers=admin_headers,
+                           json={'content_type': 'vocab', 'content_id': content_id, 'action': 'completed'})
+    assert response.status_code == 400
+    assert not any('learned_items' in statement for statement in db.statements)
+
+@pytest.mark.parametrize('grades', [[5], [{'word_id': 'x', 'quality': 3}],
+                                    [{'word_id': 1, 'quality': True}], [{'word_id': -1, 'quality': 3}]])
+def test_grade_reviews_rejects_malformed_items(client, db, grades):
+    response = client.post('/api/learning/review/grade', json={'user_id': 1, 'grades': grades})
+    assert response.status_code == 400
+    assert not any('vocab_review' in statement for statement in db.statements)
@@ -0,0 +1,158 @@
+from datetime import datetime, timezone
+import bson
+import pytest
+from app.config import Config
+from app.models.activity_log import ActivityLog
+from app.utils.log_archive import LogArchive
+from app.utils.mongo import MongoDB
+
+NAME = 'activity_logs_202401'
+
+class FakeCursor(list):
+    def sort(self, key, direction):
+        return FakeCursor(sorted(self, key=lambda document: document[key], reverse=direction < 0))
+
+    def batch_size(self, size):
+        return self
+
+class FakeInsertResult:
+    def __init__(self, ids):
+        self.inserted_ids = ids
+
+class FakeCollection:
+    def __init__(self, database, name):
+        self.database, self.name = database, name
+
+    @property
+    def documents(self):
+        return self.database.collections.setdefault(self.name, {})
+
+    def find(self, query):
+        return FakeCursor(self.documents.values())
+
+    def count_documents(self, query):
+        return len(self.documents)
+
+    def insert_many(self, documents, ordered=True):
+        from pymongo.errors import BulkWriteError
+        ids, errors = [], []
+        for index, document in enumerate(documents):
+            if document['_id'] in self.documents:
+                errors.append({'index': index, 'code': 11000})
+            else:
+                self.documents[document['_id']] = document
+                ids.append(document['_id'])
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'nInserted': len(ids)})
+        return FakeInsertResult(ids)
+
+    def create_index(self, keys):
+        self.database.indexes.setdefault(self.name, set()).add('_'.join(f'{key}_{order}' for key, order in keys))
+
+    def index_information(self):
+        return {index: {} for index in self.database.indexes.get(self.name, ())}
+
+    def drop_index(self, index):
+        self.database.indexes[self.name].discard(index)
+
+    def drop(self):
+        self.database.collections.pop(self.name, None)
+
+class FakeDatabase:
+    def __init__(self):
+        self.collections, self.indexes, self.validators = {}, {}, {}
+        self.commands = []
+        self.read_write_only = False
+
+    def __getitem__(self, name):
+        return FakeCollection(self, name)
+
+    def list_collection_names(self):
+        return list(self.collections)
+
+    def create_collection(self, name, **options):
+        from pymongo.errors import CollectionInvalid
+        if name in self.collections:
+            raise CollectionInvalid(name)
+        self.collections[name] = {}
+        self.validators[name] = options.get('validator')
+
+    def list_collections(self, filter):
+        name = filter['name']
+        if name in self.collections:
+            yield {'name': name, 'options': {'validator': self.validators.get(name)}}
+
+    def command(self, name, collection, **options):
+        assert name == 'collMod'
+        self.commands.append(collection)
+        if self.read_write_only:
+            from pymongo.errors import OperationFailure
+            raise OperationFailure('not authorized', code=13)
+        self.validators[collection] = options['validator']
+
+def log(user_id):
+    return dict(ActivityLog.encode(user_id, 'user_login', datetime(2024, 1, 5, tzinfo=timezone.utc), None),
+                _id=bson.ObjectId())
+
+@pytest.fixture
+def mongo(tmp_path, monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(Config, 'LOG_ARCHIVE_DIR', str(tmp_path))
+    monkeypatch.setattr(MongoDB, '_db', database)
+    monkeypatch.setattr(ActivityLog, '_ensured', set())
+    return database
+
+def archived_users():
+    return sorted(document['u'] for document in LogArchive.iter_archive(NAME))
+
+def test_archive_exports_and_drops(mongo):
+    mongo.collections[NAME] = {document['_id']: document for document in (log(1), log(2))}
+    assert LogArchive.archive_partition(NAME) == 2
+    assert NAME not in mongo.collections
+    assert archived_users() == [1, 2]
+
+def test_empty_collection_does_not_overwrite_archive(mongo):
+    mongo.collections[NAME] = {document['_id']: document for document in (log(1), log(2))}
+    LogArchive.archive_partition(NAME)
+    # 晚到的写入或并发调用重新建出了空集合
+    mongo.collections[NAME] = {}
+    assert LogArchive.archive_partition(NAME) == 2
+    assert archived_users() == [1, 2]
+
+def test_rearchive_merges_with_existing_archive(mongo):
+    mongo.collections[NAME] = {document['_id']: document for document in (log(1), log(2))}
+    LogArchive.archive_partition(NAME)
+    LogArchive.restore(NAME)
+    extra = log(3)
+    mongo.collections[NAME][extra['_id']] = extra
+    assert LogArchive.archive_partition(NAME) == 3
+    assert archived_users() == [1, 2, 3]
+
+def test_dropped_collection_is_skipped(mongo):
+    mongo.collections[NAME] = {document['_id']: document for document in (log(1),)}
+    LogArchive.archive_partition(NAME)
+    assert LogArchive.archive_partition(NAME) == 0
+    assert archived_users() == [1]
+
+def test_ensure_partition_upgrades_existing_collection(mongo):
+    # 升级前当月集合已按旧格式创建
+    mongo.collections[NAME] = {}
+    mongo.validators[NAME] = {'$jsonSchema': {'required': ['user_id', 'action_type', 'timestamp']}}
+    mongo.indexes[NAME] = {'_id_', 'user_id_1_timestamp_-1', 'timestamp_-1'}
+    ActivityLog.ensure_partition(NAME)
+    assert mongo.validators[NAME] == ActivityLog.VALIDATOR
+    assert mongo.indexes[NAME] == {'_id_', 'u_1_t_-1', 'a_1_t_-1', 't_-1'}
+
+def test_ensure_partition_skips_current_validator(mongo):
+    mongo.collections[NAME] = {}
+    mongo.validators[NAME] = ActivityLog.VALIDATOR
+    ActivityLog.ensure_partition(NAME)
+    assert mongo.commands == []
+
+def test_ensure_partition_tries_upgrade_once_without_dbadmin(mongo):
+    mongo.collections[NAME] = {}
+    mongo.validators[NAME] = {'$jsonSchema': {'required': ['user_id']}}
+    mongo.read_write_only = True
+    ActivityLog.ensure_partition(NAME)
+    ActivityLog.ensure_partition(NAME)
+    assert mongo.commands == [NAME]
@@ -0,0 +1,17 @@
+from app.utils.metrics import Metrics
+
+def test_request_recorded_by_route_and_status(client, monkeypatch):
+    monkeypatch.setattr(Metrics, '_routes', {})
+    response = client.get('/api/learning/vocab?level=A1')
+
+    assert response.status_code == 200
+    # 只访问了MySQL，Server-Timing 不输出mongo项
+    timing = response.headers['Server-Timing']
+    assert timing.startswith('app;dur=') and 'sql;dur=' in timing and 'mongo' not in timing
+    stats = Metrics._routes[('/api/learning/vocab', 'GET', 200)]
+    assert stats.count == 1 and stats.sql_count >= 1
+
+def test_unmatched_route_recorded(client, monkeypatch):
+    monkeypatch.setattr(Metrics, '_routes', {})
+    assert client.get('/api/no-such-route').status_code == 404
+    assert Metrics._routes[('unmatched', 'GET', 404)].count == 1
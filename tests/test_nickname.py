@@ -0,0 +1,26 @@
+import pytest
+from app.config import Config
+from app.utils.change_journal import ChangeJournal
+from app.utils.nickname import NicknameResolver
+
+@pytest.fixture
+def resolver(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'SEARCH_INDEX_DIR', str(tmp_path))
+    monkeypatch.setattr(NicknameResolver, '_cache', type(NicknameResolver._cache)())
+    monkeypatch.setattr(NicknameResolver, '_journal', ChangeJournal('nicknames'))
+    NicknameResolver.from_cache([])
+    return NicknameResolver
+
+def test_rename_in_other_worker_drops_cached_nickname(resolver):
+    resolver.remember({7: 'old', 8: 'other'})
+    # 另一个worker修改了7号用户的昵称
+    ChangeJournal('nicknames').append([7])
+    cached, missing = resolver.from_cache([7, 8])
+    assert cached == {8: 'other'}
+    assert missing == [7]
+
+def test_invalidate_publishes_to_journal(resolver):
+    other_worker = ChangeJournal('nicknames')
+    other_worker.mark()
+    resolver.invalidate(7)
+    assert other_worker.changes() == [7]
@@ -0,0 +1,50 @@
+from datetime import datetime
+import pytest
+from app.config import Config
+from app.utils.change_journal import ChangeJournal
+from app.utils.post_feed import PostFeed
+
+def post(post_id, title, comment_count=0, status='approved'):
+    return {'post_id': post_id, 'user_id': 1, 'title': title, 'content': 'content', 'category': 'grammar',
+            'status': status, 'created_at': datetime(2025, 1, 1), 'comment_count': comment_count}
+
+@pytest.fixture
+def feed(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'SEARCH_INDEX_DIR', str(tmp_path))
+    monkeypatch.setattr(Config, 'SEARCH_INDEX_REFRESH', 0)
+    monkeypatch.setattr(PostFeed, '_journal', ChangeJournal('posts'))
+    monkeypatch.setattr(PostFeed, '_comments', ChangeJournal('post_comments'))
+
+    def store(*rows):
+        """主库中的帖子"""
+        db.results = []
+        db.on('FROM post p', rows)
+    store(post(1, 'present perfect'), post(2, 'past simple'))
+    PostFeed.rebuild()
+    return store
+
+def hot_ids():
+    return [p['post_id'] for p in PostFeed.hot()[1]]
+
+def test_approval_on_unloaded_worker_reaches_loaded_worker(feed, monkeypatch):
+    feed(post(1, 'present perfect'), post(2, 'past simple'), post(3, 'phrasal verbs'))
+    with monkeypatch.context() as unloaded:
+        unloaded.setattr(PostFeed, '_loaded_at', None)
+        PostFeed.upsert(post(3, 'phrasal verbs'))
+    assert [p['post_id'] for p in PostFeed.search('phrasal')[1]] == [3]
+
+def test_comments_are_counted_without_reloading(feed, db):
+    for _ in range(3):
+        PostFeed.on_comment(1)
+    db.statements.clear()
+    assert hot_ids() == [1, 2]
+    assert PostFeed.hot()[1][0]['comment_count'] == 3
+    assert db.statements == []
+
+def test_replacing_a_post_drops_old_postings(feed):
+    for title in ('modal verbs', 'conditionals', 'modal verbs'):
+        feed(post(1, 'present perfect'), post(2, title))
+        PostFeed.upsert(post(2, title))
+    assert PostFeed.search('conditionals') == (0, [])
+    postings = PostFeed._index._postings['modal']
+    assert len(postings[0]) == 1
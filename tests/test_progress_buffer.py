@@ -0,0 +1,57 @@
+import pytest
+from app.config import Config
+from app.utils.progress_buffer import ProgressBuffer
+
+@pytest.fixture
+def buffer(monkeypatch):
+    monkeypatch.setattr(Config, 'PROGRESS_WRITE_BEHIND', True)
+    monkeypatch.setattr(ProgressBuffer, '_ensure_flusher', classmethod(lambda cls: None))
+    monkeypatch.setattr(ProgressBuffer, '_pending', {})
+    monkeypatch.setattr(ProgressBuffer, '_inflight', {})
+    return ProgressBuffer
+
+def progress_writes(db):
+    return [statement for statement in db.statements if 'UPDATE progress' in statement]
+
+def test_pending_is_keyed_per_user(buffer):
+    buffer.touch(1, 'vocab')
+    buffer.touch(1, 'grammar')
+    buffer.touch(2, 'listening')
+    assert buffer.pending_for(1) == {'vocab', 'grammar'}
+    assert buffer.pending_for(3) == set()
+
+def test_retry_after_failed_commit_copies_counts(buffer, db, monkeypatch):
+    buffer.touch(1, 'vocab')
+    connection_class = type(db.connect())
+    commit = connection_class.commit
+
+    def fail_commit(self):
+        raise ConnectionError('lost connection during commit')
+
+    monkeypatch.setattr(connection_class, 'commit', fail_commit)
+    with pytest.raises(ConnectionError):
+        buffer.flush()
+    assert buffer.pending_for(1) == {'vocab'}
+
+    monkeypatch.setattr(connection_class, 'commit', commit)
+    assert buffer.flush() == 1
+    writes = progress_writes(db)
+    assert len(writes) == 2
+    # 重试写入的是集合数量而不是增量，服务端已提交过的一批再写一次结果不变
+    assert all('p.vocab_learned = l.item_count' in statement for statement in writes)
+    assert buffer.pending_for(1) == set()
+
+def test_mark_defers_progress_write(buffer, db):
+    from app.models.learned_items import LearnedItems
+    LearnedItems.mark(1, 'vocab', [12, 15])
+    assert not progress_writes(db)
+    assert buffer.pending_for(1) == {'vocab'}
+
+def test_progress_read_uses_set_count_while_pending(client, buffer, db):
+    buffer.touch(1, 'vocab')
+    db.on('SELECT * FROM progress', [{'user_id': 1, 'vocab_learned': 3, 'grammar_learned': 4}])
+    db.on('item_count FROM learned_items', [{'content_type': 'vocab', 'item_count': 5}])
+    response = client.get('/api/user/progress/1')
+    progress = response.get_json()['data']['progress']
+    assert progress['vocab_learned'] == 5
+    assert progress['grammar_learned'] == 4
@@ -0,0 +1,45 @@
+import pytest
+from app.config import Config
+from app.utils.query_budget import QueryBudgetExceeded
+
+def test_statistics_within_budget(client, admin_headers, assert_queries):
+    with assert_queries(Config.QUERY_BUDGETS['admin.get_statistics']) as report:
+        response = client.get('/api/admin/statistics', headers=admin_headers)
+
+    assert response.status_code == 200
+    assert 'X-Query-Budget' not in response.headers
+    # 鉴权1条 + 9项并发统计
+    assert report.count == 10
+
+def test_quiz_performance_within_budget(client, admin_headers, db, assert_queries):
+    db.on('FROM quiz q', [{'quiz_id': i, 'title': f'测验{i}', 'avg_accuracy': 80} for i in range(1, 51)])
+
+    # 准确率由分组查询一并得出，测验数量增加不应增加查询
+    with assert_queries(2, repeat_limit=1) as report:
+        response = client.get('/api/admin/statistics/quiz-performance', headers=admin_headers)
+
+    assert response.status_code == 200
+    assert len(response.get_json()['data']) == 50
+    assert report.count == 2
+
+def test_statistics_over_budget_raises(client, admin_headers, monkeypatch):
+    monkeypatch.setitem(Config.QUERY_BUDGETS, 'admin.get_statistics', 5)
+
+    with pytest.raises(QueryBudgetExceeded, match='admin.get_statistics'):
+        client.get('/api/admin/statistics', headers=admin_headers)
+
+def test_write_over_budget_rolls_back(client, admin_headers, db, monkeypatch):
+    # 鉴权1条 + UPDATE 1条，预算1条时应在提交前失败
+    monkeypatch.setitem(Config.QUERY_BUDGETS, 'admin.update_user_role', 1)
+
+    with pytest.raises(QueryBudgetExceeded):
+        client.put('/api/admin/users/2/role', json={'role': 'admin'}, headers=admin_headers)
+
+    assert db.commits == 0
+    assert db.rollbacks == 1
+
+def test_write_within_budget_commits(client, admin_headers, db):
+    response = client.put('/api/admin/users/2/role', json={'role': 'admin'}, headers=admin_headers)
+
+    assert response.status_code == 200
+    assert db.commits == 1
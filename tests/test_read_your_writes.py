@@ -0,0 +1,34 @@
+import pytest
+import app.utils.db as db_module
+from app.config import Config
+from app.utils.progress_buffer import ProgressBuffer
+from app.utils.replicas import ReadYourWrites
+
+@pytest.fixture
+def with_replicas(monkeypatch):
+    monkeypatch.setattr(db_module, 'replicas', True)
+    monkeypatch.setattr(ReadYourWrites, '_pins', {})
+
+def test_session_keys_ignore_ip_when_user_known(app):
+    with app.test_request_context('/api/user/progress/7', environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+        assert ReadYourWrites.session_keys() == {'u7'}
+
+def test_session_keys_fall_back_to_ip(app):
+    with app.test_request_context('/api/learning/vocab', environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+        assert ReadYourWrites.session_keys() == {'ip10.0.0.1'}
+
+def test_write_by_one_user_does_not_pin_others_behind_proxy(app, with_replicas):
+    with app.test_request_context('/', json={'user_id': 1}, environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+        ReadYourWrites.note_write()
+    with app.test_request_context('/', json={'user_id': 2}, environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+        assert not ReadYourWrites.pinned()
+
+def test_buffered_progress_pins_session(app, with_replicas, monkeypatch):
+    monkeypatch.setattr(Config, 'PROGRESS_WRITE_BEHIND', True)
+    monkeypatch.setattr(ProgressBuffer, '_ensure_flusher', classmethod(lambda cls: None))
+    monkeypatch.setattr(ProgressBuffer, '_pending', {})
+
+    with app.test_request_context('/api/user/progress/3', method='PUT'):
+        ProgressBuffer.touch(3, 'vocab')
+    with app.test_request_context('/api/user/progress/3'):
+        assert ReadYourWrites.pinned()
@@ -0,0 +1,40 @@
+import pytest
+from app.config import Config
+from app.utils.vocab_index import VocabIndex
+
+def word(word_id, text):
+    return {'word_id': word_id, 'word': text, 'meaning': '释义', 'example': '', 'level': 'A1'}
+
+@pytest.fixture
+def vocab(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'SEARCH_INDEX_DIR', str(tmp_path))
+    monkeypatch.setattr(Config, 'SEARCH_INDEX_REFRESH', 0)
+    monkeypatch.setattr(VocabIndex, '_journal', type(VocabIndex._journal)('vocab'))
+
+    def store(*rows):
+        """主库中的词汇表"""
+        db.results = []
+        db.on('FROM vocab', rows)
+    store(word(1, 'necessary'), word(2, 'apple'))
+    VocabIndex.rebuild()
+    return store
+
+def words(results):
+    return [row['word'] for row in results]
+
+def test_fuzzy_finds_distance_two_typo(vocab):
+    assert words(VocabIndex.search('neccesary', fuzzy=True)) == ['necessary']
+
+def test_upsert_replaces_old_spelling(vocab):
+    vocab(word(1, 'necessary'), word(2, 'banana'))
+    VocabIndex.upsert(word(2, 'banana'))
+    assert words(VocabIndex.search('bananna', fuzzy=True)) == ['banana']
+    assert VocabIndex.search('appel', fuzzy=True) == []
+
+def test_edit_on_unloaded_worker_reaches_loaded_worker(vocab, monkeypatch):
+    vocab(word(1, 'necessary'), word(2, 'apple'), word(3, 'library'))
+    # 尚未检索过词汇的管理端worker
+    with monkeypatch.context() as unloaded:
+        unloaded.setattr(VocabIndex, '_loaded_at', None)
+        VocabIndex.upsert(word(3, 'library'))
+    assert words(VocabIndex.search('libary', fuzzy=True)) == ['library']
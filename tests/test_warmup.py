@@ -0,0 +1,32 @@
+import os
+import threading
+import time
+import pytest
+from app.config import Config
+from app.utils.catalog import Catalog
+from app.utils.leaderboard import Leaderboard
+from app.utils.vocab_index import VocabIndex
+from app.utils.warmup import Warmup
+
+def test_wait_pending_joins_timed_out_step(monkeypatch):
+    monkeypatch.setattr(Config, 'WARMUP_STEP_TIMEOUT', 0.01)
+    finished = threading.Event()
+
+    def slow_step():
+        time.sleep(0.2)
+        finished.set()
+        return {}
+
+    assert Warmup._run_step('slow', slow_step)['status'] == 'timeout'
+    Warmup.wait_pending()
+    assert finished.is_set()
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='需要fork')
+@pytest.mark.parametrize('cache', [Catalog, Leaderboard, VocabIndex])
+def test_build_lock_held_at_fork_is_reset_in_child(cache):
+    with cache._build_lock:
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0 if cache._build_lock.acquire(timeout=1) else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0